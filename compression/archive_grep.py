@@ -0,0 +1,312 @@
+##################################################################################
+
+"""
+A script to search the output of prefix_compression.py or
+lossless_compression.py for a regular expression, without decompressing it.
+The expression is only matched against the words in the dictionary of each
+stream, which gives the set of pointers that match, and the pointers are then
+decoded and checked against that set, without building any of the text. Each
+match is written as its position, in words for the prefix codec and in
+characters for the lossless one, as taken by --range, followed by the word
+that matched and any context around it.
+
+Single streams, blocks and archives are all searched. In a seekable archive,
+the positions of the blocks are taken from its index, so a block where no word
+of the dictionary matches is skipped without decoding any of its pointers.
+Context never runs over the edge of a block, and as the lossless compressor
+cuts its blocks at any character, a word split between two of them isn't
+found.
+
+Example usage:
+    $ python archive_grep.py '^P[A-Z]*X' --input shakespeare.prefix
+    $ python archive_grep.py --lossless -i 'romeo' --context 3 --input rj.arc
+    $ python archive_grep.py --lossless --count 'love' --jobs 4 --input rj.arc
+"""
+
+import re
+import sys
+import array
+import argparse
+import functools
+import itertools
+
+from io import BytesIO
+
+from prefix_codes import EOF
+from trained_dictionary import (DICT_MARKER, TrainedDictionary, get_dict,
+                                load_trained)
+from bytes_decompression import read_dictionary
+from prefix_decompression import (BinaryReader, Decoder, read_coder,
+                                  read_trained_header)
+from block_compression import BLOCK_MARKER, ARCHIVE_MARKER, get_jobs, ordered_map
+from block_decompression import read_frames, read_index
+
+from typing import *
+
+class Match(NamedTuple):
+    """
+    A match in a compressed text, at a position within its block.
+    """
+
+    position: int
+    text: str
+
+def read_vocabulary(in_binary: BinaryIO, c: bytes, lossless: bool,
+      dictionary: Optional[TrainedDictionary]
+      ) -> List[Tuple[Decoder, List[Union[str, int]]]]:
+    """
+    Read the codes and dictionaries of a stream, leaving its pointers unread.
+
+    Parameters:
+    in_binary - BinaryIO - binary file to read from
+    c - bytes - the first byte of the stream, which has already been read
+    lossless - bool - whether the stream is from the lossless compressor
+    dictionary - Optional[TrainedDictionary] - the shared dictionary the
+     stream was compressed with, if any
+
+    Return:
+    List[Tuple[Decoder, List[Union[str, int]]]] - the decoder for each kind
+     of pointer, and the word for each pointer, with EOF for the last
+    """
+
+    if c == DICT_MARKER:
+        return read_trained_header(in_binary, dictionary)
+    decoders: List[Decoder] = [read_coder(in_binary, c)]
+    if lossless:
+        decoders.append(read_coder(in_binary))
+        return [(decoders[0], list(read_dictionary(in_binary)) + [EOF]),
+                (decoders[1], list(read_dictionary(in_binary, b"A", b"B"))
+                              + [EOF])]
+    return [(decoders[0], list(read_dictionary(in_binary)) + [EOF])]
+
+def read_tokens(in_binary: BinaryReader,
+      streams: List[Tuple[Decoder, List[Union[str, int]]]]) -> array.array:
+    """
+    Decode the pointers of a stream, up to EOF, without looking up their words.
+    The pointers of a lossless stream alternate between runs of letters and of
+    punctuation, whose pointers are offset by the length of the first
+    dictionary so that both index one vocabulary.
+
+    Parameters:
+    in_binary - BinaryReader - BinaryReader to read from
+    streams - List[Tuple[Decoder, List[Union[str, int]]]] - the decoder for
+     each kind of pointer and its words, as from read_vocabulary
+
+    Return:
+    array.array - the pointers, in order
+    """
+
+    decoder: Decoder
+    words: List[Union[str, int]]
+    if len(streams) == 1:
+        [(decoder, words)] = streams
+        # a callable iterator stops at the pointer to EOF without a check per
+        # pointer in Python
+        return array.array("L", iter(functools.partial(decoder.read, in_binary),
+                                     words.index(EOF)))
+
+    (word_decoder, words), (punc_decoder, punc) = streams
+    word_eof: int = words.index(EOF)
+    punc_eof: int = punc.index(EOF)
+    offset: int = len(words)
+    tokens: array.array = array.array("L")
+    append: Callable[[int], None] = tokens.append
+    pointer: int
+    if in_binary.read_bits(1):
+        pointer = punc_decoder.read(in_binary)
+        if pointer == punc_eof:
+            return tokens
+        append(pointer + offset)
+    while True:
+        pointer = word_decoder.read(in_binary)
+        if pointer == word_eof:
+            return tokens
+        append(pointer)
+        pointer = punc_decoder.read(in_binary)
+        if pointer == punc_eof:
+            return tokens
+        append(pointer + offset)
+
+def grep_stream(in_binary: BinaryIO, c: bytes, pattern: Pattern,
+      lossless: bool = False, context: int = 0,
+      dictionary: Optional[TrainedDictionary] = None, skip: bool = False
+      ) -> Tuple[List[Match], Optional[int]]:
+    """
+    Find the matches of a regular expression in a single stream.
+
+    Parameters:
+    in_binary - BinaryIO - binary file to read from
+    c - bytes - the first byte of the stream, which has already been read
+    pattern - Pattern - the compiled regular expression
+    lossless - bool - whether the stream is from the lossless compressor.
+     defaults to False
+    context - int - the number of words to show either side of a match.
+     defaults to 0
+    dictionary - Optional[TrainedDictionary] - the shared dictionary the
+     stream was compressed with, if any. defaults to None
+    skip - bool - whether to skip decoding the pointers if no word matches,
+     for a block whose position is already known from the index of an
+     archive, in which case its length isn't found. defaults to False
+
+    Return:
+    Tuple[List[Match], Optional[int]] - the matches, and the length of the
+     text of the stream, which may be None if skip was given
+    """
+
+    reader: BinaryReader = BinaryReader(in_binary)
+    streams: List[Tuple[Decoder, List[Union[str, int]]]] = read_vocabulary(
+            in_binary, c or in_binary.read(1), lossless, dictionary)
+    vocabulary: List[Union[str, int]] = [word for _, words in streams
+                                         for word in words]
+    matched: bytes = bytes(isinstance(word, str) and bool(pattern.search(word))
+                           for word in vocabulary)
+    if skip and not any(matched):
+        return [], None
+
+    tokens: array.array = read_tokens(reader, streams)
+    found: List[int] = list(itertools.compress(range(len(tokens)),
+                                               map(matched.__getitem__, tokens)))
+    separator: str = "" if lossless else " "
+    # a word and the punctuation after it are two runs
+    reach: int = 2 * context if lossless else context
+    matches: List[Match] = []
+    ind: int
+    for ind in found:
+        text: str = separator.join(vocabulary[token] for token
+                                   in tokens[max(ind - reach, 0):ind + reach + 1])
+        matches.append(Match(ind, text.replace("\n", " ")))
+
+    if not lossless:
+        return matches, len(tokens)
+    # the positions of a lossless stream are in characters, so the lengths of
+    # the runs are summed up to each match
+    lengths: List[int] = [len(word) if isinstance(word, str) else 0
+                          for word in vocabulary]
+    position: int = 0
+    previous: int = 0
+    match: Match
+    for ind, match in enumerate(matches):
+        position += sum(map(lengths.__getitem__, tokens[previous:match.position]))
+        previous = match.position
+        matches[ind] = Match(position, match.text)
+    if skip:
+        return matches, None
+    return matches, position + sum(map(lengths.__getitem__, tokens[previous:]))
+
+def grep_block(block: bytes, pattern: str, flags: int = 0,
+      lossless: bool = False, context: int = 0, dict_path: Optional[str] = None,
+      skip: bool = False) -> Tuple[List[Match], Optional[int]]:
+    """
+    Find the matches of a regular expression in a single compressed block, as
+    grep_stream.
+
+    Parameters:
+    block - bytes - the compressed block
+    pattern - str - the regular expression
+    flags - int - flags to compile it with. defaults to 0
+    lossless - bool - whether the block is from the lossless compressor.
+     defaults to False
+    context - int - the number of words to show either side of a match.
+     defaults to 0
+    dict_path - Optional[str] - path of the shared dictionary it was compressed
+     with, if any. defaults to None
+    skip - bool - whether to skip decoding the pointers if no word matches.
+     defaults to False
+
+    Return:
+    Tuple[List[Match], Optional[int]] - the matches, and the length of the
+     text of the block, which may be None if skip was given
+    """
+
+    return grep_stream(BytesIO(block), b"", re.compile(pattern, flags),
+                       lossless, context, None if dict_path is None
+                       else load_trained(dict_path, 2 if lossless else 1), skip)
+
+def grep(in_binary: BinaryIO, pattern: str, flags: int = 0,
+      lossless: bool = False, context: int = 0, dict_path: Optional[str] = None,
+      jobs: int = 1) -> Generator[Match, None, None]:
+    """
+    Find the matches of a regular expression in a compressed file, which may
+    be a single stream, blocks or an archive, with their positions in the whole
+    text.
+
+    Parameters:
+    in_binary - BinaryIO - binary file to read from
+    pattern - str - the regular expression
+    flags - int - flags to compile it with. defaults to 0
+    lossless - bool - whether the file is from the lossless compressor.
+     defaults to False
+    context - int - the number of words to show either side of a match.
+     defaults to 0
+    dict_path - Optional[str] - path of the shared dictionary it was compressed
+     with, if any. defaults to None
+    jobs - int - number of processes to search blocks with. defaults to 1
+
+    Return:
+    Generator[Match, None, None] - generator of matches, in order
+    """
+
+    c: bytes = in_binary.read(1)
+    if c != BLOCK_MARKER and c != ARCHIVE_MARKER:
+        matches: List[Match]
+        matches, _ = grep_stream(in_binary, c, re.compile(pattern, flags),
+                                 lossless, context, None if dict_path is None
+                                 else load_trained(dict_path,
+                                                   2 if lossless else 1))
+        yield from matches
+        return
+
+    starts: Optional[List[int]] = None
+    if c == ARCHIVE_MARKER and in_binary.seekable():
+        offsets: List[int]
+        offsets, starts = read_index(in_binary)
+        in_binary.seek(1)
+    grep_function: Callable[[bytes], Tuple[List[Match], Optional[int]]] = \
+            functools.partial(grep_block, pattern=pattern, flags=flags,
+                              lossless=lossless, context=context,
+                              dict_path=dict_path, skip=starts is not None)
+    start: int = 0
+    ind: int
+    length: Optional[int]
+    for ind, (matches, length) in enumerate(ordered_map(
+            grep_function, read_frames(in_binary), jobs)):
+        if starts is not None:
+            start = starts[ind]
+        match: Match
+        for match in matches:
+            yield Match(start + match.position, match.text)
+        if starts is None:
+            start += length
+
+def main(argv: List[str]) -> None:
+    jobs: int = get_jobs(argv)
+    dict_path: Optional[str] = get_dict(argv)
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("pattern")
+    parser.add_argument("--input", type=argparse.FileType("rb"),
+                        default=sys.stdin.buffer)
+    parser.add_argument("--output", type=argparse.FileType("w"),
+                        default=sys.stdout)
+    parser.add_argument("--lossless", action="store_true",
+                        help="search the output of lossless_compression.py")
+    parser.add_argument("-i", "--ignore-case", action="store_true")
+    parser.add_argument("--context", type=int, default=0, metavar="WORDS",
+                        help="show this many words either side of a match")
+    parser.add_argument("--count", action="store_true",
+                        help="only write the number of matches")
+    args: argparse.Namespace = parser.parse_args(argv[1:])
+
+    with args.input as in_binary, args.output as out_file:
+        matches: Iterator[Match] = grep(in_binary, args.pattern,
+                                        re.IGNORECASE if args.ignore_case else 0,
+                                        args.lossless, args.context, dict_path,
+                                        jobs)
+        if args.count:
+            out_file.write("{}\n".format(sum(1 for _ in matches)))
+            return
+        match: Match
+        for match in matches:
+            out_file.write("{}: {}\n".format(match.position, match.text))
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,310 @@
+##################################################################################
+
+"""
+A script to compress or decompress many files in one process, so that the cost
+of starting the interpreter and importing the codecs is paid once rather than
+for every file. The files are given as arguments, as glob patterns with --glob,
+or listed in a manifest with --manifest, and each is written to its own output,
+either beside it or under --output-dir. With --jobs, the files are shared out
+between a pool of processes, whose codecs then can't be given --jobs too, as
+the processes of a pool can't start pools of their own.
+
+Each file is run through the main function of the codec's compressor or
+decompressor, with the flags given after --, exactly as if the script had been
+run on it, so every codec and flag works as it does on its own.
+
+A manifest has one input per line, which can be followed by a tab and the path
+to write its output to. Blank lines and lines starting with # are skipped.
+
+Example usage:
+    $ python batch.py lossless ../text/*.txt --output-dir compressed
+    $ python batch.py lossless --decompress --glob 'compressed/**/*.lossless'
+    $ python batch.py prefix --manifest files.txt --jobs 4 -- --coder huffman
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+import functools
+import importlib
+
+from block_compression import get_jobs, ordered_map
+
+from typing import *
+
+# name: (compressor, decompressor, extra flags for both, whether the compressed
+# file is binary, whether the uncompressed file is read and written as bytes)
+CODECS: Dict[str, Tuple[str, str, List[str], bool, bool]] = {
+    "readable": ("readable_compression", "readable_decompression", [], False,
+                 False),
+    "sorted": ("sorted_compression", "readable_decompression", [], False,
+               False),
+    "bytes": ("bytes_compression", "bytes_decompression", [], True, False),
+    "prefix": ("prefix_compression", "prefix_decompression", [], True, False),
+    "prefix-huffman": ("prefix_compression", "prefix_decompression",
+                       ["--coder", "huffman"], True, False),
+    "lossless": ("lossless_compression", "lossless_decompression", [], True,
+                 False),
+    "lossless-huffman": ("lossless_compression", "lossless_decompression",
+                         ["--coder", "huffman"], True, False),
+    "lzw": ("lzw_compression", "lzw_decompression", [], True, False),
+    "lzw-bytes": ("lzw_compression", "lzw_decompression", [], True, True),
+}
+
+class Job(NamedTuple):
+    """
+    A file to compress or decompress, and where to write the result.
+    """
+
+    source: str
+    target: str
+
+class Result(NamedTuple):
+    """
+    The outcome of a job: the sizes of its input and output, how long it took,
+    and an error message if it failed.
+    """
+
+    source: str
+    target: str
+    in_size: int
+    out_size: int
+    seconds: float
+    error: Optional[str]
+
+def read_manifest(path: str, output_dir: Optional[str], suffix: str
+      ) -> List[Job]:
+    """
+    Read the jobs listed in a manifest. Inputs are relative to the current
+    directory, as are outputs, which default to those given by target_path.
+
+    Parameters:
+    path - str - path of the manifest, or "-" for stdin
+    output_dir - Optional[str] - directory for outputs which aren't given
+    suffix - str - suffix to give outputs which aren't given
+
+    Return:
+    List[Job] - a job for each line
+    """
+
+    jobs: List[Job] = []
+    in_file: TextIO
+    with (open(path) if path != "-" else sys.stdin) as in_file:
+        line: str
+        for line in in_file:
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            source: str
+            target: str
+            source, _, target = line.partition("\t")
+            jobs.append(Job(source, target or target_path(source, output_dir,
+                                                          suffix)))
+    return jobs
+
+def target_path(source: str, output_dir: Optional[str], suffix: str) -> str:
+    """
+    Find where to write the output for an input. A suffix starting with "-"
+    is removed from the input's name, if it ends with it, and otherwise ".out"
+    is added. Any other suffix is added. Under an output directory, inputs keep
+    their path relative to the current directory, unless they are outside it.
+
+    Example usage:
+    >>> target_path("a/b.txt", None, ".lzw")
+    'a/b.txt.lzw'
+    >>> target_path("a/b.txt.lzw", "out", "-.lzw")
+    'out/a/b.txt'
+    >>> target_path("/tmp/b.txt", "out", "-.lzw")
+    'out/b.txt.out'
+
+    Parameters:
+    source - str - path of the input
+    output_dir - Optional[str] - directory to write the output under, or None
+     to write it beside the input
+    suffix - str - suffix to add, or to remove if it starts with "-"
+
+    Return:
+    str - path of the output
+    """
+
+    target: str = source
+    if output_dir is not None:
+        relative: str = os.path.relpath(source)
+        if os.path.isabs(source) or relative.split(os.sep)[0] == os.pardir:
+            relative = os.path.basename(source)
+        target = os.path.join(output_dir, relative)
+    if suffix.startswith("-"):
+        if len(suffix) > 1 and target.endswith(suffix[1:]):
+            return target[:-len(suffix) + 1]
+        return target + ".out"
+    return target + suffix
+
+def run_job(job: Job, module_name: str, argv: List[str], in_binary: bool,
+      out_binary: bool, byte_mode: bool) -> Result:
+    """
+    Run the main function of a codec from one file to another. Errors are
+    caught and given back in the result, so that one bad file doesn't stop
+    the rest of the batch. The output is written under a temporary name and
+    only moved into place if the codec succeeds, so that a failed job never
+    leaves a partial output to be taken for a good one.
+
+    Parameters:
+    job - Job - the input and output
+    module_name - str - name of the compressor or decompressor to run
+    argv - List[str] - flags for the codec, which are copied for each job
+    in_binary - bool - whether to open the input in binary mode
+    out_binary - bool - whether to open the output in binary mode
+    byte_mode - bool - whether to run an LZW codec with --bytes
+
+    Return:
+    Result - the outcome of the job
+    """
+
+    start: float = time.perf_counter()
+    error: Optional[str] = None
+    partial: str = "{}.{}.partial".format(job.target, os.getpid())
+    try:
+        # each codec module is only imported once per process
+        main: Callable[..., None] = importlib.import_module(module_name).main
+        directory: str = os.path.dirname(job.target)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        stdin: IO
+        stdout: IO
+        with open(job.source, "rb" if in_binary else "r") as stdin, \
+             open(partial, "wb" if out_binary else "w") as stdout:
+            if byte_mode:
+                main(stdin, stdout, list(argv), True)
+            else:
+                main(stdin, stdout, list(argv))
+        os.replace(partial, job.target)
+    except (Exception, SystemExit) as e:
+        error = "{}: {}".format(type(e).__name__, e)
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+    seconds: float = time.perf_counter() - start
+    return Result(job.source, job.target, file_size(job.source),
+                  file_size(job.target), seconds, error)
+
+def file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def run_batch(jobs: Iterable[Job], codec: str, decompress: bool = False,
+      argv: Optional[List[str]] = None, processes: int = 1
+      ) -> Generator[Result, None, None]:
+    """
+    Compress or decompress a series of files with a codec, in this process or
+    in a pool of processes, and yield the outcome of each in order.
+
+    Parameters:
+    jobs - Iterable[Job] - the files to run on
+    codec - str - the name of a codec in CODECS
+    decompress - bool - whether to decompress rather than compress. defaults
+     to False
+    argv - Optional[List[str]] - flags for the codec. defaults to None, for
+     none
+    processes - int - number of processes to use. defaults to 1. the
+     processes of a pool can't start pools of their own, so with more than
+     one, the codec can't be given --jobs above 1
+
+    Return:
+    Generator[Result, None, None] - generator of results
+    """
+
+    if processes > 1 and get_jobs(list(argv or [])) > 1:
+        raise ValueError("a codec can't be given --jobs in a batch with --jobs")
+    compressor: str
+    decompressor: str
+    flags: List[str]
+    binary: bool
+    byte_mode: bool
+    compressor, decompressor, flags, binary, byte_mode = CODECS[codec]
+    function: Callable[[Job], Result] = functools.partial(run_job,
+            module_name=decompressor if decompress else compressor,
+            argv=flags + (argv or []),
+            in_binary=binary if decompress else byte_mode,
+            out_binary=byte_mode if decompress else binary,
+            byte_mode=byte_mode)
+    return ordered_map(function, jobs, processes)
+
+def get_jobs_list(args: argparse.Namespace, suffix: str) -> List[Job]:
+    """
+    Gather the jobs from the files, glob patterns and manifest given in parsed
+    arguments, in that order.
+    """
+
+    sources: List[str] = list(args.files)
+    pattern: str
+    for pattern in args.glob:
+        sources.extend(sorted(glob.glob(pattern, recursive=True)))
+    jobs: List[Job] = [Job(source, target_path(source, args.output_dir, suffix))
+                       for source in sources if not os.path.isdir(source)]
+    if args.manifest is not None:
+        jobs.extend(read_manifest(args.manifest, args.output_dir, suffix))
+    return jobs
+
+def main(argv: List[str]) -> None:
+    # flags after -- are given to the codec
+    codec_argv: List[str] = []
+    if "--" in argv:
+        codec_argv = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("codec", choices=sorted(CODECS))
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--decompress", action="store_true")
+    parser.add_argument("--glob", action="append", default=[])
+    parser.add_argument("--manifest")
+    parser.add_argument("--output-dir")
+    parser.add_argument("--suffix", help="suffix for outputs, or with a leading"
+                        " -, suffix to remove. defaults to .CODEC, or -.CODEC"
+                        " with --decompress")
+    parser.add_argument("--quiet", action="store_true")
+    # taken here rather than with get_jobs, so that --help lists every flag
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of processes to share the files between")
+    # files can come after the flags as well as before them
+    args: argparse.Namespace = parser.parse_intermixed_args(argv[1:])
+    if args.jobs < 1:
+        parser.error("--jobs must be positive")
+    if args.jobs > 1 and get_jobs(list(codec_argv)) > 1:
+        parser.error("the codec can't be given --jobs as well as the batch")
+
+    suffix: str = args.suffix or (("-" if args.decompress else "") + "."
+                                  + args.codec)
+    jobs: List[Job] = get_jobs_list(args, suffix)
+
+    start: float = time.perf_counter()
+    failures: int = 0
+    in_total: int = 0
+    out_total: int = 0
+    result: Result
+    for result in run_batch(jobs, args.codec, args.decompress, codec_argv,
+                            args.jobs):
+        in_total += result.in_size
+        out_total += result.out_size
+        if result.error is not None:
+            failures += 1
+            print("{}: {}".format(result.source, result.error), file=sys.stderr)
+        elif not args.quiet:
+            print("{} -> {} ({} -> {} bytes, {:.2f} ms)".format(result.source,
+                  result.target, result.in_size, result.out_size,
+                  result.seconds * 1000), file=sys.stderr)
+    elapsed: float = time.perf_counter() - start
+
+    print("{} files, {} failed, {} -> {} bytes in {:.3f} s ({:.1f} us per file)"
+          .format(len(jobs), failures, in_total, out_total, elapsed,
+                  elapsed / max(len(jobs), 1) * 1e6), file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv)
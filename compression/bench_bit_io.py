@@ -0,0 +1,118 @@
+##################################################################################
+
+"""
+A script to compare the throughput of BinaryReader with the original bit list
+reader it replaced, which read one byte at a time and served bits with
+list.pop(0). A seeded stream of random codes is written with BinaryWriter and
+read back by both readers, which must agree on every code.
+"""
+
+import sys
+import time
+import random
+import argparse
+
+from io import BytesIO
+
+from prefix_compression import BinaryWriter, padded_base
+from bytes_decompression import from_base
+from prefix_decompression import BinaryReader, EndOfBinaryFile
+
+from typing import *
+
+class BitListReader:
+    """
+    The original BinaryReader, kept as a reference point for benchmarking.
+    """
+
+    def __init__(self, in_file: BinaryIO) -> None:
+        self.bit_buffer: List[int] = []
+        self.in_file: BinaryIO = in_file
+
+    def _read_byte_into_buffer(self) -> None:
+        byte: bytes = self.in_file.read(1)
+
+        if not byte:
+            raise EndOfBinaryFile
+
+        self.bit_buffer = list(padded_base(2, byte[0], 8))
+
+    def read_bit(self) -> int:
+        if not self.bit_buffer:
+           self._read_byte_into_buffer()
+
+        return self.bit_buffer.pop(0)
+
+    def read_bits(self, n: int) -> int:
+        return from_base(2, [self.read_bit() for _ in range(n)])
+
+def random_codes(n: int, seed: int = 0) -> List[Tuple[int, int]]:
+    """
+    Generate a reproducible list of random codes, with lengths between 1 and
+    20 bits, similar to the prefix codes of a large vocabulary.
+
+    Parameters:
+    n - int - number of codes to generate
+    seed - int - seed for the random number generator
+
+    Return:
+    List[Tuple[int, int]] - list of (value, length) codes
+    """
+
+    rand: random.Random = random.Random(seed)
+    length: int
+    return [(rand.getrandbits(length), length)
+            for length in (rand.randint(1, 20) for _ in range(n))]
+
+def time_reader(reader_class: type, data: bytes,
+      lengths: List[int]) -> Tuple[float, List[int]]:
+    """
+    Time reading a series of codes of given lengths with a reader class.
+
+    Parameters:
+    reader_class - type - BinaryReader or BitListReader
+    data - bytes - the encoded data to read
+    lengths - List[int] - the length of each code to read
+
+    Return:
+    Tuple[float, List[int]] - the time taken in seconds and the values read
+    """
+
+    reader: Any = reader_class(BytesIO(data))
+    start: float = time.perf_counter()
+    length: int
+    values: List[int] = [reader.read_bits(length) for length in lengths]
+    return time.perf_counter() - start, values
+
+def main(argv: List[str]) -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--codes", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args: argparse.Namespace = parser.parse_args(argv[1:])
+
+    codes: List[Tuple[int, int]] = random_codes(args.codes, args.seed)
+    out_file: BytesIO = BytesIO()
+    bw: BinaryWriter = BinaryWriter(out_file)
+    bw.write_codes(codes)
+    bw.flush()
+    data: bytes = out_file.getvalue()
+    lengths: List[int] = [length for _, length in codes]
+    expected: List[int] = [value for value, _ in codes]
+
+    print(f"{len(codes)} codes, {len(data)} bytes")
+    times: Dict[str, float] = {}
+    reader_class: type
+    for reader_class in (BitListReader, BinaryReader):
+        elapsed: float
+        values: List[int]
+        elapsed, values = time_reader(reader_class, data, lengths)
+        if values != expected:
+            sys.exit(f"{reader_class.__name__} read back the wrong codes")
+        times[reader_class.__name__] = elapsed
+        print(f"{reader_class.__name__:>14}: {elapsed:8.3f}s "
+              f"{len(data) / elapsed / 1e6:8.2f} MB/s "
+              f"{len(codes) / elapsed / 1e6:8.2f} Mcodes/s")
+    print(f"speedup: {times['BitListReader'] / times['BinaryReader']:.1f}x")
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,416 @@
+##################################################################################
+
+"""
+A script to benchmark every compressor and decompressor pair over a fixed set of
+corpora, alongside zlib, bz2 and lzma from the standard library. Each codec is
+run as a separate process, from a file to a file, so that its peak resident
+memory can be taken from the operating system. For each pair and corpus, the
+throughput of compression and decompression, the compression ratio, the peak
+RSS of each process and whether the round trip gave back the expected text are
+recorded. Lossy codecs are expected to give back the words of the corpus,
+separated by spaces.
+
+The results are printed as a table, and can be written as JSON with --json, to
+be compared against a later run with --baseline.
+
+Example usage:
+    $ python bench_codecs.py --json results.json
+    $ python bench_codecs.py --baseline results.json --codecs lzw lossless
+"""
+
+import io
+import os
+import sys
+import bz2
+import lzma
+import zlib
+import json
+import time
+import argparse
+import shutil
+import filecmp
+import platform
+import tempfile
+import subprocess
+
+from readable_compression import get_words
+from synthetic_corpus import generate_text, parse_size
+
+from typing import *
+
+HERE: str = os.path.dirname(os.path.abspath(__file__))
+TEXT_DIR: str = os.path.join(HERE, os.pardir, "text")
+
+# name: (compressor, decompressor, extra flags for both, lossless)
+CODECS: Dict[str, Tuple[str, str, List[str], bool]] = {
+    "readable": ("readable_compression.py", "readable_decompression.py", [],
+                 False),
+    "sorted": ("sorted_compression.py", "readable_decompression.py", [], False),
+    "bytes": ("bytes_compression.py", "bytes_decompression.py", [], False),
+    "prefix": ("prefix_compression.py", "prefix_decompression.py", [], False),
+    "prefix-huffman": ("prefix_compression.py", "prefix_decompression.py",
+                       ["--coder", "huffman"], False),
+    "lossless": ("lossless_compression.py", "lossless_decompression.py", [],
+                 True),
+    "lossless-huffman": ("lossless_compression.py",
+                         "lossless_decompression.py", ["--coder", "huffman"],
+                         True),
+    "lzw": ("lzw_compression.py", "lzw_decompression.py", [], True),
+    "lzw-bytes": ("lzw_compression.py", "lzw_decompression.py", ["--bytes"],
+                  True),
+}
+
+# name: (compress, decompress), run through this script with --stdlib
+STDLIB: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "zlib": (lambda data: zlib.compress(data, 9), zlib.decompress),
+    "bz2": (lambda data: bz2.compress(data, 9), bz2.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+def get_corpora(extra: Iterable[str], synthetic_size: int, tmp: str
+      ) -> Dict[str, str]:
+    """
+    Find the corpora to benchmark on. These are every text file in the text
+    directory, the source of the codecs themselves, and two seeded synthetic
+    texts from synthetic_corpus, one of them dense with punctuation, along with
+    any extra files given. The corpora which aren't files already are written
+    to the temporary directory a chunk at a time, so that none of them is held
+    in memory.
+
+    Parameters:
+    extra - Iterable[str] - paths of more text files to use
+    synthetic_size - int - the number of characters of each synthetic text
+    tmp - str - a directory for the corpora which are built
+
+    Return:
+    Dict[str, str] - the path of each corpus, by name
+    """
+
+    corpora: Dict[str, str] = {}
+    paths: List[str] = sorted(os.path.join(TEXT_DIR, name)
+                              for name in os.listdir(TEXT_DIR)
+                              if name.endswith(".txt"))
+    path: str
+    for path in paths + list(extra):
+        corpora[os.path.splitext(os.path.basename(path))[0]] = path
+
+    corpora["source"] = os.path.join(tmp, "source.txt")
+    with open(corpora["source"], "wb") as out_file:
+        name: str
+        for name in sorted(os.listdir(HERE)):
+            if (not name.startswith("test_") and (name.endswith("_compression.py")
+                    or name.endswith("_decompression.py"))):
+                with open(os.path.join(HERE, name), "rb") as in_file:
+                    shutil.copyfileobj(in_file, out_file)
+    corpora["synthetic"] = os.path.join(tmp, "synthetic.txt")
+    with open(corpora["synthetic"], "w") as out_file:
+        out_file.writelines(generate_text(synthetic_size))
+    corpora["synthetic_punct"] = os.path.join(tmp, "synthetic_punct.txt")
+    with open(corpora["synthetic_punct"], "w") as out_file:
+        out_file.writelines(generate_text(synthetic_size, seed=1,
+                                          punctuation=0.6))
+    return corpora
+
+def write_words(in_file: TextIO, out_file: TextIO) -> None:
+    """
+    Write the words of a corpus, separated by spaces, which is the text that a
+    lossy codec should give back for it.
+
+    Example usage:
+    >>> out_file = io.StringIO()
+    >>> write_words(io.StringIO("Don't panic!\\n"), out_file)
+    >>> out_file.getvalue()
+    'DONT PANIC'
+
+    Parameters:
+    in_file - TextIO - the corpus to read
+    out_file - TextIO - the file to write the words to
+
+    Return:
+    None
+    """
+
+    separator: str = ""
+    word: str
+    for word in get_words(in_file):
+        out_file.write(separator + word)
+        separator = " "
+
+# a bare interpreter which runs a command and reports its time and peak RSS.
+# ru_maxrss starts from the high water mark of the process that forked the
+# command, so the command mustn't be forked from this one, which has every
+# module of the benchmark loaded, but from this, which holds nothing
+LAUNCHER: str = """
+import os, sys, time
+start = time.perf_counter()
+pid = os.fork()
+if pid == 0:
+    try:
+        os.execvp(sys.argv[2], sys.argv[2:])
+    finally:
+        os._exit(127)
+_, status, usage = os.wait4(pid, 0)
+with open(sys.argv[1], "w") as report:
+    report.write("{} {}".format(time.perf_counter() - start, usage.ru_maxrss))
+code = os.waitstatus_to_exitcode(status)
+sys.exit(code if code >= 0 else 128 - code)
+"""
+
+def run_measured(argv: List[str], in_path: str, out_path: str
+      ) -> Tuple[float, int]:
+    """
+    Run a command from one file to another, timing it and finding its peak
+    resident memory, through LAUNCHER.
+
+    Parameters:
+    argv - List[str] - the command to run
+    in_path - str - path of the file for its stdin
+    out_path - str - path of the file for its stdout
+
+    Return:
+    Tuple[float, int] - the time taken in seconds, and the peak RSS in KiB
+    """
+
+    report_path: str = out_path + ".usage"
+    with open(in_path, "rb") as in_file, open(out_path, "wb") as out_file:
+        subprocess.run([sys.executable, "-I", "-S", "-c", LAUNCHER, report_path]
+                       + argv, stdin=in_file, stdout=out_file, check=True)
+    with open(report_path) as report:
+        elapsed: str
+        rss: str
+        elapsed, rss = report.read().split()
+    os.remove(report_path)
+    # ru_maxrss is in KiB on Linux, but in bytes on macOS
+    return float(elapsed), int(rss) // (1024 if sys.platform == "darwin" else 1)
+
+def codec_commands(name: str) -> Tuple[List[str], List[str], bool]:
+    """
+    Find the commands to compress and decompress with a codec.
+
+    Parameters:
+    name - str - the name of a codec in CODECS or STDLIB
+
+    Return:
+    Tuple[List[str], List[str], bool] - the compressor, the decompressor, and
+     whether the codec is lossless
+    """
+
+    if name in STDLIB:
+        this: str = os.path.abspath(__file__)
+        return ([sys.executable, this, "--stdlib", name],
+                [sys.executable, this, "--stdlib", name, "--decompress"], True)
+    compressor: str
+    decompressor: str
+    flags: List[str]
+    lossless: bool
+    compressor, decompressor, flags, lossless = CODECS[name]
+    return ([sys.executable, os.path.join(HERE, compressor)] + flags,
+            [sys.executable, os.path.join(HERE, decompressor)] + flags, lossless)
+
+def bench_pair(name: str, corpus: str, in_path: str, tmp: str,
+      repeat: int) -> Dict[str, Any]:
+    """
+    Benchmark a codec on a corpus, keeping the fastest of a number of runs and
+    the largest peak RSS.
+
+    Parameters:
+    name - str - the name of the codec
+    corpus - str - the name of the corpus
+    in_path - str - path of the corpus
+    tmp - str - a directory for temporary files
+    repeat - int - the number of times to run each command
+
+    Return:
+    Dict[str, Any] - the result, as written to JSON
+    """
+
+    compressor: List[str]
+    decompressor: List[str]
+    lossless: bool
+    compressor, decompressor, lossless = codec_commands(name)
+    compressed: str = os.path.join(tmp, "compressed")
+    decompressed: str = os.path.join(tmp, "decompressed")
+    size: int = os.path.getsize(in_path)
+
+    comp_times: List[float] = []
+    decomp_times: List[float] = []
+    comp_rss: int = 0
+    decomp_rss: int = 0
+    for _ in range(repeat):
+        elapsed: float
+        rss: int
+        elapsed, rss = run_measured(compressor, in_path, compressed)
+        comp_times.append(elapsed)
+        comp_rss = max(comp_rss, rss)
+        elapsed, rss = run_measured(decompressor, compressed, decompressed)
+        decomp_times.append(elapsed)
+        decomp_rss = max(decomp_rss, rss)
+
+    expected: str = in_path
+    if not lossless:
+        expected = os.path.join(tmp, "expected")
+        with open(in_path) as in_file, open(expected, "w") as out_file:
+            write_words(in_file, out_file)
+    round_trip: bool = filecmp.cmp(expected, decompressed, shallow=False)
+    compressed_size: int = os.path.getsize(compressed)
+    return {
+        "codec": name,
+        "corpus": corpus,
+        "lossless": lossless,
+        "input_bytes": size,
+        "compressed_bytes": compressed_size,
+        "ratio": compressed_size / size if size else None,
+        "compress_seconds": min(comp_times),
+        "decompress_seconds": min(decomp_times),
+        "compress_mb_s": size / min(comp_times) / 1e6,
+        "decompress_mb_s": size / min(decomp_times) / 1e6,
+        "compress_peak_rss_kib": comp_rss,
+        "decompress_peak_rss_kib": decomp_rss,
+        "round_trip": round_trip,
+    }
+
+def get_environment() -> Dict[str, Any]:
+    """
+    Describe the environment that the benchmark was run in, so that results
+    from different runs can be told apart.
+
+    Return:
+    Dict[str, Any] - the versions of Python, the platform and the git commit
+    """
+
+    try:
+        commit: Optional[str] = subprocess.run(["git", "rev-parse", "HEAD"],
+                cwd=HERE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                universal_newlines=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+def format_change(new: float, old: Optional[float]) -> str:
+    """
+    Format how a figure has changed from a baseline, as a factor.
+
+    Example usage:
+    >>> format_change(3.0, 2.0)
+    ' 1.50x'
+    >>> format_change(3.0, None)
+    '      '
+    """
+
+    return " " * 6 if not old else "{:5.2f}x".format(new / old)
+
+def print_results(results: List[Dict[str, Any]],
+      baseline: Dict[Tuple[str, str], Dict[str, Any]]) -> None:
+    """
+    Print results as a table, with the change in throughput from the baseline,
+    if there is one.
+
+    Parameters:
+    results - List[Dict[str, Any]] - results from bench_pair
+    baseline - Dict[Tuple[str, str], Dict[str, Any]] - baseline results, by
+     codec and corpus
+
+    Return:
+    None
+    """
+
+    print("{:<17} {:<16} {:>6} {:>8} {:>6} {:>8} {:>6} {:>9} {:>9} {}".format(
+          "codec", "corpus", "ratio", "comp", "", "decomp", "", "comp RSS",
+          "dec RSS", "ok"))
+    result: Dict[str, Any]
+    for result in results:
+        old: Dict[str, Any] = baseline.get((result["codec"], result["corpus"]),
+                                           {})
+        print("{:<17} {:<16} {:>6.3f} {:>8.2f} {} {:>8.2f} {} {:>8}K {:>8}K {}"
+              .format(result["codec"], result["corpus"], result["ratio"] or 0,
+                      result["compress_mb_s"],
+                      format_change(result["compress_mb_s"],
+                                    old.get("compress_mb_s")),
+                      result["decompress_mb_s"],
+                      format_change(result["decompress_mb_s"],
+                                    old.get("decompress_mb_s")),
+                      result["compress_peak_rss_kib"],
+                      result["decompress_peak_rss_kib"],
+                      "yes" if result["round_trip"] else "NO"))
+
+def run_stdlib(name: str, decompress: bool) -> None:
+    """
+    Compress or decompress stdin to stdout with a codec from the standard
+    library, as a baseline.
+
+    Parameters:
+    name - str - the name of a codec in STDLIB
+    decompress - bool - whether to decompress rather than compress
+
+    Return:
+    None
+    """
+
+    sys.stdout.buffer.write(STDLIB[name][decompress](sys.stdin.buffer.read()))
+
+def main(argv: List[str]) -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--codecs", nargs="+", choices=list(CODECS) + list(STDLIB),
+                        default=list(CODECS) + list(STDLIB))
+    parser.add_argument("--corpus", nargs="+", default=[],
+                        help="more text files to benchmark on")
+    parser.add_argument("--synthetic-size", type=parse_size, default=1 << 20,
+                        help="characters of synthetic text, with an optional "
+                        "K, M or G")
+    parser.add_argument("--only-corpus", nargs="+",
+                        help="only benchmark on corpora with these names")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="take the fastest of this many runs")
+    parser.add_argument("--json", help="file to write the results to")
+    parser.add_argument("--baseline",
+                        help="JSON results of an earlier run to compare with")
+    parser.add_argument("--stdlib", choices=list(STDLIB),
+                        help=argparse.SUPPRESS)
+    parser.add_argument("--decompress", action="store_true",
+                        help=argparse.SUPPRESS)
+    args: argparse.Namespace = parser.parse_args(argv[1:])
+
+    if args.stdlib:
+        run_stdlib(args.stdlib, args.decompress)
+        return
+
+    baseline: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = {(result["codec"], result["corpus"]): result
+                        for result in json.load(baseline_file)["results"]}
+
+    results: List[Dict[str, Any]] = []
+    sizes: Dict[str, int] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        corpora: Dict[str, str] = get_corpora(args.corpus, args.synthetic_size,
+                                              tmp)
+        corpus: str
+        path: str
+        for corpus, path in corpora.items():
+            if args.only_corpus and corpus not in args.only_corpus:
+                continue
+            sizes[corpus] = os.path.getsize(path)
+            codec: str
+            for codec in args.codecs:
+                results.append(bench_pair(codec, corpus, path, tmp, args.repeat))
+
+    print_results(results, baseline)
+    if args.json:
+        with open(args.json, "w") as out_file:
+            json.dump({"environment": get_environment(),
+                       "corpora": sizes,
+                       "results": results}, out_file, indent=2)
+            out_file.write("\n")
+    if not all(result["round_trip"] for result in results):
+        sys.exit("some round trips failed")
+
+if __name__ == "__main__":
+    main(sys.argv)
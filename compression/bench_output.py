@@ -0,0 +1,94 @@
+##################################################################################
+
+"""
+A script to compare writing decompressed text one word at a time, as the
+decompressors used to, with write_batched at a few batch sizes. A seeded
+stream of words from a Zipf-like vocabulary is written to a temporary text
+file by each method, and the files must be identical.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+from readable_decompression import WRITE_BATCH, write_batched
+
+from typing import *
+
+def random_words(n: int, seed: int) -> List[str]:
+    """
+    Generate a seeded series of words, drawn from a vocabulary where the
+    frequency of a word falls off with its rank.
+
+    Parameters:
+    n - int - number of words to generate
+    seed - int - seed for the random number generator
+
+    Return:
+    List[str] - the words
+    """
+
+    rng: random.Random = random.Random(seed)
+    vocabulary: List[str] = ["".join(rng.choice("ETAOINSHRDLU")
+                                     for _ in range(rng.randint(1, 9)))
+                             for _ in range(5000)]
+    weights: List[float] = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    return rng.choices(vocabulary, weights, k=n)
+
+def write_each(out_file: TextIO, words: List[str]) -> None:
+    """
+    Write words separated by spaces with a call to write for each word and each
+    space, as the decompressors did before write_batched.
+    """
+
+    do_space: bool = False
+    word: str
+    for word in words:
+        if do_space:
+            out_file.write(" ")
+        else:
+            do_space = True
+        out_file.write(word)
+
+def time_writer(writer: Callable[[TextIO], None], path: str) -> float:
+    start: float = time.perf_counter()
+    with open(path, "w") as out_file:
+        writer(out_file)
+    return time.perf_counter() - start
+
+def main(argv: List[str]) -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-sizes", type=int, nargs="+",
+                        default=[64, 1024, WRITE_BATCH, 1 << 16])
+    args: argparse.Namespace = parser.parse_args(argv[1:])
+
+    words: List[str] = random_words(args.words, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        expected_path: str = os.path.join(tmp, "each.txt")
+        base: float = time_writer(lambda out_file: write_each(out_file, words),
+                                  expected_path)
+        with open(expected_path) as expected_file:
+            expected: str = expected_file.read()
+        print(f"{len(words)} words, {len(expected)} characters")
+        print(f"{'write each':>16}: {base:8.3f}s "
+              f"{len(expected) / base / 1e6:8.2f} MB/s")
+
+        batch_size: int
+        for batch_size in args.batch_sizes:
+            path: str = os.path.join(tmp, f"batched_{batch_size}.txt")
+            elapsed: float = time_writer(lambda out_file: write_batched(
+                    out_file, words, " ", batch_size), path)
+            with open(path) as batched_file:
+                if batched_file.read() != expected:
+                    sys.exit(f"batch size {batch_size} wrote the wrong text")
+            print(f"{'batch ' + str(batch_size):>16}: {elapsed:8.3f}s "
+                  f"{len(expected) / elapsed / 1e6:8.2f} MB/s "
+                  f"{base / elapsed:6.1f}x")
+
+if __name__ == "__main__":
+    main(sys.argv)
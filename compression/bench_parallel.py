@@ -0,0 +1,85 @@
+##################################################################################
+
+"""
+A script to measure how the throughput of the block compressors scales with the
+number of worker processes. It runs a compressor and its decompressor with
+increasing values of --jobs over a corpus, checks the round trip, and prints
+the throughput of each run.
+
+Example usage:
+    $ python bench_parallel.py --input ../text/shakespeare.txt --jobs 1 2 4 8
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+import tempfile
+
+from typing import *
+
+def run_codec(script: str, in_path: str, out_path: str,
+      argv: List[str]) -> float:
+    """
+    Run a compression or decompression script on a file, and time it.
+
+    Parameters:
+    script - str - the script to run, in the same directory as this one
+    in_path - str - path of the file to read from
+    out_path - str - path of the file to write to
+    argv - List[str] - extra arguments for the script
+
+    Return:
+    float - the time taken in seconds
+    """
+
+    here: str = os.path.dirname(os.path.abspath(__file__))
+    start: float = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(here, script), "--input",
+                    in_path, "--output", out_path] + argv, check=True)
+    return time.perf_counter() - start
+
+def main(argv: List[str]) -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--input", required=True)
+    parser.add_argument("--codec", choices=["lossless", "prefix"],
+                        default="lossless")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--block-size", type=int, default=1 << 20)
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="concatenate the input this many times")
+    args: argparse.Namespace = parser.parse_args(argv[1:])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        in_path: str = os.path.join(tmp, "input.txt")
+        with open(args.input) as in_file, open(in_path, "w") as corpus:
+            text: str = in_file.read()
+            corpus.write(text * args.repeat)
+        size: int = os.path.getsize(in_path)
+        print(f"{args.codec}: {size} bytes, blocks of {args.block_size}")
+        print(f"{'jobs':>4} {'compress MB/s':>14} {'decompress MB/s':>16} "
+              f"{'speedup':>8}")
+
+        base: Optional[float] = None
+        jobs: int
+        for jobs in args.jobs:
+            flags: List[str] = ["--jobs", str(jobs)]
+            compressed: str = os.path.join(tmp, "compressed")
+            decompressed: str = os.path.join(tmp, "decompressed")
+            comp_time: float = run_codec(f"{args.codec}_compression.py",
+                    in_path, compressed,
+                    flags + ["--block-size", str(args.block_size)])
+            decomp_time: float = run_codec(f"{args.codec}_decompression.py",
+                    compressed, decompressed, flags)
+            if args.codec == "lossless":
+                with open(in_path) as a, open(decompressed) as b:
+                    if a.read() != b.read():
+                        sys.exit(f"round trip failed with {jobs} jobs")
+            base = base or comp_time + decomp_time
+            print(f"{jobs:>4} {size / comp_time / 1e6:>14.2f} "
+                  f"{size / decomp_time / 1e6:>16.2f} "
+                  f"{base / (comp_time + decomp_time):>7.2f}x")
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,340 @@
+##################################################################################
+
+"""
+Functions to split a text into blocks which are compressed independently, and
+to write each compressed block as a frame, so that memory use depends on the
+size of a block rather than the size of the whole text. A framed file starts
+with a marker byte which no other header starts with, and each frame is the
+length of the compressed block, encoded as with bytes_compression and
+terminated by a 255 byte, followed by the compressed block itself. As blocks are
+independent, they can be compressed and decompressed by a pool of processes.
+
+An archive is framed in the same way, but starts with its own marker, and its
+frames are followed by a lone 255 byte, which no frame starts with, and then an
+index of where each frame starts in the file and the position in the text where
+each block starts, so that a range of the text can be decompressed by seeking
+straight to the blocks that hold it. The index ends with a fixed size trailer,
+of the offset of the index and the archive marker, so that it can be found from
+the end of the file.
+"""
+
+import string
+import argparse
+import functools
+import collections
+import multiprocessing
+
+from bytes_compression import encode_pointer
+from flags import flag_parser
+
+from typing import *
+
+BLOCK_MARKER: bytes = b"\xfd"
+ARCHIVE_MARKER: bytes = b"\xfb"
+# the offset of the index, in eight bytes, followed by the archive marker
+TRAILER_SIZE: int = 9
+DEFAULT_BLOCK_SIZE: int = 1 << 20
+
+WHITESPACE: Set[str] = set(string.whitespace)
+
+T = TypeVar("T")
+U = TypeVar("U")
+
+def get_block_size(argv: List[str]) -> Optional[int]:
+    """
+    Parse the size of blocks to split a text into from given arguments, using
+    the --block-size flag.
+
+    Example usage:
+    >>> get_block_size(["--block-size", "1000"])
+    1000
+    >>> get_block_size([]) is None
+    True
+
+    Parameters:
+    argv - List[str] - list of arguments to parse (and modify)
+
+    Return:
+    Optional[int] - the number of characters in each block, or None if the text
+     should not be split into blocks
+    """
+
+    parser: argparse.ArgumentParser = flag_parser("--block-size", type=int)
+    args: argparse.Namespace
+    remaining: List[str]
+    args, remaining = parser.parse_known_args(argv)
+    argv[:] = remaining
+    if args.block_size is not None and args.block_size < 1:
+        parser.error("--block-size must be positive")
+    return args.block_size
+
+def get_archive(argv: List[str]) -> bool:
+    """
+    Parse whether to write a seekable archive from given arguments, using the
+    --archive flag.
+
+    Example usage:
+    >>> get_archive(["--archive"])
+    True
+    >>> get_archive([])
+    False
+
+    Parameters:
+    argv - List[str] - list of arguments to parse (and modify)
+
+    Return:
+    bool - whether to write an archive
+    """
+
+    parser: argparse.ArgumentParser = flag_parser("--archive",
+                                                  action="store_true")
+    args: argparse.Namespace
+    remaining: List[str]
+    args, remaining = parser.parse_known_args(argv)
+    argv[:] = remaining
+    return args.archive
+
+def get_jobs(argv: List[str]) -> int:
+    """
+    Parse the number of processes to compress or decompress blocks with from
+    given arguments, using the --jobs flag.
+
+    Example usage:
+    >>> get_jobs(["--jobs", "4"])
+    4
+    >>> get_jobs([])
+    1
+
+    Parameters:
+    argv - List[str] - list of arguments to parse (and modify)
+
+    Return:
+    int - the number of processes to use
+    """
+
+    parser: argparse.ArgumentParser = flag_parser("--jobs", type=int, default=1)
+    args: argparse.Namespace
+    remaining: List[str]
+    args, remaining = parser.parse_known_args(argv)
+    argv[:] = remaining
+    if args.jobs < 1:
+        parser.error("--jobs must be positive")
+    return args.jobs
+
+def read_blocks(in_file: TextIO, block_size: int,
+      whole_words: bool = False) -> Generator[str, None, None]:
+    """
+    Read a text file in blocks of a given number of characters. Blocks can be
+    made to end on whitespace, so that no word is split between two blocks, in
+    which case what follows the last whitespace of a block is carried over to
+    the next. Only a word longer than block_size is split, so that the carry
+    never grows past a block.
+
+    Example usage:
+    >>> get_input_result(read_blocks, "abcdefg", [3], wrapper=list)
+    ['abc', 'def', 'g']
+    >>> get_input_result(read_blocks, "ab cdefg h", [3, True], wrapper=list)
+    ['ab ', 'cdefg ', 'h']
+    >>> get_input_result(read_blocks, "abcdefg", [3, True], wrapper=list)
+    ['abcdef', 'g']
+
+    Parameters:
+    in_file - TextIO - text file to read from
+    block_size - int - number of characters in each block
+    whole_words - bool - whether blocks should end on whitespace. defaults to
+     False
+
+    Return:
+    Generator[str, None, None] - generator of blocks of text
+    """
+
+    carry: str = ""
+    chunk: str
+    for chunk in iter(lambda: in_file.read(block_size), ""):
+        if not whole_words:
+            yield chunk
+            continue
+        block: str = carry + chunk
+        end: int = max(block.rfind(char) for char in WHITESPACE) + 1
+        if len(block) - end > block_size:
+            end = len(block)
+        if end:
+            yield block[:end]
+        carry = block[end:]
+    if carry:
+        yield carry
+
+def ordered_map(function: Callable[[T], U], items: Iterable[T],
+      jobs: int) -> Generator[U, None, None]:
+    """
+    Apply a function to a series of items, using a pool of processes if more
+    than one job is requested, and yield the results in the original order.
+    Only a few items per process are in flight at once, so memory use stays
+    bounded however many items there are.
+
+    Example usage:
+    >>> list(ordered_map(abs, [-1, 2, -3], 2))
+    [1, 2, 3]
+
+    Parameters:
+    function - Callable[[T], U] - function to apply, which must be picklable
+    items - Iterable[T] - items to apply it to
+    jobs - int - number of processes to use
+
+    Return:
+    Generator[U, None, None] - generator of results
+    """
+
+    if jobs == 1:
+        yield from map(function, items)
+        return
+
+    with multiprocessing.Pool(jobs) as pool:
+        pending: Deque[multiprocessing.pool.AsyncResult] = collections.deque()
+        item: T
+        for item in items:
+            pending.append(pool.apply_async(function, (item,)))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+def write_frame(out_binary: BinaryIO, block: bytes) -> None:
+    """
+    Write a compressed block to a file as a frame.
+
+    Example usage:
+    >>> get_output_result(write_frame, [b"abc"], binary=True)
+    b'\\x03\\xffabc'
+
+    Parameters:
+    out_binary - BinaryIO - binary file to write to
+    block - bytes - the compressed block
+
+    Return:
+    None
+    """
+
+    out_binary.write(encode_pointer(len(block)) + b"\xff")
+    out_binary.write(block)
+
+def compress_blocks(in_file: TextIO, out_binary: BinaryIO, block_size: int,
+      compress_block: Callable[[str], bytes], jobs: int = 1,
+      whole_words: bool = False) -> None:
+    """
+    Compress a text file block by block, writing the block marker followed by
+    a frame for each block, in order.
+
+    Parameters:
+    in_file - TextIO - text file to read from
+    out_binary - BinaryIO - binary file to write to
+    block_size - int - number of characters in each block
+    compress_block - Callable[[str], bytes] - function to compress a single
+     block of text. must be picklable if jobs is more than 1
+    jobs - int - number of processes to compress blocks with. defaults to 1
+    whole_words - bool - whether blocks should end on whitespace. defaults to
+     False
+
+    Return:
+    None
+    """
+
+    out_binary.write(BLOCK_MARKER)
+    block: bytes
+    for block in ordered_map(compress_block,
+                             read_blocks(in_file, block_size, whole_words), jobs):
+        write_frame(out_binary, block)
+
+def measure_block(block: str, compress_block: Callable[[str], bytes],
+      measure: Callable[[str], int]) -> Tuple[int, bytes]:
+    """
+    Compress a single block of text, and find its length in the units that
+    positions in an archive are given in.
+
+    Example usage:
+    >>> measure_block("abc", str.encode, len)
+    (3, b'abc')
+
+    Parameters:
+    block - str - the text to compress
+    compress_block - Callable[[str], bytes] - function to compress it
+    measure - Callable[[str], int] - function to find its length
+
+    Return:
+    Tuple[int, bytes] - the length of the block and the compressed block
+    """
+
+    return measure(block), compress_block(block)
+
+def write_index(out_binary: BinaryIO, offsets: List[int], starts: List[int],
+      index_offset: int) -> None:
+    """
+    Write the index of an archive: the number of blocks, the offset of each
+    frame and the position where each block starts, followed by the position
+    where the text ends, each encoded as with bytes_compression and terminated
+    by a 255 byte, and then the trailer.
+
+    Example usage:
+    >>> get_output_result(write_index, [[1], [0, 3], 6], binary=True)
+    b'\\x01\\xff\\x01\\xff\\x00\\xff\\x03\\xff\\x06\\x00\\x00\\x00\\x00\\x00\\x00\\x00\\xfb'
+
+    Parameters:
+    out_binary - BinaryIO - binary file to write to
+    offsets - List[int] - the offset in the file of each frame
+    starts - List[int] - the position where each block starts, and where the
+     last one ends
+    index_offset - int - the offset in the file of the index itself
+
+    Return:
+    None
+    """
+
+    n: int
+    out_binary.write(b"".join(encode_pointer(n) + b"\xff"
+                              for n in [len(offsets)] + offsets + starts)
+                     + index_offset.to_bytes(TRAILER_SIZE - 1, "little")
+                     + ARCHIVE_MARKER)
+
+def compress_archive(in_file: TextIO, out_binary: BinaryIO, block_size: int,
+      compress_block: Callable[[str], bytes], measure: Callable[[str], int],
+      jobs: int = 1, whole_words: bool = False) -> None:
+    """
+    Compress a text file block by block into a seekable archive, writing the
+    archive marker followed by a frame for each block, in order, and then the
+    end of the frames and the index. Offsets are counted as frames are written,
+    so that the output need not be seekable.
+
+    Parameters:
+    in_file - TextIO - text file to read from
+    out_binary - BinaryIO - binary file to write to
+    block_size - int - number of characters in each block
+    compress_block - Callable[[str], bytes] - function to compress a single
+     block of text. must be picklable if jobs is more than 1
+    measure - Callable[[str], int] - function to find the length of a block in
+     the units of positions in the text, such as words or characters. must be
+     picklable if jobs is more than 1
+    jobs - int - number of processes to compress blocks with. defaults to 1
+    whole_words - bool - whether blocks should end on whitespace. defaults to
+     False
+
+    Return:
+    None
+    """
+
+    out_binary.write(ARCHIVE_MARKER)
+    offset: int = len(ARCHIVE_MARKER)
+    offsets: List[int] = []
+    starts: List[int] = [0]
+    size: int
+    block: bytes
+    for size, block in ordered_map(functools.partial(measure_block,
+                                   compress_block=compress_block,
+                                   measure=measure),
+                                   read_blocks(in_file, block_size, whole_words),
+                                   jobs):
+        offsets.append(offset)
+        starts.append(starts[-1] + size)
+        write_frame(out_binary, block)
+        offset += len(encode_pointer(len(block))) + 1 + len(block)
+    out_binary.write(b"\xff")
+    write_index(out_binary, offsets, starts, offset + 1)
@@ -0,0 +1,262 @@
+##################################################################################
+
+"""
+Functions to read the frames written by block_compression.py, and decompress
+them one block at a time, or only those which hold a range of the text in an
+archive.
+"""
+
+import os
+import bisect
+import argparse
+import itertools
+
+from bytes_decompression import decode_pointer, read_until
+from block_compression import ARCHIVE_MARKER, TRAILER_SIZE, ordered_map
+from flags import flag_parser
+
+from typing import *
+
+def read_frames(in_binary: BinaryIO) -> Generator[bytes, None, None]:
+    """
+    Read compressed blocks from the frames of a file, after the block marker,
+    until EOF or a lone 255 byte, which ends the frames of an archive.
+
+    Example usage:
+    >>> get_input_result(read_frames, b"\\x03\\xffabc\\x01\\xffd", [],
+    ... wrapper=list, binary=True)
+    [b'abc', b'd']
+    >>> get_input_result(read_frames, b"\\x01\\xffa\\xff\\x01\\xff", [],
+    ... wrapper=list, binary=True)
+    [b'a']
+
+    Parameters:
+    in_binary - BinaryIO - binary file to read from
+
+    Return:
+    Generator[bytes, None, None] - generator of compressed blocks
+    """
+
+    # the length of a frame always has at least one digit, so a frame never
+    # starts with a 255 byte
+    c: bytes = in_binary.read(1)
+    while c and c != b"\xff":
+        yield in_binary.read(decode_pointer(c + read_until(in_binary)))
+        c = in_binary.read(1)
+
+def decompress_blocks(in_binary: BinaryIO, out_file: TextIO,
+      decompress_block: Callable[[bytes], str], jobs: int = 1,
+      separator: str = "") -> None:
+    """
+    Decompress each block from the frames of a file, writing the output of the
+    blocks in order, as soon as it is ready.
+
+    Parameters:
+    in_binary - BinaryIO - binary file to read from, after the block marker
+    out_file - TextIO - text file to write to
+    decompress_block - Callable[[bytes], str] - function to decompress a single
+     block. must be picklable if jobs is more than 1
+    jobs - int - number of processes to decompress blocks with. defaults to 1
+    separator - str - text to write between the outputs of two non-empty
+     blocks. defaults to nothing
+
+    Return:
+    None
+    """
+
+    write_texts(out_file, ordered_map(decompress_block, read_frames(in_binary),
+                                      jobs), separator)
+
+def write_texts(out_file: TextIO, texts: Iterable[str],
+      separator: str = "") -> None:
+    """
+    Write the outputs of a series of blocks, with a separator between each two
+    which aren't empty.
+
+    Example usage:
+    >>> get_output_result(write_texts, [["A B", "", "C"], " "])
+    'A B C'
+
+    Parameters:
+    out_file - TextIO - text file to write to
+    texts - Iterable[str] - the output of each block
+    separator - str - text to write between two non-empty outputs. defaults to
+     nothing
+
+    Return:
+    None
+    """
+
+    written: bool = False
+    text: str
+    for text in texts:
+        if text:
+            if written:
+                out_file.write(separator)
+            out_file.write(text)
+            written = True
+
+def parse_range(text: str) -> Tuple[int, Optional[int]]:
+    """
+    Parse a range of positions in a text, as START:END, where END is not
+    included, and either can be left out.
+
+    Example usage:
+    >>> parse_range("10:20")
+    (10, 20)
+    >>> parse_range(":5")
+    (0, 5)
+    >>> parse_range("7:")
+    (7, None)
+
+    Parameters:
+    text - str - the range to parse
+
+    Return:
+    Tuple[int, Optional[int]] - the start and end of the range, where an end
+     of None is the end of the text
+    """
+
+    start: str
+    end: str
+    start, sep, end = text.partition(":")
+    try:
+        if not sep or int(start or 0) < 0 or int(end or 0) < 0:
+            raise ValueError(text)
+        return int(start or 0), int(end) if end else None
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid range: {!r}".format(text))
+
+def get_range(argv: List[str], in_binary: Optional[BinaryIO] = None
+      ) -> Optional[Tuple[int, Optional[int]]]:
+    """
+    Parse a range of an archive to decompress from given arguments, using the
+    --range flag. As the range is found through the index at the end of the
+    archive, the archive must be seekable, so the flag is an error for input
+    that isn't, such as a pipe.
+
+    Example usage:
+    >>> get_range(["--range", "100:200"])
+    (100, 200)
+    >>> get_range([]) is None
+    True
+
+    Parameters:
+    argv - List[str] - list of arguments to parse (and modify)
+    in_binary - Optional[BinaryIO] - the archive the range is of, to check
+     that it's seekable. defaults to None, for no check
+
+    Return:
+    Optional[Tuple[int, Optional[int]]] - the range, or None to decompress
+     the whole text
+    """
+
+    parser: argparse.ArgumentParser = flag_parser("--range", type=parse_range)
+    args: argparse.Namespace
+    remaining: List[str]
+    args, remaining = parser.parse_known_args(argv)
+    argv[:] = remaining
+    if (args.range is not None and in_binary is not None
+            and not in_binary.seekable()):
+        parser.error("--range needs a seekable archive, such as a file given "
+                     "with --input")
+    return args.range
+
+def read_index(in_binary: BinaryIO) -> Tuple[List[int], List[int]]:
+    """
+    Read the index of an archive, by seeking to the trailer at the end of the
+    file, and from there to the index.
+
+    Parameters:
+    in_binary - BinaryIO - binary file to read from, which must be seekable
+
+    Return:
+    Tuple[List[int], List[int]] - the offset of each frame, and the position
+     where each block starts, followed by the position where the text ends
+    """
+
+    try:
+        in_binary.seek(-TRAILER_SIZE, os.SEEK_END)
+    except (OSError, ValueError):
+        raise ValueError("--range needs a seekable archive, such as a file "
+                         "given with --input")
+    trailer: bytes = in_binary.read(TRAILER_SIZE)
+    if trailer[-1:] != ARCHIVE_MARKER:
+        raise ValueError("archive has no index")
+    in_binary.seek(int.from_bytes(trailer[:-1], "little"))
+    n_blocks: int = decode_pointer(read_until(in_binary))
+    numbers: List[int] = [decode_pointer(read_until(in_binary))
+                          for _ in range(2 * n_blocks + 1)]
+    return numbers[:n_blocks], numbers[n_blocks:]
+
+def slice_words(text: str, start: int, end: Optional[int]) -> str:
+    """
+    Take a range of the words of a block decompressed by a lossy decompressor,
+    which are separated by spaces.
+
+    Example usage:
+    >>> slice_words("A B C D", 1, 3)
+    'B C'
+    >>> slice_words("", 0, 1)
+    ''
+    """
+
+    return " ".join(text.split(" ")[start:end]) if text else ""
+
+def slice_text(text: str, start: int, end: Optional[int]) -> str:
+    """
+    Take a range of the characters of a decompressed block.
+
+    Example usage:
+    >>> slice_text("abcd", 1, None)
+    'bcd'
+    """
+
+    return text[start:end]
+
+def decompress_range(in_binary: BinaryIO, out_file: TextIO,
+      decompress_block: Callable[[bytes], str], start: int,
+      end: Optional[int], slice_block: Callable[[str, int, Optional[int]], str]
+      = slice_text, jobs: int = 1, separator: str = "") -> None:
+    """
+    Decompress a range of the text in an archive, by finding the blocks which
+    hold it in the index, seeking to the first of them, and decompressing only
+    those, trimming the first and last to the range.
+
+    Parameters:
+    in_binary - BinaryIO - binary file of the archive, which must be seekable
+    out_file - TextIO - text file to write to
+    decompress_block - Callable[[bytes], str] - function to decompress a single
+     block. must be picklable if jobs is more than 1
+    start - int - the first position to write
+    end - Optional[int] - the position after the last to write, or None for
+     the end of the text
+    slice_block - Callable[[str, int, Optional[int]], str] - function to take
+     a range of the output of a block, in the units of the positions in the
+     index. defaults to slice_text
+    jobs - int - number of processes to decompress blocks with. defaults to 1
+    separator - str - text to write between the outputs of two non-empty
+     blocks. defaults to nothing
+
+    Return:
+    None
+    """
+
+    offsets: List[int]
+    starts: List[int]
+    offsets, starts = read_index(in_binary)
+    first: int = max(bisect.bisect_right(starts, start) - 1, 0)
+    last: int = (len(offsets) if end is None
+                 else min(bisect.bisect_left(starts, end), len(offsets)))
+    if first >= last:
+        return
+    in_binary.seek(offsets[first])
+    frames: Iterator[bytes] = itertools.islice(read_frames(in_binary),
+                                               last - first)
+    ind: int
+    text: str
+    write_texts(out_file, (slice_block(text, max(start - starts[ind], 0),
+                                       None if end is None else end - starts[ind])
+                           for ind, text in enumerate(ordered_map(
+                               decompress_block, frames, jobs), first)),
+                separator)
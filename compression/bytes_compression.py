@@ -9,6 +9,8 @@ import sys
 
 from readable_compression import get_std_streams, get_words, write_pointers
 from sorted_compression import compile_pointers, compile_dictionary
+from profiling import profiled, stage
+import metrics
 
 from typing import *
 from typing.io  import *
@@ -96,13 +98,18 @@ def write_dictionary(bin_out: BinaryIO, words: List[str], separator: BinaryIO =
     bin_out.write(separator.join(bytes(i, encoding="ascii") for i in words) + end)
 
 def main(stdin: TextIO, stdout: BinaryIO, argv: List[str]):
-    words: List[str] = list(get_words(stdin))
-    words_dict: Dict[str, int]
-    keywords: List[str]
-    words_dict, keywords = compile_dictionary(words)
-    pointers: List[int] = compile_pointers(words, words_dict)
-    write_dictionary(stdout, keywords)
-    write_pointers(stdout, pointers, encode_pointer, b"\xff")
+    with profiled(argv), metrics.collected(argv):
+        with stage("tokenise"):
+            words: List[str] = list(get_words(stdin))
+        words_dict: Dict[str, int]
+        keywords: List[str]
+        with stage("compile dictionary"):
+            words_dict, keywords = compile_dictionary(words)
+        pointers: List[int] = compile_pointers(words, words_dict)
+        with stage("write dictionary"):
+            write_dictionary(stdout, keywords)
+        with stage("compile and write pointers"):
+            write_pointers(stdout, pointers, encode_pointer, b"\xff")
 
 if __name__ == "__main__":
     stdin: TextIO
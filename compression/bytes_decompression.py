@@ -5,14 +5,19 @@ A script to decompress a file compressed by bytes_compression.py - with
 pointers encoded using the full range of a byte.
 """
 
+import io
 import sys
 
 from readable_compression import get_std_streams
 from readable_decompression import decompress
+from profiling import profiled, stage
+import metrics
 
 from typing import *
 from typing.io import *
 
+READ_SIZE: int = 1 << 12
+
 def from_base(base: int, digits: Iterable[int]) -> int:
     """
     Convert a series of digits into an integer from a given base, where the
@@ -59,7 +64,60 @@ def decode_pointer(pointer: bytes) -> int:
 
     return from_base(255, pointer)
 
-def read_dictionary(in_file: BinaryIO, separator: BinaryIO = b" ", end: BinaryIO = b"\n") -> Generator[str, None, None]:
+def read_until(in_file: BinaryIO, end: bytes = b"\xff") -> bytes:
+    """
+    Read bytes from a binary file up to a given end byte, which is consumed but
+    not returned, or up to EOF. Files which can peek, such as buffered or
+    mapped files, are searched a buffer at a time, and other seekable files a
+    chunk at a time, seeking back past the end byte. Anything else is read one
+    byte at a time.
+
+    Example usage:
+    >>> get_input_result(read_until, b"ab\\xffcd", [], binary=True)
+    b'ab'
+    >>> get_input_result(read_until, b"abc", [b"\\n"], binary=True)
+    b'abc'
+
+    Parameters:
+    in_file - BinaryIO - the file to read from
+    end - bytes - the byte to read up to. defaults to 255
+
+    Return:
+    bytes - the bytes read, without the end byte
+    """
+
+    parts: List[bytes] = []
+    data: bytes
+    ind: int
+    if hasattr(in_file, "peek"):
+        data = in_file.peek(1)
+        while data:
+            ind = data.find(end)
+            if ind >= 0:
+                parts.append(in_file.read(ind + 1)[:-1])
+                break
+            parts.append(in_file.read(len(data)))
+            data = in_file.peek(1)
+    elif in_file.seekable():
+        data = in_file.read(READ_SIZE)
+        while data:
+            ind = data.find(end)
+            if ind >= 0:
+                parts.append(data[:ind])
+                in_file.seek(ind + 1 - len(data), io.SEEK_CUR)
+                break
+            parts.append(data)
+            data = in_file.read(READ_SIZE)
+    else:
+        c: bytes
+        for c in iter(lambda: in_file.read(1), b""):
+            if c == end:
+                break
+            parts.append(c)
+    return b"".join(parts)
+
+def read_dictionary(in_file: BinaryIO, separator: bytes = b" ",
+      end: bytes = b"\n") -> Generator[str, None, None]:
     """
     Reads and decodes into normal strings a list of unique words from binary
     file, until newline
@@ -74,22 +132,19 @@ def read_dictionary(in_file: BinaryIO, separator: BinaryIO = b" ", end: BinaryIO
 
     Parameters:
     in_file - BinaryIO - the file to read from
+    separator - bytes - the byte between words. defaults to space
+    end - bytes - the byte after the last word. defaults to newline
 
     Return:
     Generator[str, None, None] - generator of words read
     """
 
-    c: bytes = in_file.read(1)
-    word: List[bytes] = []
-    while c != end:
-        if c == separator:
-            yield b"".join(word).decode("ascii")
-            word = []
-        else:
-            word.append(c)
-        c = in_file.read(1)
-    if word:
-        yield b"".join(word).decode("ascii")
+    words: List[bytes] = read_until(in_file, end).split(separator)
+    if not words[-1]:
+        words.pop()
+    word: bytes
+    for word in words:
+        yield word.decode("ascii")
 
 def read_pointers(in_file: BinaryIO) -> Generator[int, None, None]:
     """
@@ -112,22 +167,22 @@ def read_pointers(in_file: BinaryIO) -> Generator[int, None, None]:
     Generator[int, None, None]
     """
 
-    c: bytes = in_file.read(1)
-    n: List[bytes] = []
-    while c:
-        if c == b"\xff":
-            yield decode_pointer(b"".join(n))
-            n = []
-        else:
-            n.append(c)
-        c = in_file.read(1)
-    if n:
-        yield decode_pointer(b"".join(n))
+    carry: bytes = b""
+    chunk: bytes
+    for chunk in iter(lambda: in_file.read(READ_SIZE), b""):
+        pointers: List[bytes] = (carry + chunk).split(b"\xff")
+        carry = pointers.pop()
+        yield from map(decode_pointer, pointers)
+    if carry:
+        yield decode_pointer(carry)
 
 def main(stdin: BinaryIO, stdout: TextIO, argv: List[str]) -> None:
-    words: List[str] = list(read_dictionary(stdin))
-    pointers: List[int] = read_pointers(stdin)
-    decompress(stdout, pointers, words)
+    with profiled(argv), metrics.collected(argv):
+        with stage("read dictionary"):
+            words: List[str] = list(read_dictionary(stdin))
+        pointers: List[int] = read_pointers(stdin)
+        with stage("read pointers and write"):
+            decompress(stdout, pointers, words)
 
 if __name__ == "__main__":
     stdin: BinaryIO
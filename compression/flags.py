@@ -0,0 +1,43 @@
+##################################################################################
+
+"""
+Parsers for the single flags which the codecs take from their arguments with
+parse_known_args. Each parser is built the first time its flag is parsed and
+kept for the rest of the process, so that running the main function of a codec
+on many files, as batch.py does, doesn't build them all again for every file.
+"""
+
+import argparse
+import functools
+
+from typing import *
+
+@functools.lru_cache(maxsize=None)
+def flag_parser(flag: str, allow_abbrev: bool = True, **kwargs: Any
+      ) -> argparse.ArgumentParser:
+    """
+    Get a parser for a single flag, building it only once for each set of
+    arguments.
+
+    Example usage:
+    >>> flag_parser("--jobs", type=int) is flag_parser("--jobs", type=int)
+    True
+    >>> flag_parser("--full", choices=("freeze", "reset")).parse_known_args(
+    ...     ["--full", "reset", "--jobs", "2"])
+    (Namespace(full='reset'), ['--jobs', '2'])
+
+    Parameters:
+    flag - str - the flag to parse
+    allow_abbrev - bool - whether abbreviations of the flag are taken for it.
+     defaults to True
+    kwargs - Any - arguments to add the flag with, as given to add_argument,
+     which must all be hashable, so choices are given as a tuple
+
+    Return:
+    argparse.ArgumentParser - the parser
+    """
+
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+            allow_abbrev=allow_abbrev)
+    parser.add_argument(flag, **kwargs)
+    return parser
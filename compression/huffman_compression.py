@@ -0,0 +1,161 @@
+##################################################################################
+
+"""
+Functions to build canonical Huffman codes for pointers, as an alternative to
+the prefix boundary codes of prefix_compression.py. As pointers are sorted by
+frequency, the code lengths never decrease from one pointer to the next, so the
+whole code is described by the number of codes of each length, which is all that
+is stored in the header.
+"""
+
+import heapq
+
+from bytes_compression import encode_pointer
+
+from typing import *
+
+HUFFMAN_MARKER: bytes = b"\xfe"
+
+def huffman_lengths(frequencies: List[int]) -> List[int]:
+    """
+    Find the optimal code length for each of a series of frequencies, using
+    Huffman's algorithm. The lengths are returned in ascending order, to be
+    assigned to symbols sorted by descending frequency - which is still optimal,
+    as any tied lengths can be swapped freely.
+
+    Example usage:
+    >>> huffman_lengths([5, 3, 1, 1])
+    [1, 2, 3, 3]
+    >>> huffman_lengths([1, 1, 1, 1])
+    [2, 2, 2, 2]
+    >>> huffman_lengths([7])
+    [1]
+
+    Parameters:
+    frequencies - List[int] - the frequency of each symbol
+
+    Return:
+    List[int] - the length of the code for each symbol, in ascending order
+    """
+
+    if len(frequencies) <= 1:
+        return [1] * len(frequencies)
+
+    heap: List[Tuple[int, int]] = [(freq, ind)
+                                   for ind, freq in enumerate(frequencies)]
+    heapq.heapify(heap)
+    parents: List[int] = [0] * len(frequencies)
+    while len(heap) > 1:
+        freq_a: int
+        freq_b: int
+        node_a: int
+        node_b: int
+        freq_a, node_a = heapq.heappop(heap)
+        freq_b, node_b = heapq.heappop(heap)
+        parents[node_a] = parents[node_b] = len(parents)
+        heapq.heappush(heap, (freq_a + freq_b, len(parents)))
+        parents.append(-1)
+
+    # internal nodes are always created after their children, so depths can be
+    # found by walking back from the root
+    depths: List[int] = [0] * len(parents)
+    node: int
+    for node in range(len(parents) - 2, -1, -1):
+        depths[node] = depths[parents[node]] + 1
+    return sorted(depths[:len(frequencies)])
+
+def length_counts(lengths: List[int]) -> List[int]:
+    """
+    Count the number of codes of each length, from 1 up to the longest length.
+
+    Example usage:
+    >>> length_counts([1, 2, 3, 3])
+    [1, 1, 2]
+    >>> length_counts([2, 2])
+    [0, 2]
+
+    Parameters:
+    lengths - List[int] - lengths of codes
+
+    Return:
+    List[int] - the number of codes of each length, where the first item
+     counts codes of length 1
+    """
+
+    counts: List[int] = [0] * max(lengths, default=0)
+    length: int
+    for length in lengths:
+        counts[length - 1] += 1
+    return counts
+
+def reverse_bits(value: int, length: int) -> int:
+    """
+    Reverse the order of the bits in an integer of a given length.
+
+    Example usage:
+    >>> reverse_bits(0b110, 3)
+    3
+    >>> reverse_bits(0b1, 4)
+    8
+
+    Parameters:
+    value - int - the value to reverse
+    length - int - the number of bits in the value
+
+    Return:
+    int - the reversed value
+    """
+
+    return int(format(value, f"0{length}b")[::-1], 2) if length else 0
+
+def canonical_codes(counts: List[int]) -> List[Tuple[int, int]]:
+    """
+    Generate the canonical Huffman codes for a list of counts of code lengths.
+    Codes are assigned in ascending numerical order, shortest first. As
+    BinaryWriter writes the least significant bit first, each code has its bits
+    reversed, so that it is read back from its most significant bit.
+
+    Example usage:
+    >>> canonical_codes([1, 1, 2])
+    [(0, 1), (1, 2), (3, 3), (7, 3)]
+
+    Parameters:
+    counts - List[int] - the number of codes of each length, as from
+     length_counts
+
+    Return:
+    List[Tuple[int, int]] - a list of (value, length) codes, one per pointer
+    """
+
+    codes: List[Tuple[int, int]] = []
+    code: int = 0
+    length: int
+    count: int
+    for length, count in enumerate(counts, 1):
+        for _ in range(count):
+            codes.append((reverse_bits(code, length), length))
+            code += 1
+        code <<= 1
+    return codes
+
+def write_lengths(out_binary: BinaryIO, counts: List[int]) -> None:
+    """
+    Write the counts of code lengths to a file, in place of prefix boundaries.
+    This is the Huffman marker, followed by the number of lengths, followed by
+    each count encoded as with bytes_compression and terminated by a 255 byte.
+
+    Example usage:
+    >>> get_output_result(write_lengths, [[1, 0, 300]], binary=True)
+    b'\\xfe\\x03\\x01\\xff\\x00\\xff-\\x01\\xff'
+
+    Parameters:
+    out_binary - BinaryIO - binary file to write to
+    counts - List[int] - the number of codes of each length
+
+    Return:
+    None
+    """
+
+    count: int
+    out_binary.write(HUFFMAN_MARKER + bytes([len(counts)]) +
+                     b"".join(encode_pointer(count) + b"\xff" for count in counts))
@@ -0,0 +1,97 @@
+##################################################################################
+
+"""
+Functions to decode pointers written with the canonical Huffman codes of
+huffman_compression.py. Codes are resolved from a table indexed by the next few
+bits of the stream, falling back to walking the canonical code one bit at a time
+for the rare codes that are longer than the table.
+"""
+
+from bytes_decompression import decode_pointer, read_until
+from huffman_compression import reverse_bits
+
+from typing import *
+
+TABLE_BITS: int = 10
+
+def read_lengths(in_binary: BinaryIO) -> List[int]:
+    """
+    Read the counts of code lengths written by write_lengths, after the Huffman
+    marker has already been read.
+
+    Example usage:
+    >>> get_input_result(read_lengths, b"\\x03\\x01\\xff\\x00\\xff-\\x01\\xff", [],
+    ... binary=True)
+    [1, 0, 300]
+
+    Parameters:
+    in_binary - BinaryIO - binary file to read from
+
+    Return:
+    List[int] - the number of codes of each length
+    """
+
+    counts: List[int] = []
+    n_counts: int = in_binary.read(1)[0]
+    while len(counts) < n_counts:
+        counts.append(decode_pointer(read_until(in_binary)))
+    return counts
+
+class HuffmanDecoder:
+    """
+    A class to decode canonical Huffman codes from a BinaryReader, given the
+    number of codes of each length.
+    """
+
+    def __init__(self, counts: List[int], table_bits: int = TABLE_BITS) -> None:
+        self.counts: List[int] = counts
+        self.table_bits: int = min(table_bits, len(counts))
+        self.first_codes: List[int] = []
+        self.first_pointers: List[int] = []
+        self.table: List[Tuple[int, int]] = [(0, 0)] * (1 << self.table_bits)
+
+        code: int = 0
+        pointer: int = 0
+        length: int
+        count: int
+        for length, count in enumerate(counts, 1):
+            self.first_codes.append(code)
+            self.first_pointers.append(pointer)
+            if length <= self.table_bits:
+                self._fill_table(code, length, pointer, count)
+            code = (code + count) << 1
+            pointer += count
+
+    def _fill_table(self, code: int, length: int, pointer: int,
+          count: int) -> None:
+        # the stream holds each code with its bits reversed, followed by any
+        # bits at all
+        step: int = 1 << length
+        ind: int
+        for ind in range(count):
+            rev: int = reverse_bits(code + ind, length)
+            self.table[rev::step] = ([(pointer + ind, length)]
+                                     * len(range(rev, len(self.table), step)))
+
+    def _read_long(self, in_binary: "BinaryReader") -> int:
+        code: int = 0
+        length: int
+        for length in range(1, len(self.counts) + 1):
+            code = code << 1 | in_binary.read_bits(1)
+            offset: int = code - self.first_codes[length - 1]
+            if offset < self.counts[length - 1]:
+                return self.first_pointers[length - 1] + offset
+        raise ValueError("invalid Huffman code")
+
+    def read(self, in_binary: "BinaryReader") -> int:
+        pointer: int
+        length: int
+        pointer, length = in_binary.read_table(self.table, self.table_bits)
+        if length:
+            return pointer
+        return self._read_long(in_binary)
+
+    def read_all(self, in_binary: "BinaryReader"
+          ) -> Generator[int, None, None]:
+        while True:
+            yield self.read(in_binary)
@@ -5,14 +5,25 @@ A script to perform entirely lossless compresssion on an ascii text file, using
 something similar to the prefix_code system from the lossy prefix_codes.py
 """
 
+import re
 import sys
+import time
 import string
+import functools
 
-from readable_compression import get_std_streams
-from prefix_compression import (BinaryWriter, EOF, get_boundaries,
-                                generate_prefix_codes, write_boundaries)
-from sorted_compression import compile_dictionary, compile_pointers
+from io import StringIO, BytesIO
+
+from readable_compression import get_std_streams, CHUNK_SIZE
+from prefix_codes import EOF
+from prefix_compression import BinaryWriter, get_coder, write_coder
+from trained_dictionary import (TrainedDictionary, get_dict, load_trained,
+                                write_trained_header)
+from sorted_compression import compile_counted_dictionary, compile_pointers
 from bytes_compression import write_dictionary
+from profiling import profiled, stage
+import metrics
+from block_compression import (DEFAULT_BLOCK_SIZE, get_block_size, get_jobs,
+                               get_archive, compress_blocks, compress_archive)
 
 from typing import *
 from typing.io import *
@@ -21,33 +32,71 @@ ALL_CHARS: Set[str] = {chr(i) for i in range(128)}
 LETTERS: Set[str] = set(string.ascii_letters)
 PUNC: Set[str] = ALL_CHARS - LETTERS
 
-def get_runs(in_file: TextIO) -> Generator[str, None, None]:
+# in ascii text, every character is either a letter or punctuation
+ASCII_RUN: Pattern = re.compile("[{0}]+|[^{0}]+".format(string.ascii_letters))
+
+def get_runs(in_file: TextIO, chunk_size: int = CHUNK_SIZE
+      ) -> Generator[str, None, None]:
     """
     Get runs of characters from an input file. These "runs" consist of either
-    punctuation or letters, and necessarily alternate.
+    punctuation or letters, and necessarily alternate. The file is read in
+    chunks, and the runs of ascii chunks are found with a regex, while any chunk
+    with other characters is taken one character at a time, where each of those
+    characters starts a run of the other kind. The last run of a chunk is
+    carried over to the next.
+
+    Example usage:
+    >>> get_input_result(get_runs, "Hi, there!", [], wrapper=list)
+    ['Hi', ', ', 'there', '!']
+    >>> get_input_result(get_runs, "abc de", [2], wrapper=list)
+    ['abc', ' ', 'de']
 
     Parameters:
     in_file - TextIO - file to read from
+    chunk_size - int - number of characters to read at a time. defaults to
+     CHUNK_SIZE
     
     Return:
     Generator[str, None, None] - a generator of runs
     """
 
+    started: float = time.perf_counter()
+    count: int = 0
     run: List[str] = []
-    c: str = in_file.read(1)
-    is_punc: bool = c in PUNC
-    curr: Set[str] = PUNC if is_punc else LETTERS
-    while c:
-        if c in curr:
-            run.append(c)
+    is_punc: Optional[bool] = None
+    chunk: str
+    for chunk in iter(lambda: in_file.read(chunk_size), ""):
+        if is_punc is None:
+            is_punc = chunk[0] in PUNC
+        if chunk.isascii():
+            # only the first run of the chunk can continue the current run, and
+            # the rest alternate by construction
+            runs: List[str] = ASCII_RUN.findall(chunk)
+            start: int = 0
+            if (runs[0][0] in PUNC) == is_punc:
+                run.append(runs[0])
+                start = 1
+            if start < len(runs):
+                yield "".join(run)
+                yield from runs[start:-1]
+                count += len(runs) - start
+                run = [runs[-1]]
+                is_punc = runs[-1][0] in PUNC
         else:
-            yield "".join(run)
-            run = [c]
-            is_punc = not is_punc
-            curr = PUNC if is_punc else LETTERS
-        c = in_file.read(1)
+            c: str
+            for c in chunk:
+                if c in (PUNC if is_punc else LETTERS):
+                    run.append(c)
+                else:
+                    yield "".join(run)
+                    count += 1
+                    run = [c]
+                    is_punc = not is_punc
     if run:
         yield "".join(run)
+        count += 1
+    metrics.add_rate("tokenizer_tokens", count, time.perf_counter() - started,
+                     tokenizer="get_runs")
 
 def separate_runs(runs: List[str]) -> Tuple[bool, List[str], List[str]]:
     """
@@ -76,8 +125,10 @@ def separate_runs(runs: List[str]) -> Tuple[bool, List[str], List[str]]:
         return True, [], []
 
 def write_pointers(out_binary: BinaryWriter,
-      word_pointers: Generator[int, None, None], word_codes: List[List[int]],
-      punc_pointers: Generator[int, None, None], punc_codes: List[List[int]],
+      word_pointers: Generator[int, None, None],
+      word_codes: Sequence[Tuple[int, int]],
+      punc_pointers: Generator[int, None, None],
+      punc_codes: Sequence[Tuple[int, int]],
       start_punc: bool) -> None:
     """
     Write pointers to file. Writes pointers in alternating, fashion, as their
@@ -87,57 +138,130 @@ def write_pointers(out_binary: BinaryWriter,
     out_binary - BinaryWriter - BinaryWriter to write to
     word_pointers - Generator[int, None, None] - a generator of word pointers
      to be consumed
-    word_codes - List[List[int]] - a list to encode word poiner values with
+    word_codes - Sequence[Tuple[int, int]] - a list to encode word poiner values with
     punc_pointers - Generator[int, None, None] - a generator of puntuation
      pointers to be consumed
-    punc - List[List[int]] - a list to encode puntuation poiner values with
+    punc - Sequence[Tuple[int, int]] - a list to encode puntuation poiner values with
 
     Return:
     None
     """
 
-    out_binary.write([1] if start_punc else [0])
+    out_binary.write_code(1 if start_punc else 0, 1)
     while word_pointers or punc_pointers:
         try:
             if start_punc:
-                out_binary.write(punc_codes[next(punc_pointers)])
-                out_binary.write(word_codes[next(word_pointers)])
+                out_binary.write_code(*punc_codes[next(punc_pointers)])
+                out_binary.write_code(*word_codes[next(word_pointers)])
             else:
-                out_binary.write(word_codes[next(word_pointers)])
-                out_binary.write(punc_codes[next(punc_pointers)])
+                out_binary.write_code(*word_codes[next(word_pointers)])
+                out_binary.write_code(*punc_codes[next(punc_pointers)])
         except StopIteration: 
                 break
 
-def main(stdin: TextIO, stdout: BinaryIO, argv: List[str]) -> None:
-    bw: binaryWriter = BinaryWriter(stdout)
-    runs: List[str] = list(get_runs(stdin))
+def compress_stream(in_file: TextIO, out_binary: BinaryIO, argv: List[str],
+      coder: str, dictionary: Optional[TrainedDictionary] = None) -> None:
+    """
+    Compress the whole of a text file into a single stream, of the headers and
+    dictionaries followed by the pointers. With a shared dictionary, only the
+    runs which aren't in it are written before the pointers.
+
+    Parameters:
+    in_file - TextIO - text file to read from
+    out_binary - BinaryIO - binary file to write to
+    argv - List[str] - arguments to parse boundaries from
+    coder - str - the name of the coder to use, as from get_coder
+    dictionary - Optional[TrainedDictionary] - shared dictionary to use.
+     defaults to None
+
+    Return:
+    None
+    """
+
+    bw: BinaryWriter = BinaryWriter(out_binary)
+    with stage("tokenise"):
+        runs: List[str] = list(get_runs(in_file))
     start_punc: bool
     word: List[str]
     punc: List[str]
     start_punc, words, punc = separate_runs(runs)
+    if dictionary is not None:
+        with stage("compile escaped runs"):
+            ((word_pointers, word_codes),
+             (punc_pointers, punc_codes)) = write_trained_header(
+                    out_binary, dictionary, [words, punc])
+        with stage("compile and write pointers"):
+            write_pointers(bw, word_pointers, word_codes,
+                           punc_pointers, punc_codes, start_punc)
+            bw.flush()
+        return
     word_dict: Dict[str, int]
     keywords: List[str]
-    words_dict, keywords = compile_dictionary(words)
-    words_dict[EOF] = len(words_dict)
+    word_counts: List[int]
     punc_dict: Dict[str, int]
     keypunc: List[str]
-    punc_dict, keypunc = compile_dictionary(punc)
-    punc_dict[EOF] = len(punc_dict)
-    word_boundaries: List[int] = get_boundaries(argv,
-                                    len(keywords), "wboundaries")
-    punc_boundaries: List[int] = get_boundaries(argv,
-                                    len(keypunc), "pboundaries")
-    word_codes: List[List[int]] = list(generate_prefix_codes(word_boundaries))
-    punc_codes: List[List[int]] = list(generate_prefix_codes(punc_boundaries))
+    punc_counts: List[int]
+    with stage("compile dictionaries"):
+        words_dict, keywords, word_counts = compile_counted_dictionary(words)
+        words_dict[EOF] = len(words_dict)
+        punc_dict, keypunc, punc_counts = compile_counted_dictionary(punc)
+        punc_dict[EOF] = len(punc_dict)
+    with stage("generate codes"):
+        word_codes: Sequence[Tuple[int, int]] = write_coder(out_binary, argv,
+                                            word_counts + [1], "wboundaries", coder)
+        punc_codes: Sequence[Tuple[int, int]] = write_coder(out_binary, argv,
+                                            punc_counts + [1], "pboundaries", coder)
     word_pointers: List[int] = compile_pointers(words + [EOF], words_dict)
     punc_pointers: List[int] = compile_pointers(punc + [EOF], punc_dict)
-    write_boundaries(stdout, word_boundaries)
-    write_boundaries(stdout, punc_boundaries)
-    write_dictionary(stdout, keywords)
-    write_dictionary(stdout, keypunc, b"A", b"B")
-    write_pointers(bw, word_pointers, word_codes,
-                       punc_pointers, punc_codes, start_punc)
-    bw.flush()
+    with stage("write dictionaries"):
+        write_dictionary(out_binary, keywords)
+        write_dictionary(out_binary, keypunc, b"A", b"B")
+    with stage("compile and write pointers"):
+        write_pointers(bw, word_pointers, word_codes,
+                           punc_pointers, punc_codes, start_punc)
+        bw.flush()
+
+def compress_block(block: str, argv: List[str], coder: str,
+      dict_path: Optional[str] = None) -> bytes:
+    """
+    Compress a single block of text into its own stream.
+
+    Parameters:
+    block - str - the text to compress
+    argv - List[str] - arguments to parse boundaries from. these are copied,
+     so that every block sees the same arguments
+    coder - str - the name of the coder to use
+    dict_path - Optional[str] - path of a shared dictionary to use, which is
+     loaded once in each process. defaults to None
+
+    Return:
+    bytes - the compressed block
+    """
+
+    out_binary: BytesIO = BytesIO()
+    compress_stream(StringIO(block), out_binary, list(argv), coder,
+                    None if dict_path is None else load_trained(dict_path, 2))
+    return out_binary.getvalue()
+
+def main(stdin: TextIO, stdout: BinaryIO, argv: List[str]) -> None:
+    with profiled(argv), metrics.collected(argv):
+        coder: str = get_coder(argv)
+        block_size: Optional[int] = get_block_size(argv)
+        jobs: int = get_jobs(argv)
+        dict_path: Optional[str] = get_dict(argv)
+        archive: bool = get_archive(argv)
+        if block_size is None and jobs == 1 and not archive:
+            compress_stream(stdin, stdout, argv, coder, None if dict_path is None
+                            else load_trained(dict_path, 2))
+            return
+        compress_function: Callable[[str], bytes] = functools.partial(
+                compress_block, argv=argv, coder=coder, dict_path=dict_path)
+        if archive:
+            compress_archive(stdin, stdout, block_size or DEFAULT_BLOCK_SIZE,
+                             compress_function, len, jobs)
+        else:
+            compress_blocks(stdin, stdout, block_size or DEFAULT_BLOCK_SIZE,
+                            compress_function, jobs)
 
 if __name__ == "__main__":
     stdin: TextIO
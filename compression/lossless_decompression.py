@@ -1,83 +1,170 @@
 ##################################################################################
 
 import sys
+import functools
+
+from io import StringIO, BytesIO
 
 from readable_compression import get_std_streams
-from prefix_compression import EOF
+from prefix_codes import EOF
+from trained_dictionary import (DICT_MARKER, TrainedDictionary, get_dict,
+                                load_trained)
+from readable_decompression import WRITE_BATCH, write_batched
 from bytes_decompression import read_dictionary
-from prefix_decompression import (BinaryReader, generate_translator,
-                                  read_boundaries, read_prefix_code)
+from prefix_decompression import (BinaryReader, Decoder, read_coder,
+                                  read_trained_header)
+from block_compression import BLOCK_MARKER, ARCHIVE_MARKER, get_jobs
+from block_decompression import (decompress_blocks, decompress_range, get_range,
+                                 slice_text)
+from profiling import profiled, stage
+import metrics
 
 from typing import *
 from typing.io import *
 
-def read_decompress(in_binary: BinaryReader, out_file: TextIO,
-      word_boundaries: List[int], word_translator: Dict[str, int],
-      words: List[str], punc_boundaries: List[int],
-      punc_translator: Dict[str, int], punc: List[str]) -> None:
+def read_runs(in_binary: BinaryReader, word_decoder: Decoder, words: List[str],
+      punc_decoder: Decoder, punc: List[str]) -> Generator[str, None, None]:
     """
-    Read and decompress pointers from file
+    Read and decode alternating runs of letters and punctuation from file,
+    until either kind of run is EOF
 
     Parameters:
     in_binary - BinaryReader - BinaryReader to read from
-    out_file - TextIO - text file to write to
-    word_boundaries - List[int] - prefix boundaries for words
-    word_translator - Dict[str, int] - dictionary to translate from words to
-     pointer values
+    word_decoder - Decoder - decoder for the codes of word pointers
     words - List[str] - list of unique words from which ultimately the word is
      decoded
-    punc_boundaries - List[int] - prefix boundaries for punctuation
-    punc_translator - Dict[str, int] - dictionary to translate from punctuation to
-     pointer values
+    punc_decoder - Decoder - decoder for the codes of punctuation pointers
     punc - List[str] - list of unique punctuation from which ultimately the punc is
      decoded
 
     Return:
-    None
+    Generator[str, None, None] - a generator of runs
     """
 
-    start_punc: bool = in_binary.read_bits(1) == [1]
+    start_punc: bool = in_binary.read_bits(1) == 1
     while True:
         if start_punc:
-            punc_code: List[int] = read_prefix_code(in_binary, punc_boundaries)
-            punc_pointer: int = punc_translator[punc_code]
-            punc_dec: str = punc[punc_pointer]
+            punc_dec: str = punc[punc_decoder.read(in_binary)]
             if punc_dec == EOF:
                 break
-            out_file.write(punc_dec)
+            yield punc_dec
 
-            word_code: List[int] = read_prefix_code(in_binary, word_boundaries)
-            word_pointer: int = word_translator[word_code]
-            word_dec: str = words[word_pointer]
+            word_dec: str = words[word_decoder.read(in_binary)]
             if word_dec == EOF:
                 break
-            out_file.write(word_dec)
+            yield word_dec
 
         else:
-            word_code: List[int] = read_prefix_code(in_binary, word_boundaries)
-            word_pointer: int = word_translator[word_code]
-            word_dec: str = words[word_pointer]
+            word_dec: str = words[word_decoder.read(in_binary)]
             if word_dec == EOF:
                 break
-            out_file.write(word_dec)
+            yield word_dec
 
-            punc_code: List[int] = read_prefix_code(in_binary, punc_boundaries)
-            punc_pointer: int = punc_translator[punc_code]
-            punc_dec: str = punc[punc_pointer]
+            punc_dec: str = punc[punc_decoder.read(in_binary)]
             if punc_dec == EOF:
                 break
-            out_file.write(punc_dec)
+            yield punc_dec
+
+def read_decompress(in_binary: BinaryReader, out_file: TextIO,
+      word_decoder: Decoder, words: List[str],
+      punc_decoder: Decoder, punc: List[str],
+      batch_size: int = WRITE_BATCH) -> None:
+    """
+    Read and decompress pointers from file, writing the runs they point to in
+    batches
+
+    Parameters:
+    in_binary - BinaryReader - BinaryReader to read from
+    out_file - TextIO - text file to write to
+    word_decoder - Decoder - decoder for the codes of word pointers
+    words - List[str] - list of unique words from which ultimately the word is
+     decoded
+    punc_decoder - Decoder - decoder for the codes of punctuation pointers
+    punc - List[str] - list of unique punctuation from which ultimately the punc is
+     decoded
+    batch_size - int - number of runs to write at a time. defaults to
+     WRITE_BATCH
+
+    Return:
+    None
+    """
+
+    write_batched(out_file, read_runs(in_binary, word_decoder, words,
+                                      punc_decoder, punc), "", batch_size)
+
+def decompress_stream(in_binary: BinaryIO, out_file: TextIO,
+      c: bytes = b"", dictionary: Optional[TrainedDictionary] = None) -> None:
+    """
+    Decompress a single stream, of the headers and dictionaries followed by the
+    pointers, from a binary file.
+
+    Parameters:
+    in_binary - BinaryIO - binary file to read from
+    out_file - TextIO - text file to write to
+    c - bytes - the first byte of the stream, if it has already been read
+    dictionary - Optional[TrainedDictionary] - the shared dictionary the
+     stream was compressed with, if any. defaults to None
+
+    Return:
+    None
+    """
+
+    br: BinaryReader = BinaryReader(in_binary)
+    c = c or in_binary.read(1)
+    if c == DICT_MARKER:
+        with stage("read escaped runs"):
+            ((word_decoder, words),
+             (punc_decoder, punc)) = read_trained_header(in_binary, dictionary)
+        with stage("decode and write"):
+            read_decompress(br, out_file, word_decoder, words, punc_decoder,
+                            punc)
+        return
+    with stage("read codes"):
+        word_decoder: Decoder = read_coder(in_binary, c)
+        punc_decoder: Decoder = read_coder(in_binary)
+    with stage("read dictionaries"):
+        words: List[str] = list(read_dictionary(in_binary)) + [EOF]
+        punc: List[str] = list(read_dictionary(in_binary, b"A", b"B")) + [EOF]
+    with stage("decode and write"):
+        read_decompress(br, out_file, word_decoder, words, punc_decoder, punc)
+
+def decompress_block(block: bytes, dict_path: Optional[str] = None) -> str:
+    """
+    Decompress a single compressed block into a string.
+
+    Parameters:
+    block - bytes - the compressed block
+    dict_path - Optional[str] - path of the shared dictionary it was compressed
+     with, if any, which is loaded once in each process. defaults to None
+
+    Return:
+    str - the decompressed text
+    """
+
+    out_file: StringIO = StringIO()
+    decompress_stream(BytesIO(block), out_file, b"", None if dict_path is None
+                      else load_trained(dict_path, 2))
+    return out_file.getvalue()
 
 def main(stdin: BinaryIO, stdout: TextIO, argv: List[str]) -> None:
-    br: BinaryReader = BinaryReader(stdin)
-    word_boundaries: List[int] = list(read_boundaries(stdin))
-    word_translator: Dict[str, int] = generate_translator(word_boundaries)
-    punc_boundaries: List[int] = list(read_boundaries(stdin))
-    punc_translator: Dict[str, int] = generate_translator(punc_boundaries)
-    words: List[str] = list(read_dictionary(stdin)) + [EOF]
-    punc: List[str] = list(read_dictionary(stdin, b"A", b"B")) + [EOF]
-    read_decompress(br, stdout, word_boundaries, word_translator, words,
-                                punc_boundaries, punc_translator, punc)
+    with profiled(argv), metrics.collected(argv):
+        jobs: int = get_jobs(argv)
+        dict_path: Optional[str] = get_dict(argv)
+        text_range: Optional[Tuple[int, Optional[int]]] = get_range(argv,
+                                                                    stdin)
+        c: bytes = stdin.read(1)
+        decompress_function: Callable[[bytes], str] = functools.partial(
+                decompress_block, dict_path=dict_path)
+        if c == ARCHIVE_MARKER and text_range is not None:
+            decompress_range(stdin, stdout, decompress_function, *text_range,
+                             slice_text, jobs)
+        elif c == BLOCK_MARKER or c == ARCHIVE_MARKER:
+            decompress_blocks(stdin, stdout, decompress_function, jobs)
+        elif text_range is not None:
+            raise ValueError("--range needs an archive written with --archive")
+        else:
+            decompress_stream(stdin, stdout, c, None if dict_path is None
+                              else load_trained(dict_path, 2))
 
 if __name__ == '__main__':
     stdin: BinaryIO
@@ -1,51 +1,316 @@
-import string
+##################################################################################
+
+"""
+A script to compress text with LZW, as a reference point for the other
+compressors. The dictionary is keyed by integers made of the code of a phrase
+and the symbol that extends it, rather than by the phrases themselves. Codes
+start as wide as the alphabet needs and grow by a bit whenever the dictionary
+outgrows them, up to an optional maximum width, past which the dictionary is
+either frozen or cleared and started again. With --bytes, the input is read as
+raw bytes, with an alphabet of all 256 byte values, so that any file can be
+compressed without decoding it as text.
+"""
+
 import sys
+import string
+import argparse
+
+from readable_compression import get_std_streams, CHUNK_SIZE
+from prefix_compression import BinaryWriter
+from profiling import profiled, stage
+import metrics
+from flags import flag_parser
+
+from typing import *
+from typing.io import *
+
+ALPHABET: str = string.printable
+
+POLICIES: List[str] = ["freeze", "reset"]
+
+BYTE_ALPHABET_SIZE: int = 256
+
+def get_max_bits(argv: List[str], minimum: int = 8) -> Optional[int]:
+    """
+    Parse the maximum width of a code from given arguments, using the
+    --max-bits flag. It must leave room for at least one code after the
+    alphabet, and so be at least 9 for bytes.
+
+    Example usage:
+    >>> get_max_bits(["--max-bits", "12"])
+    12
+    >>> get_max_bits([]) is None
+    True
+
+    Parameters:
+    argv - List[str] - list of arguments to parse (and modify)
+    minimum - int - the least width allowed. defaults to 8
+
+    Return:
+    Optional[int] - the largest number of bits in a code, or None if codes can
+     grow without limit
+    """
+
+    parser: argparse.ArgumentParser = flag_parser("--max-bits", type=int)
+    args: argparse.Namespace
+    remaining: List[str]
+    args, remaining = parser.parse_known_args(argv)
+    argv[:] = remaining
+    if args.max_bits is not None and not minimum <= args.max_bits <= 32:
+        parser.error("--max-bits must be between {} and 32".format(minimum))
+    return args.max_bits
+
+def get_policy(argv: List[str]) -> str:
+    """
+    Parse what to do once the dictionary is full from given arguments, using the
+    --full flag. This is either "freeze", to keep using the dictionary as it
+    is, or "reset", to write a clear code and start a new dictionary.
+
+    Example usage:
+    >>> get_policy(["--full", "reset"])
+    'reset'
+    >>> get_policy([])
+    'freeze'
+
+    Parameters:
+    argv - List[str] - list of arguments to parse (and modify)
+
+    Return:
+    str - the name of the policy
+    """
+
+    parser: argparse.ArgumentParser = flag_parser(
+            "--full", choices=tuple(POLICIES), default="freeze")
+    args: argparse.Namespace
+    remaining: List[str]
+    args, remaining = parser.parse_known_args(argv)
+    argv[:] = remaining
+    return args.full
+
+def get_byte_mode(argv: List[str]) -> bool:
+    """
+    Parse whether to compress raw bytes rather than text from given arguments,
+    using the --bytes flag.
+
+    Example usage:
+    >>> get_byte_mode(["--bytes"])
+    True
+    >>> get_byte_mode([])
+    False
+
+    Parameters:
+    argv - List[str] - list of arguments to parse (and modify)
+
+    Return:
+    bool - whether the input is bytes
+    """
+
+    parser: argparse.ArgumentParser = flag_parser("--bytes",
+                                                  action="store_true")
+    args: argparse.Namespace
+    remaining: List[str]
+    args, remaining = parser.parse_known_args(argv)
+    argv[:] = remaining
+    return args.bytes
+
+def first_code(alphabet_size: int, max_bits: Optional[int], policy: str) -> int:
+    """
+    Find the first code given to a phrase longer than one symbol. When the
+    dictionary is reset, the code after the alphabet is kept back as the clear
+    code.
+
+    Example usage:
+    >>> first_code(100, None, "reset")
+    100
+    >>> first_code(100, 12, "reset")
+    101
+
+    Parameters:
+    alphabet_size - int - the number of symbols in the alphabet
+    max_bits - Optional[int] - the maximum width of a code
+    policy - str - what to do once the dictionary is full
+
+    Return:
+    int - the first code of the dictionary
+    """
+
+    return alphabet_size + (max_bits is not None and policy == "reset")
+
+def initial_bits(first: int, max_bits: Optional[int]) -> int:
+    """
+    Find the width of the first codes, which is enough for the first code of the
+    dictionary. When a maximum width is given, codes are never narrower than a
+    byte, so that the padding at the end of the file can't be read as a code.
+
+    Example usage:
+    >>> initial_bits(100, None)
+    7
+    >>> initial_bits(101, 12)
+    8
+
+    Parameters:
+    first - int - the first code of the dictionary
+    max_bits - Optional[int] - the maximum width of a code
+
+    Return:
+    int - the width of the first codes
+    """
+
+    return first.bit_length() if max_bits is None else max(first.bit_length(), 8)
+
+def get_codes(chunks: Iterable[Iterable[int]], alphabet_size: int,
+      max_bits: Optional[int] = None, policy: str = "freeze"
+      ) -> Generator[Tuple[int, int], None, None]:
+    """
+    Compress chunks of symbols with LZW, generating (code, width) pairs as taken
+    by BinaryWriter.write_codes. Each phrase is a code, and the dictionary maps
+    the code of a phrase times the size of the alphabet plus a symbol to the
+    code of the phrase extended by that symbol. Phrases carry over from one
+    chunk to the next.
+
+    Example usage:
+    >>> list(get_codes([b"ab", b"ab"], 256))
+    [(97, 9), (98, 9), (256, 9)]
+
+    Parameters:
+    chunks - Iterable[Iterable[int]] - chunks of symbols, each less than
+     alphabet_size
+    alphabet_size - int - the number of symbols in the alphabet
+    max_bits - Optional[int] - the maximum width of a code. defaults to None,
+     for no maximum
+    policy - str - what to do once the dictionary is full. defaults to "freeze"
+
+    Return:
+    Generator[Tuple[int, int], None, None] - generator of codes and their widths
+    """
+
+    first: int = first_code(alphabet_size, max_bits, policy)
+    limit: Optional[int] = None if max_bits is None else 1 << max_bits
+
+    table: Dict[int, int] = {}
+    size: int = first
+    current_bits: int = initial_bits(first, max_bits)
+    max_key: int = 1 << current_bits
+    w: int = -1
+    # only counted on the rare branches, and reported at the end
+    entries: int = 0
+    widenings: int = 0
+    resets: int = 0
+
+    chunk: Iterable[int]
+    for chunk in chunks:
+        symbol: int
+        for symbol in chunk:
+            if w < 0:
+                w = symbol
+                continue
 
-from prefix_compression import BinaryWriter, padded_base
+            key: int = w * alphabet_size + symbol
+            code: Optional[int] = table.get(key)
+            if code is not None:
+                w = code
+                continue
 
-def get_pointers(in_file):
-    w = ""
-    c = True
+            yield w, current_bits
+            if limit is None or size < limit:
+                table[key] = size
+                size += 1
+                if size == max_key and max_key != limit:
+                    max_key <<= 1
+                    current_bits += 1
+                    widenings += 1
+            elif policy == "reset":
+                yield alphabet_size, current_bits
+                entries += size - first
+                resets += 1
+                table.clear()
+                size = first
+                current_bits = initial_bits(first, max_bits)
+                max_key = 1 << current_bits
+            w = symbol
 
-    words = {i: ind for ind, i in enumerate(string.printable)}
-    words_size = len(words)
+    if w >= 0:
+        yield w, current_bits
+    metrics.add("lzw_dictionary_entries_total", entries + size - first,
+                side="compress")
+    metrics.add("lzw_code_width_changes_total", widenings, side="compress")
+    metrics.add("lzw_resets_total", resets, side="compress")
+    metrics.set_gauge("lzw_dictionary_size", size, side="compress")
+    metrics.set_gauge("lzw_code_width", current_bits, side="compress")
 
-    current_bits = words_size.bit_length()
-    max_key = (1 << current_bits)
+def get_pointers(in_file: TextIO, max_bits: Optional[int] = None,
+      policy: str = "freeze", alphabet: str = ALPHABET
+      ) -> Generator[Tuple[int, int], None, None]:
+    """
+    Compress a text file with LZW, as with get_codes, where the symbols are the
+    positions of characters in the alphabet.
 
-    for c in iter(lambda: in_file.read(1), ""):
-        wc = w + c
+    Example usage:
+    >>> get_input_result(get_pointers, "abab", [], wrapper=list)
+    [(10, 7), (11, 7), (100, 7)]
 
-        if wc in words:
-            w = wc
+    Parameters:
+    in_file - TextIO - text file to read from
+    max_bits - Optional[int] - the maximum width of a code. defaults to None,
+     for no maximum
+    policy - str - what to do once the dictionary is full. defaults to "freeze"
+    alphabet - str - the symbols that can appear in the text. defaults to
+     ALPHABET
 
-        else:
-            yield words[w], current_bits
+    Return:
+    Generator[Tuple[int, int], None, None] - generator of codes and their widths
+    """
 
-            words[wc] = words_size
-            words_size += 1
+    symbols: Dict[str, int] = {c: ind for ind, c in enumerate(alphabet)}
+    return get_codes((map(symbols.__getitem__, chunk) for chunk in
+                      iter(lambda: in_file.read(CHUNK_SIZE), "")),
+                     len(alphabet), max_bits, policy)
 
-            if words_size == max_key:
-                max_key <<= 1
-                current_bits += 1
+def get_byte_pointers(in_binary: BinaryIO, max_bits: Optional[int] = None,
+      policy: str = "freeze") -> Generator[Tuple[int, int], None, None]:
+    """
+    Compress a binary file with LZW, as with get_codes, where the symbols are
+    the bytes themselves.
 
-            w = c
+    Example usage:
+    >>> get_input_result(get_byte_pointers, b"\\xff\\xffa", [], wrapper=list,
+    ... binary=True)
+    [(255, 9), (255, 9), (97, 9)]
 
-    if w:
-        yield words[w], current_bits
+    Parameters:
+    in_binary - BinaryIO - binary file to read from
+    max_bits - Optional[int] - the maximum width of a code, which must be at
+     least 9. defaults to None, for no maximum
+    policy - str - what to do once the dictionary is full. defaults to "freeze"
 
-def write_pointers(out_binary, pointers):
-    for pointer, size in pointers:
-        out_binary.write(padded_base(2, pointer, size))
+    Return:
+    Generator[Tuple[int, int], None, None] - generator of codes and their widths
+    """
 
-def main():
-    bw = BinaryWriter(sys.stdout.buffer)
+    return get_codes(iter(lambda: in_binary.read(CHUNK_SIZE), b""),
+                     BYTE_ALPHABET_SIZE, max_bits, policy)
 
-    pointers = get_pointers(sys.stdin)
-    
-    write_pointers(bw, pointers)
+def write_pointers(out_binary: BinaryWriter,
+      pointers: Iterable[Tuple[int, int]]) -> None:
+    out_binary.write_codes(pointers)
 
-    bw.flush()
+def main(stdin: IO, stdout: BinaryIO, argv: List[str],
+      byte_mode: bool = False) -> None:
+    with profiled(argv), metrics.collected(argv):
+        max_bits: Optional[int] = get_max_bits(argv, 9 if byte_mode else 8)
+        policy: str = get_policy(argv)
+        bw: BinaryWriter = BinaryWriter(stdout)
+        with stage("compress and write codes"):
+            if byte_mode:
+                write_pointers(bw, get_byte_pointers(stdin, max_bits, policy))
+            else:
+                write_pointers(bw, get_pointers(stdin, max_bits, policy))
+            bw.flush()
 
-if __name__ == '__main__':
-    main()
+if __name__ == "__main__":
+    byte_mode: bool = get_byte_mode(sys.argv)
+    stdin: IO
+    stdout: BinaryIO
+    with get_std_streams(sys.argv, in_binary=byte_mode,
+                         out_binary=True) as (stdin, stdout):
+        main(stdin, stdout, sys.argv, byte_mode)
@@ -1,52 +1,394 @@
-import string
+##################################################################################
+
+"""
+A script to decompress a file compressed by lzw_compression.py. The decoder
+keeps track of the size of the compressor's dictionary, so that it reads each
+code with the same width as it was written with, and follows the same policy
+once the dictionary is full. The same --max-bits and --full flags must be given
+to both scripts, as must --bytes, with which the output is written as raw bytes.
+"""
+
 import sys
+import array
+
+from readable_compression import get_std_streams, SomeText
+from prefix_decompression import BinaryReader, EndOfBinaryFile
+from profiling import profiled, stage
+import metrics
+from lzw_compression import (ALPHABET, BYTE_ALPHABET_SIZE, get_max_bits,
+                             get_policy, get_byte_mode, first_code, initial_bits)
+
+from typing import *
+from typing.io import *
+
+WINDOW_SIZE: int = 1 << 20
+CHUNK_SIZE: int = 1 << 16
+# entries with phrases up to this long are kept whole
+SHORT_PHRASE: int = 32
+
+def rebuild(table: List[Optional[bytes]], long_entries: Dict[int, int],
+      prefixes: array.array, lasts: bytearray, code: int,
+      length: int) -> bytearray:
+    """
+    Rebuild the phrase of a long dictionary entry which is no longer in the
+    output buffer, by following its prefixes from its last symbol back to the
+    first which is short enough to be kept whole.
+
+    Example usage:
+    >>> rebuild([b"a", b"b", b"ab", None, None], {3: 0, 4: 1},
+    ...         array.array("q", [2, 3]), bytearray(b"ba"), 4, 4)
+    bytearray(b'abba')
+
+    Parameters:
+    table - List[Optional[bytes]] - the phrase of each short entry, and None
+     for each long one
+    long_entries - Dict[int, int] - the index of each long entry in prefixes
+     and lasts
+    prefixes - array.array - the code of the prefix of each long entry
+    lasts - bytearray - the last symbol of each long entry
+    code - int - the code of the entry
+    length - int - the length of its phrase
+
+    Return:
+    bytearray - the phrase
+    """
+
+    phrase: bytearray = bytearray(length)
+    while table[code] is None:
+        index: int = long_entries[code]
+        length -= 1
+        phrase[length] = lasts[index]
+        code = prefixes[index]
+    phrase[:length] = cast(bytes, table[code])
+    return phrase
+
+def read_chunks(in_binary: BinaryReader, max_bits: Optional[int],
+      policy: str, symbols: bytes, window_size: int = WINDOW_SIZE,
+      chunk_size: int = CHUNK_SIZE, short_phrase: int = SHORT_PHRASE
+      ) -> Generator[bytes, None, None]:
+    """
+    Read LZW codes from a BinaryReader, and decode them into chunks of the bytes
+    they stand for. Entries of the dictionary with phrases of up to
+    short_phrase bytes are kept whole, which is all of them in most text.
+    Longer ones are what make the dictionary grow with the square of the
+    length of its phrases on repetitive text, and are stored in parallel
+    arrays instead: the code of the prefix of each entry, its last symbol, its
+    length, and the position in the output where it was first seen.
+
+    Phrases are written to an output buffer which holds at least the last
+    window_size bytes written. A long phrase which was seen within the buffer
+    is copied from there with one slice, and any other is rebuilt by following
+    its prefixes from its last symbol back to the first which is kept whole.
+    The entry that the compressor adds after each code is only known once the
+    first symbol of the next phrase has been read, so it is added a code late.
+
+    Codes are read in runs of the same width, over which the dictionary either
+    grows by one entry a code or is full, so that the width and the size of
+    the dictionary are only checked between runs.
+
+    Parameters:
+    in_binary - BinaryReader - BinaryReader to read from
+    max_bits - Optional[int] - the maximum width of a code, or None for no
+     maximum
+    policy - str - what to do once the dictionary is full
+    symbols - bytes - the symbols of the alphabet, one byte each
+    window_size - int - the number of bytes of output to keep. defaults to
+     WINDOW_SIZE
+    chunk_size - int - the least number of bytes in each chunk, except the
+     last. defaults to CHUNK_SIZE
+    short_phrase - int - the length of the longest phrases to keep whole.
+     defaults to SHORT_PHRASE
 
-from prefix_decompression import BinaryReader, EndOfBinaryFile, from_base
+    Return:
+    Generator[bytes, None, None] - generator of chunks of decoded bytes
+    """
 
-def read_pointers(in_binary):
-    words = {ind: i for ind, i in enumerate(string.printable)}
-    #words = {i: ind for ind, i in enumerate('\n' + string.ascii_uppercase)}
-    words_size = len(words)
+    alphabet_size: int = len(symbols)
+    first: int = first_code(alphabet_size, max_bits, policy)
+    # without a maximum, the dictionary never fills
+    limit: int = 1 << 62 if max_bits is None else 1 << max_bits
+    clear: int = alphabet_size if first > alphabet_size else -1
 
-    current_bits = words_size.bit_length()
-    max_key = (1 << current_bits)
+    # the clear code, if any, has no phrase, and neither do the codes of
+    # entries not yet added, or long entries, which have an index in the
+    # arrays instead
+    table: List[Optional[bytes]] = ([bytes((symbol,)) for symbol in symbols]
+                                    + [None] * (first - alphabet_size))
+    long_entries: Dict[int, int] = {}
+    prefixes: array.array = array.array("q")
+    lasts: bytearray = bytearray()
+    lengths: array.array = array.array("q")
+    starts: array.array = array.array("q")
 
-    w = words[from_base(2, in_binary.read_bits(current_bits))]
-    yield w
+    buffer: bytearray = bytearray()
+    # the position in the output of the start of the buffer, and the lengths
+    # of the buffer when it was last yielded, and when to yield it again
+    base: int = 0
+    written: int = 0
+    flush_at: int = chunk_size
+    known: int
+    size: int
+    current_bits: int
+    max_key: int
+    mask: int
+    i: int
+    n: int
+    start: int
+    index: int
+    phrase: Optional[bytes]
+    # the previous phrase, if it is short, and its code
+    w: Optional[bytes]
+    w_code: int
+    growing: bool
+    cleared: bool
+    codes: Iterable[Any]
+    # the bits are taken from the reader's accumulator here rather than with
+    # read_bits, to save a method call for every code
+    refill: Callable[[int, int, int], Tuple[int, int]] = in_binary.refill
+    acc: int = in_binary.acc
+    acc_bits: int = in_binary.acc_bits
+    # only counted on the rare branches, and reported at the end
+    entries: int = 0
+    widenings: int = 0
+    resets: int = 0
 
     try:
         while True:
-            i = from_base(2, in_binary.read_bits(current_bits))
+            # from the start of the stream or a clear code, the dictionary
+            # grows from its first entry, and the first code must be a symbol
+            known = first
+            current_bits = initial_bits(first, max_bits)
+            max_key = 1 << current_bits
+            if acc_bits < current_bits:
+                acc, acc_bits = refill(acc, acc_bits, current_bits)
+            i = acc & (max_key - 1)
+            acc >>= current_bits
+            acc_bits -= current_bits
+            if i == clear:
+                resets += 1
+                continue
+            if i >= alphabet_size:
+                raise ValueError("invalid LZW code {}".format(i))
+            w = table[i]
+            w_code = i
+            buffer += cast(bytes, w)
+            size = first + 1
+            growing = True
+            cleared = False
 
-            if i in words:
-                result = words[i]
-            else:
-                result = w + w[0]
+            while growing and not cleared:
+                # the compressor adds an entry after each code it writes, if
+                # there is room, and widens codes as soon as it has
+                if size == max_key and max_key != limit:
+                    max_key <<= 1
+                    current_bits += 1
+                    widenings += 1
+                mask = max_key - 1
+                if max_key == limit:
+                    # the last of these adds the entry left pending by the
+                    # code before, but leaves none of its own
+                    codes = range(limit - size + 1)
+                    growing = False
+                else:
+                    codes = range(max_key - size)
+                if len(table) < max_key:
+                    table.extend([None] * (max_key - len(table)))
+
+                for _ in codes:
+                    if acc_bits < current_bits:
+                        acc, acc_bits = refill(acc, acc_bits, current_bits)
+                    i = acc & mask
+                    acc >>= current_bits
+                    acc_bits -= current_bits
+
+                    phrase = table[i]
+                    if phrase is not None:
+                        buffer += phrase
+                    elif i == clear:
+                        cleared = True
+                        break
+                    elif i < known:
+                        index = long_entries[i]
+                        n = lengths[index]
+                        start = starts[index] - base
+                        if start >= 0:
+                            buffer += buffer[start:start + n]
+                        else:
+                            buffer += rebuild(table, long_entries, prefixes,
+                                              lasts, i, n)
+                    elif i == known:
+                        # the code of the pending entry itself, which is the
+                        # previous phrase followed by its own first symbol
+                        if w is not None:
+                            phrase = w + w[:1]
+                            buffer += phrase
+                        else:
+                            n = lengths[long_entries[w_code]]
+                            start = len(buffer) - n
+                            buffer += buffer[start:]
+                            buffer.append(buffer[start])
+                            n += 1
+                    else:
+                        raise ValueError("invalid LZW code {}".format(i))
+
+                    # the pending entry is the previous phrase followed by
+                    # the first symbol of this one, which is short unless the
+                    # previous phrase is as long as short_phrase
+                    if (w is not None and phrase is not None
+                            and len(w) < short_phrase):
+                        table[known] = w + phrase[:1]
+                    else:
+                        if phrase is not None:
+                            n = len(phrase)
+                        start = len(buffer) - n
+                        if w is not None and len(w) < short_phrase:
+                            table[known] = w + buffer[start:start + 1]
+                        else:
+                            length: int = (len(w) if w is not None else
+                                           lengths[long_entries[w_code]])
+                            long_entries[known] = len(lengths)
+                            prefixes.append(w_code)
+                            lasts.append(buffer[start])
+                            lengths.append(length + 1)
+                            starts.append(base + start - length)
+                    known += 1
+                    w = phrase
+                    w_code = i
 
-            yield result
+                    if len(buffer) >= flush_at:
+                        yield bytes(buffer[written:])
+                        written = len(buffer)
+                        if written > 2 * window_size:
+                            # the previous phrase is kept, as the next may
+                            # copy it
+                            start = written - (len(w) if w is not None else
+                                               lengths[long_entries[w_code]])
+                            start = min(written - window_size, start)
+                            del buffer[:start]
+                            base += start
+                            written -= start
+                        flush_at = written + chunk_size
 
-            words[words_size] = w + result[0]
-            words_size += 1
+                size = max_key
 
-            if words_size == max_key - 1:
-                max_key <<= 1
-                current_bits += 1
+            while not cleared:
+                # the dictionary is full
+                if acc_bits < current_bits:
+                    acc, acc_bits = refill(acc, acc_bits, current_bits)
+                i = acc & mask
+                acc >>= current_bits
+                acc_bits -= current_bits
 
+                phrase = table[i]
+                if phrase is not None:
+                    buffer += phrase
+                elif i == clear:
+                    cleared = True
+                elif i < known:
+                    index = long_entries[i]
+                    n = lengths[index]
+                    start = starts[index] - base
+                    if start >= 0:
+                        buffer += buffer[start:start + n]
+                    else:
+                        buffer += rebuild(table, long_entries, prefixes, lasts,
+                                          i, n)
+                else:
+                    raise ValueError("invalid LZW code {}".format(i))
 
-            w = result
+                if len(buffer) >= flush_at:
+                    yield bytes(buffer[written:])
+                    written = len(buffer)
+                    if written > 2 * window_size:
+                        start = written - window_size
+                        del buffer[:start]
+                        base += start
+                        written -= start
+                    flush_at = written + chunk_size
+
+            entries += known - first
+            resets += 1
+            table[first:] = [None] * (len(table) - first)
+            long_entries.clear()
+            del prefixes[:], lasts[:], lengths[:], starts[:]
 
     except EndOfBinaryFile:
         pass
 
-def write_pointers(pointers, out_file):
-    for i in pointers:
-        out_file.write(i)
+    if len(buffer) > written:
+        yield bytes(buffer[written:])
+    metrics.add("lzw_dictionary_entries_total", entries + known - first,
+                side="decompress")
+    metrics.add("lzw_code_width_changes_total", widenings, side="decompress")
+    metrics.add("lzw_resets_total", resets, side="decompress")
+    metrics.set_gauge("lzw_dictionary_size", known, side="decompress")
+    metrics.set_gauge("lzw_code_width", current_bits, side="decompress")
+    metrics.add("lzw_output_bytes_total", base + len(buffer),
+                side="decompress")
+
+def read_pointers(in_binary: BinaryReader, max_bits: Optional[int] = None,
+      policy: str = "freeze", alphabet: str = ALPHABET
+      ) -> Generator[str, None, None]:
+    """
+    Read LZW codes from a BinaryReader, and decode them into chunks of text, as
+    with read_chunks.
+
+    Parameters:
+    in_binary - BinaryReader - BinaryReader to read from
+    max_bits - Optional[int] - the maximum width of a code. defaults to None,
+     for no maximum
+    policy - str - what to do once the dictionary is full. defaults to "freeze"
+    alphabet - str - the symbols that can appear in the text, which must be
+     ascii. defaults to ALPHABET
 
-def main():
-    br = BinaryReader(sys.stdin.buffer)
+    Return:
+    Generator[str, None, None] - generator of chunks of text
+    """
 
-    pointers = read_pointers(br)
-    write_pointers(pointers, sys.stdout)
+    chunk: bytes
+    for chunk in read_chunks(in_binary, max_bits, policy,
+                             alphabet.encode("ascii")):
+        yield chunk.decode("ascii")
+
+def read_byte_pointers(in_binary: BinaryReader, max_bits: Optional[int] = None,
+      policy: str = "freeze") -> Generator[bytes, None, None]:
+    """
+    Read LZW codes written by get_byte_pointers from a BinaryReader, and decode
+    them into chunks of bytes, as with read_chunks.
+
+    Parameters:
+    in_binary - BinaryReader - BinaryReader to read from
+    max_bits - Optional[int] - the maximum width of a code. defaults to None,
+     for no maximum
+    policy - str - what to do once the dictionary is full. defaults to "freeze"
+
+    Return:
+    Generator[bytes, None, None] - generator of chunks of bytes
+    """
+
+    return read_chunks(in_binary, max_bits, policy,
+                       bytes(range(BYTE_ALPHABET_SIZE)))
+
+def write_pointers(pointers: Iterable[SomeText], out_file: IO) -> None:
+    out_file.writelines(pointers)
+
+def main(stdin: BinaryIO, stdout: IO, argv: List[str],
+      byte_mode: bool = False) -> None:
+    with profiled(argv), metrics.collected(argv):
+        max_bits: Optional[int] = get_max_bits(argv, 9 if byte_mode else 8)
+        policy: str = get_policy(argv)
+        with stage("decode and write"):
+            if byte_mode:
+                write_pointers(read_byte_pointers(BinaryReader(stdin), max_bits,
+                                                  policy), stdout)
+            else:
+                write_pointers(read_pointers(BinaryReader(stdin), max_bits,
+                                             policy), stdout)
 
-if __name__ == '__main__':
-    main()
+if __name__ == "__main__":
+    byte_mode: bool = get_byte_mode(sys.argv)
+    stdin: BinaryIO
+    stdout: IO
+    with get_std_streams(sys.argv, in_binary=True,
+                         out_binary=byte_mode) as (stdin, stdout):
+        main(stdin, stdout, sys.argv, byte_mode)
@@ -0,0 +1,298 @@
+##################################################################################
+
+"""
+Functions to collect counters from inside the codecs, with the --metrics flag,
+and dump them at the end of a run as JSON or in the Prometheus text format.
+Counters are only ever added to at the edges of the hot loops, such as when a
+block of bytes is read or written, or once a loop has finished, never for each
+code or word, and add does nothing when --metrics is not given.
+
+With --jobs, blocks which are compressed or decompressed in other processes
+don't add to the counters of the run.
+
+Example usage:
+    $ python prefix_compression.py --input ../text/rom_ju_intro.txt --metrics > /dev/null
+    $ python lzw_compression.py --input big.txt --metrics lzw.prom --metrics-format prometheus > big.lzw
+"""
+
+import sys
+import json
+import argparse
+import contextlib
+
+from flags import flag_parser
+
+from typing import *
+
+FORMATS: List[str] = ["json", "prometheus"]
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class Metrics:
+    """
+    A collection of named counters and gauges, each of which can have a value
+    for every set of labels it is given.
+    """
+
+    def __init__(self) -> None:
+        self.kinds: Dict[str, str] = {}
+        self.values: Dict[str, Dict[Labels, float]] = {}
+
+    def _series(self, name: str, kind: str) -> Dict[Labels, float]:
+        if name not in self.kinds:
+            self.kinds[name] = kind
+            self.values[name] = {}
+        elif self.kinds[name] != kind:
+            raise ValueError("{} is a {}, not a {}".format(name,
+                             self.kinds[name], kind))
+        return self.values[name]
+
+    def add(self, name: str, value: float, labels: Labels) -> None:
+        series: Dict[Labels, float] = self._series(name, "counter")
+        series[labels] = series.get(labels, 0) + value
+
+    def set(self, name: str, value: float, labels: Labels) -> None:
+        self._series(name, "gauge")[labels] = value
+
+    def get(self, name: str, **labels: Any) -> float:
+        return self.values.get(name, {}).get(make_labels(labels), 0)
+
+    def as_json(self) -> Dict[str, Any]:
+        """
+        Give every metric, with the type of each and a list of its values and
+        their labels.
+
+        Example usage:
+        >>> metrics = Metrics()
+        >>> metrics.add("codes_total", 3, (("bits", "4"),))
+        >>> metrics.as_json()
+        {'codes_total': {'type': 'counter', 'values': [{'labels': {'bits': '4'}, 'value': 3}]}}
+        """
+
+        return {name: {"type": self.kinds[name],
+                       "values": [{"labels": dict(labels), "value": value}
+                                  for labels, value in series.items()]}
+                for name, series in self.values.items()}
+
+    def as_prometheus(self) -> str:
+        """
+        Give every metric in the Prometheus text exposition format.
+
+        Example usage:
+        >>> metrics = Metrics()
+        >>> metrics.add("codes_total", 3, (("bits", "4"),))
+        >>> print(metrics.as_prometheus(), end="")
+        # TYPE codes_total counter
+        codes_total{bits="4"} 3
+        """
+
+        lines: List[str] = []
+        name: str
+        series: Dict[Labels, float]
+        for name, series in self.values.items():
+            lines.append("# TYPE {} {}".format(name, self.kinds[name]))
+            labels: Labels
+            value: float
+            for labels, value in series.items():
+                label_text: str = ",".join('{}="{}"'.format(key,
+                        val.replace("\\", "\\\\").replace('"', '\\"'))
+                        for key, val in labels)
+                lines.append("{}{} {}".format(name, "{" + label_text + "}"
+                                              if labels else "", value))
+        return "".join(line + "\n" for line in lines)
+
+    def __repr__(self) -> str:
+        return "Metrics({})".format(self.values)
+
+METRICS: Optional[Metrics] = None
+
+def make_labels(labels: Dict[str, Any]) -> Labels:
+    """
+    Make a hashable set of labels from keyword arguments, with every value as a
+    string.
+
+    Example usage:
+    >>> make_labels({"stream": "boundaries", "bits": 4})
+    (('bits', '4'), ('stream', 'boundaries'))
+    """
+
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def enabled() -> bool:
+    """
+    Find whether metrics are being collected, for metrics which take some work
+    to find.
+    """
+
+    return METRICS is not None
+
+def add(name: str, value: float = 1, **labels: Any) -> None:
+    """
+    Add to a counter, if metrics are being collected.
+
+    Example usage:
+    >>> add("binary_writer_bytes_total", 65536)
+
+    Parameters:
+    name - str - the name of the counter
+    value - float - the amount to add. defaults to 1
+    labels - Any - labels for this value of the counter
+
+    Return:
+    None
+    """
+
+    if METRICS is not None:
+        METRICS.add(name, value, make_labels(labels))
+
+def set_gauge(name: str, value: float, **labels: Any) -> None:
+    """
+    Set a gauge, if metrics are being collected.
+
+    Parameters:
+    name - str - the name of the gauge
+    value - float - the value to set it to
+    labels - Any - labels for this value of the gauge
+
+    Return:
+    None
+    """
+
+    if METRICS is not None:
+        METRICS.set(name, value, make_labels(labels))
+
+def add_rate(name: str, count: int, seconds: float, **labels: Any) -> None:
+    """
+    Add a number of things done in a number of seconds to the counters
+    name_total and name_seconds_total, and set the gauge name_per_second to the
+    rate over every call so far, if metrics are being collected.
+
+    Parameters:
+    name - str - the name of the thing done, such as "tokenizer_tokens"
+    count - int - how many were done
+    seconds - float - how long they took
+    labels - Any - labels for the metrics
+
+    Return:
+    None
+    """
+
+    if METRICS is not None:
+        add(name + "_total", count, **labels)
+        add(name + "_seconds_total", seconds, **labels)
+        total_seconds: float = METRICS.get(name + "_seconds_total", **labels)
+        if total_seconds > 0:
+            set_gauge(name + "_per_second",
+                      METRICS.get(name + "_total", **labels) / total_seconds,
+                      **labels)
+
+def get_metrics(argv: List[str]) -> Optional[str]:
+    """
+    Parse where to write metrics from given arguments, using the --metrics
+    flag, which can be given a file to write to. Without a file, the metrics
+    are written to stderr.
+
+    Example usage:
+    >>> get_metrics(["--metrics", "out.json"])
+    'out.json'
+    >>> get_metrics(["--metrics"])
+    '-'
+    >>> get_metrics([]) is None
+    True
+
+    Parameters:
+    argv - List[str] - list of arguments to parse (and modify)
+
+    Return:
+    Optional[str] - the file to write to, "-" for stderr, or None to not
+     collect metrics
+    """
+
+    parser: argparse.ArgumentParser = flag_parser("--metrics", nargs="?",
+                                                  const="-")
+    args: argparse.Namespace
+    remaining: List[str]
+    args, remaining = parser.parse_known_args(argv)
+    argv[:] = remaining
+    return args.metrics
+
+def get_metrics_format(argv: List[str]) -> str:
+    """
+    Parse the format to write metrics in from given arguments, using the
+    --metrics-format flag, which is either "json" or "prometheus".
+
+    Example usage:
+    >>> get_metrics_format(["--metrics-format", "prometheus"])
+    'prometheus'
+    >>> get_metrics_format([])
+    'json'
+
+    Parameters:
+    argv - List[str] - list of arguments to parse (and modify)
+
+    Return:
+    str - the name of the format
+    """
+
+    # --metrics must not be taken as an abbreviation of --metrics-format
+    parser: argparse.ArgumentParser = flag_parser(
+            "--metrics-format", allow_abbrev=False, choices=tuple(FORMATS),
+            default="json")
+    args: argparse.Namespace
+    remaining: List[str]
+    args, remaining = parser.parse_known_args(argv)
+    argv[:] = remaining
+    return args.metrics_format
+
+def write_metrics(metrics: Metrics, out_file: TextIO, metrics_format: str
+      ) -> None:
+    """
+    Write metrics to a file in a given format.
+
+    Parameters:
+    metrics - Metrics - the metrics to write
+    out_file - TextIO - text file to write to
+    metrics_format - str - the name of the format, from FORMATS
+
+    Return:
+    None
+    """
+
+    if metrics_format == "prometheus":
+        out_file.write(metrics.as_prometheus())
+    else:
+        json.dump(metrics.as_json(), out_file, indent=2)
+        out_file.write("\n")
+
+@contextlib.contextmanager
+def collected(argv: List[str]) -> Generator[None, None, None]:
+    """
+    Collect metrics during the body of a with statement if --metrics is given
+    in the arguments, and write them at the end, in the format given by
+    --metrics-format.
+
+    Parameters:
+    argv - List[str] - list of arguments to parse (and modify)
+
+    Return:
+    Generator[None, None, None] - context manager for the run
+    """
+
+    global METRICS
+    target: Optional[str] = get_metrics(argv)
+    metrics_format: str = get_metrics_format(argv)
+    if target is None:
+        yield
+        return
+
+    METRICS = Metrics()
+    try:
+        yield
+    finally:
+        metrics: Metrics = METRICS
+        METRICS = None
+        if target == "-":
+            write_metrics(metrics, sys.stderr, metrics_format)
+        else:
+            with open(target, "w") as out_file:
+                write_metrics(metrics, out_file, metrics_format)
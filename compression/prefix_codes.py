@@ -0,0 +1,87 @@
+##################################################################################
+
+"""
+The prefix codes written by prefix_compression.py, split on boundaries between
+buckets of pointers, which the shared dictionaries of train.py and the
+decompressor build too.
+"""
+
+import bisect
+import itertools
+
+from typing import *
+
+EOF: int = -1
+
+def generate_prefix_codes(boundaries: List[int]
+      ) -> Generator[Tuple[int, int], None, None]:
+    """
+    Generate all possible prefix codes from the boundaries in a deterministic
+    order. Each code is a (value, length) pair, as taken by
+    BinaryWriter.write_code, where the bits of the value are written least
+    significant first: the bucket index followed by the position in the bucket.
+
+    Example usage:
+    >>> list(generate_prefix_codes([0, 1]))
+    [(0, 1), (1, 2), (3, 2)]
+
+    Parameters:
+    boundaries - list of given prefix boundaries
+
+    Return:
+    Generator[Tuple[int, int], None, None] - generator of all possible prefix
+     codes
+    """
+
+    bits = (len(boundaries) - 1).bit_length()
+    for jnd, j in enumerate(boundaries):
+        for i in range(2 ** j):
+            yield jnd | i << bits, bits + j
+
+def bucket_starts(boundaries: List[int]) -> List[int]:
+    """
+    Find the first pointer value that falls into each bucket of a set of prefix
+    boundaries, where each bucket holds 2 ** boundary values.
+
+    Example usage:
+    >>> bucket_starts([0, 1, 3])
+    [0, 1, 3]
+    >>> bucket_starts([4, 4])
+    [0, 16]
+
+    Parameters:
+    boundaries - List[int] - the prefix boundaries
+
+    Return:
+    List[int] - the first pointer of each bucket
+    """
+
+    starts: List[int] = list(itertools.accumulate(2 ** i for i in boundaries))
+    return [0] + starts[:-1]
+
+class PrefixCodes:
+    """
+    A class that acts as a read-only list of all the codes generated by
+    generate_prefix_codes, but which works out each code arithmetically from the
+    boundaries rather than storing it.
+    """
+
+    def __init__(self, boundaries: List[int]) -> None:
+        self.boundaries: List[int] = boundaries
+        self.bits: int = (len(boundaries) - 1).bit_length()
+        self.starts: List[int] = bucket_starts(boundaries)
+        self.size: int = sum(2 ** i for i in boundaries)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, pointer: int) -> Tuple[int, int]:
+        if not 0 <= pointer < self.size:
+            raise IndexError("pointer out of range of prefix codes")
+
+        bucket: int = bisect.bisect_right(self.starts, pointer) - 1
+        return ((bucket | (pointer - self.starts[bucket]) << self.bits),
+                self.bits + self.boundaries[bucket])
+
+    def __repr__(self) -> str:
+        return "PrefixCodes({})".format(self.boundaries)
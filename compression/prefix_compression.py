@@ -9,21 +9,210 @@ import sys
 import itertools
 import argparse
 import math
+import operator
+import functools
+import collections
+
+from io import StringIO, BytesIO
 
 from readable_compression import get_std_streams, get_words
-from sorted_compression import compile_pointers, compile_dictionary
+from sorted_compression import compile_pointers, compile_counted_dictionary
 from bytes_compression import write_dictionary
 from bytes_decompression import from_base
+from huffman_compression import (huffman_lengths, length_counts,
+                                 canonical_codes, write_lengths)
+from prefix_codes import EOF, generate_prefix_codes, bucket_starts, PrefixCodes
+from trained_dictionary import (TrainedDictionary, get_dict, load_trained,
+                                write_trained_header)
+from block_compression import (DEFAULT_BLOCK_SIZE, get_block_size, get_jobs,
+                               get_archive, compress_blocks, compress_archive)
+from profiling import profiled, stage
+import metrics
+from flags import flag_parser
 
 from typing import *
 from typing.io import *
 
-def get_boundaries(argv: List[str], size: int, name: str) -> List[int]:
+MAX_BUCKETS: int = 16
+EXACT_SIZE: int = 1 << 10
+
+def cover_costs(frequencies: List[int], max_buckets: int, shift: int = 0,
+      seeds: Optional[List[List[float]]] = None
+      ) -> Tuple[List[List[float]], List[List[int]]]:
+    """
+    Find the cheapest way to cover the first i of a series of pointers with k
+    whole buckets, for every i and k, where the pointers may stand for groups of
+    2 ** shift pointers, in which case a bucket of width w is really of width
+    w + shift. Costs can be seeded with those of covering some of the first
+    pointers by other means.
+
+    Example usage:
+    >>> cover_costs([4, 2, 1, 1], 2)[0]
+    [[0, inf, inf, inf, inf], [inf, 0, 6, inf, 16], [inf, inf, 0, 3, 8]]
+    >>> cover_costs([4, 2], 1, 1)[0]
+    [[0, inf, inf], [inf, 4, 12]]
+
+    Parameters:
+    frequencies - List[int] - the frequency of each pointer, or group of
+     pointers, in descending order
+    max_buckets - int - the largest number of buckets to use
+    shift - int - log2 of the number of pointers in each group. defaults to 0
+    seeds - Optional[List[List[float]]] - an upper bound on the cost of covering
+     the first i pointers with k buckets, for some of the first i. defaults to
+     None
+
+    Return:
+    Tuple[List[List[float]], List[List[int]]] - the cost of covering the first i
+     pointers with k buckets, indexed by k and then i, and the cost of a bucket
+     of each width starting at each pointer
+    """
+
+    size: int = len(frequencies)
+    totals: List[int] = [0] + list(itertools.accumulate(frequencies))
+    widths: range = range(size.bit_length())
+    bucket_costs: List[List[int]] = [
+            [(width + shift) * (end - start) for start, end
+             in zip(totals, totals[1 << width:])] for width in widths]
+
+    layers: List[List[float]] = [[0] + [math.inf] * size]
+    k: int
+    for k in range(1, max_buckets + 1):
+        layer: List[float] = [math.inf] * (size + 1)
+        if seeds:
+            layer[:len(seeds[k])] = seeds[k]
+        width: int
+        for width in widths:
+            layer[1 << width:] = map(min, layer[1 << width:],
+                    map(operator.add, layers[-1], bucket_costs[width]))
+        layers.append(layer)
+    return layers, bucket_costs
+
+def last_width(layers: List[List[float]], bucket_costs: List[List[int]],
+      k: int, end: int) -> int:
+    """
+    Find the width of the last of k buckets in the cheapest cover of the first
+    end pointers, as found by cover_costs.
+
+    Example usage:
+    >>> last_width(*cover_costs([4, 2, 1, 1], 2), 2, 4)
+    1
+
+    Parameters:
+    layers - List[List[float]] - the costs of covers, from cover_costs
+    bucket_costs - List[List[int]] - the costs of buckets, from cover_costs
+    k - int - the number of buckets
+    end - int - the number of pointers covered
+
+    Return:
+    int - the width of the last bucket
+    """
+
+    width: int
+    return next(width for width in range(len(bucket_costs))
+                if end >= 1 << width and layers[k - 1][end - (1 << width)]
+                + bucket_costs[width][end - (1 << width)] == layers[k][end])
+
+def optimal_boundaries(frequencies: List[int],
+      max_buckets: int = MAX_BUCKETS, exact_size: int = EXACT_SIZE
+      ) -> List[int]:
+    """
+    Find the boundaries that encode a series of pointers in the fewest bits,
+    given the frequency of each pointer in descending order. For each number of
+    buckets, cover_costs finds the cheapest way to cover the first i pointers,
+    and the last bucket is the smallest one which covers the rest. The cost
+    includes the byte that each boundary takes up in the header.
+
+    Only the first exact_size pointers are considered one at a time. Past them,
+    pointers are taken in groups, so that there are at most exact_size groups,
+    and buckets there start on a group and are at least as wide as one, which
+    keeps the time taken bounded for large vocabularies at a very small cost in
+    the size of the output.
+
+    Example usage:
+    >>> optimal_boundaries([100, 1, 1, 1, 1, 1, 1, 1])
+    [0, 3]
+    >>> optimal_boundaries([1, 1, 1, 1])
+    [2]
+    >>> optimal_boundaries([1])
+    [0]
+
+    Parameters:
+    frequencies - List[int] - the frequency of each pointer, in descending order
+    max_buckets - int - the largest number of buckets to consider. defaults to
+     MAX_BUCKETS
+    exact_size - int - the number of pointers to consider one at a time.
+     defaults to EXACT_SIZE
+
+    Return:
+    List[int] - a list of boundaries, which are in numerical order
+    """
+
+    size: int = len(frequencies)
+    totals: List[int] = [0] + list(itertools.accumulate(frequencies))
+    total: int = totals[-1]
+    shift: int = ((size - 1) // exact_size).bit_length()
+    group: int = 1 << shift
+
+    fine: List[List[float]]
+    fine_costs: List[List[int]]
+    fine, fine_costs = cover_costs(frequencies[:exact_size] if shift
+                                   else frequencies, max_buckets)
+    coarse: List[List[float]] = []
+    coarse_costs: List[List[int]] = []
+    if shift:
+        coarse, coarse_costs = cover_costs(
+                [totals[min(i + group, size)] - totals[i]
+                 for i in range(0, size, group)],
+                max_buckets, shift, [layer[::group] for layer in fine])
+
+    # the cost of the smallest bucket covering every pointer from each pointer
+    tail_costs: List[int] = [(size - i - 1).bit_length() * (total - totals[i])
+                             for i in range(size)]
+
+    best: Tuple[float, int, int] = (math.inf, 0, 0)
+    k: int
+    for k in range(1, max_buckets + 1):
+        header: int = 8 * k + (k - 1).bit_length() * total
+        candidates: List[Tuple[float, int]] = [
+                min(zip(map(operator.add, fine[k - 1], tail_costs),
+                        range(len(fine[k - 1]) - 1)))]
+        if shift:
+            candidates.append(min(zip(map(operator.add, coarse[k - 1],
+                                          tail_costs[::group]),
+                                      range(0, size, group))))
+        cost: float
+        end: int
+        cost, end = min(candidates)
+        best = min(best, (cost + header, k, end))
+
+    _, k, end = best
+    boundaries: List[int] = [(size - end - 1).bit_length()]
+    # follow the cheapest cover back, through the groups until it meets the
+    # cover of the pointers taken one at a time
+    in_fine: bool = (end < len(fine[k - 1])
+                     and fine[k - 1][end] + tail_costs[end] + 8 * k
+                     + (k - 1).bit_length() * total == best[0])
+    for k in range(k - 1, 0, -1):
+        width: int
+        if not in_fine and end < len(fine[k]) and fine[k][end] == coarse[k][end >> shift]:
+            in_fine = True
+        if in_fine:
+            width = last_width(fine, fine_costs, k, end)
+        else:
+            width = last_width(coarse, coarse_costs, k, end >> shift) + shift
+        boundaries.append(width)
+        end -= 1 << width
+    return sorted(boundaries)
+
+def get_boundaries(argv: List[str], size: int, name: str,
+      frequencies: Optional[List[int]] = None) -> List[int]:
     """
     A function to parse a set of boundaries to use for prefix encoding from
     given arguments. It also takes the size of the prefix encoding that is
     required, and will automatically generate boundaries if the user supplies
-    insufficient boundaries or doesn't supply boundaries.
+    insufficient boundaries or doesn't supply boundaries. If the frequency of
+    each pointer is given, the generated boundaries are the optimal ones from
+    optimal_boundaries.
 
     Example usage:
     >>> get_boundaries(["--boundaries", "1", "2"], 3, "boundaries")
@@ -40,14 +229,16 @@ def get_boundaries(argv: List[str], size: int, name: str) -> List[int]:
     size - int - size of encoding required (largest value that needs
      to be encoded)
     name - str - name of the flag used in the arguments
+    frequencies - Optional[List[int]] - the frequency of each pointer, in
+     descending order. defaults to None
 
     Return:
     List[int] - a list of boundaries, which are in numerical order
 
     """
 
-    parser: argparse.ArgumentParser = argparse.ArgumentParser()
-    parser.add_argument(f"--{name}", type=int, nargs="+")
+    parser: argparse.ArgumentParser = flag_parser(f"--{name}", type=int,
+                                                  nargs="+")
     #parser.add_argument("--{}".format(name), type=int, nargs="+")
     args: argparse.Namespace
     remaining: List[str]
@@ -67,7 +258,9 @@ def get_boundaries(argv: List[str], size: int, name: str) -> List[int]:
         else:
             boundaries.sort()
 
-    if needs_override:
+    if needs_override and frequencies:
+        boundaries = optimal_boundaries(frequencies)
+    elif needs_override:
         largest_bound: int = int(math.log(size + 1, 2) + 1)
         boundaries = [largest_bound // 8 + 1,
                       largest_bound // 4 + 1,
@@ -76,34 +269,79 @@ def get_boundaries(argv: List[str], size: int, name: str) -> List[int]:
 
     return boundaries
 
-EOF: int = -1
+CODERS: List[str] = ["prefix", "huffman"]
 
 class BinaryWriter:
     """
-    A class to write individual bits to a file, by handling a bit buffer, which
-    is converted to a byte as soon as it reaches 8 bits
+    A class to write binary codes to a file. Codes are given as (value, length)
+    pairs, and are packed least significant bit first into an integer
+    accumulator. Whole bytes are moved from the accumulator into a byte buffer,
+    which is written to the file in large chunks. The bytes written are counted
+    as each chunk is written, and reported to the metrics when flushed.
     """
 
-    def __init__(self, out_file: BinaryIO) -> None:
-        self.bit_buffer: List[int] = []
+    def __init__(self, out_file: BinaryIO, chunk_size: int = 1 << 16) -> None:
+        self.acc: int = 0
+        self.acc_bits: int = 0
+        self.byte_buffer: bytearray = bytearray()
+        self.chunk_size: int = chunk_size
         self.out_file: BinaryIO = out_file
-
-    def _write_bit(self, bit: int) -> None:
-        self.bit_buffer.append(bit)
-        if len(self.bit_buffer) == 8:
-          self._write_buffer()
+        self.bytes_written: int = 0
+        self.writes: int = 0
+        self.reported: Tuple[int, int] = (0, 0)
+
+    def _drain(self) -> None:
+        n_bytes: int = self.acc_bits >> 3
+        self.byte_buffer += (self.acc & ((1 << (n_bytes << 3)) - 1)
+                            ).to_bytes(n_bytes, "little")
+        self.acc >>= n_bytes << 3
+        self.acc_bits -= n_bytes << 3
+        if len(self.byte_buffer) >= self.chunk_size:
+            self._write_buffer()
 
     def _write_buffer(self) -> None:
-        self.out_file.write(bytes([from_base(2, self.bit_buffer)]))
-        self.bit_buffer[:] = []
-        
+        self.out_file.write(self.byte_buffer)
+        self.bytes_written += len(self.byte_buffer)
+        self.writes += 1
+        self.byte_buffer = bytearray()
+
+    def write_code(self, value: int, length: int) -> None:
+        self.acc |= value << self.acc_bits
+        self.acc_bits += length
+        if self.acc_bits >= 4096:
+            self._drain()
+
+    def write_codes(self, codes: Iterable[Tuple[int, int]]) -> None:
+        acc: int = self.acc
+        acc_bits: int = self.acc_bits
+        value: int
+        length: int
+        for value, length in codes:
+            acc |= value << acc_bits
+            acc_bits += length
+            if acc_bits >= 4096:
+                self.acc, self.acc_bits = acc, acc_bits
+                self._drain()
+                acc, acc_bits = self.acc, self.acc_bits
+        self.acc, self.acc_bits = acc, acc_bits
+
     def write(self, binary: Iterable[int]) -> None:
+        bit: int
         for bit in binary:
-            self._write_bit(bit)
+            self.write_code(bit, 1)
 
     def flush(self) -> None:
-        while self.bit_buffer:
-            self._write_bit(0)
+        padding: int = -self.acc_bits % 8
+        self.acc_bits += padding
+        self._drain()
+        self._write_buffer()
+
+        new_bytes: int = self.bytes_written - self.reported[0]
+        metrics.add("binary_writer_bytes_total", new_bytes)
+        metrics.add("binary_writer_bits_total", 8 * new_bytes - padding)
+        metrics.add("binary_writer_padding_bits_total", padding)
+        metrics.add("binary_writer_writes_total", self.writes - self.reported[1])
+        self.reported = (self.bytes_written, self.writes)
 
 def padded_base(base: int, num: int, pad: int) -> Generator[int, None, None]:
     """
@@ -142,40 +380,24 @@ def padded_base(base: int, num: int, pad: int) -> Generator[int, None, None]:
 #            return itertools.chain(binary(ind, bits), binary(n, i))
 #            break
 
-def generate_prefix_codes(boundaries: List[int]
-      ) -> Generator[List[int], None, None]:
-    """
-    Generate all possible prefix codes from the boundaries in a deterministic
-    order
-
-    Parameters:
-    boundaries - list of given prefix boundaries
-
-    Return:
-    Generator[List[int], None, None] - generator of all possible prefix codes
-    """
-
-    bits = (len(boundaries) - 1).bit_length()
-    for jnd, j in enumerate(boundaries):
-        for i in range(2 ** j):
-            yield list(itertools.chain(padded_base(2, jnd, bits), padded_base(2, i, j)))
-
-def write_pointers(out_binary: BinaryWriter, pointers: List[int],
-      prefix_codes: List[List[int]]) -> None:
+def write_pointers(out_binary: BinaryWriter, pointers: Iterable[int],
+      prefix_codes: Sequence[Tuple[int, int]]) -> None:
     """
     encode a series of pointers using a given list of possible prefix codes, and
     write them to a BinaryWriter object.
 
     Parameters:
     out_binary - BinaryWriter - a BinaryWriter object to write to
-    pointers - List[int] - a list of pointers to write
+    pointers - Iterable[int] - pointers to write
+    prefix_codes - Sequence[Tuple[int, int]] - (value, length) code for each
+     pointer
 
     Return:
     None
     """
 
-    for pointer in pointers:
-        out_binary.write(prefix_codes[pointer])
+    pointer: int
+    out_binary.write_codes(prefix_codes[pointer] for pointer in pointers)
 
 def write_boundaries(out_binary: BinaryIO, boundaries: List[int]) -> None:
     """
@@ -193,20 +415,206 @@ def write_boundaries(out_binary: BinaryIO, boundaries: List[int]) -> None:
 
     out_binary.write(bytes(boundaries) + b"\xff")
 
-def main(stdin: TextIO, stdout: BinaryIO, argv: List[int]):
-    bw: BinaryWriter = BinaryWriter(stdout)
-    words: List[str] = list(get_words(stdin))
+def get_coder(argv: List[str]) -> str:
+    """
+    Parse the kind of code to use for pointers from given arguments, using the
+    --coder flag. This is either "prefix", for the prefix boundary codes, or
+    "huffman", for canonical Huffman codes built from the word frequencies.
+
+    Example usage:
+    >>> get_coder(["--coder", "huffman"])
+    'huffman'
+    >>> get_coder([])
+    'prefix'
+
+    Parameters:
+    argv - List[str] - list of arguments to parse (and modify)
+
+    Return:
+    str - the name of the coder
+    """
+
+    parser: argparse.ArgumentParser = flag_parser(
+            "--coder", choices=tuple(CODERS), default="prefix")
+    args: argparse.Namespace
+    remaining: List[str]
+    args, remaining = parser.parse_known_args(argv)
+    argv[:] = remaining
+    return args.coder
+
+def write_coder(out_binary: BinaryIO, argv: List[str], frequencies: List[int],
+      name: str, coder: str) -> Sequence[Tuple[int, int]]:
+    """
+    Choose the codes for a set of pointers, and write a description of them to a
+    file, from which the decompressor can rebuild them. With the prefix coder
+    these are the boundaries given by the flag name in the arguments, and with
+    the Huffman coder they are the code lengths for the given frequencies.
+
+    Parameters:
+    out_binary - BinaryIO - binary file to write to
+    argv - List[str] - list of arguments to parse boundaries from
+    frequencies - List[int] - the frequency of each pointer, in descending order
+    name - str - name of the flag used for boundaries in the arguments
+    coder - str - the name of the coder, as from get_coder
+
+    Return:
+    Sequence[Tuple[int, int]] - the (value, length) code for each pointer
+    """
+
+    if coder == "huffman":
+        counts: List[int] = length_counts(huffman_lengths(frequencies))
+        write_lengths(out_binary, counts)
+        codes: Sequence[Tuple[int, int]] = canonical_codes(counts)
+        if metrics.enabled():
+            add_code_usage(name, frequencies, codes)
+        return codes
+
+    boundaries: List[int] = get_boundaries(argv, len(frequencies) - 1, name,
+                                               frequencies)
+    write_boundaries(out_binary, boundaries)
+    prefix_codes: PrefixCodes = PrefixCodes(boundaries)
+    if metrics.enabled():
+        add_code_usage(name, frequencies, prefix_codes, prefix_codes.starts)
+    return prefix_codes
+
+def add_code_usage(name: str, frequencies: List[int],
+      codes: Sequence[Tuple[int, int]], starts: Optional[List[int]] = None
+      ) -> None:
+    """
+    Add the number of pointers which will be written with each length of code,
+    and the bits they will take, to the metrics. This is found from the
+    frequencies rather than counted as the pointers are written. With the
+    prefix coder, the codes are counted by bucket too.
+
+    Parameters:
+    name - str - the name of the pointers, as given to write_coder
+    frequencies - List[int] - the frequency of each pointer
+    codes - Sequence[Tuple[int, int]] - the (value, length) code for each pointer
+    starts - Optional[List[int]] - the first pointer of each bucket, if the
+     codes have buckets
+
+    Return:
+    None
+    """
+
+    usage: Dict[int, int] = collections.Counter()
+    ind: int
+    frequency: int
+    for ind, frequency in enumerate(frequencies):
+        usage[codes[ind][1]] += frequency
+    length: int
+    for length, frequency in sorted(usage.items()):
+        metrics.add("pointer_codes_total", frequency, stream=name, bits=length)
+        metrics.add("pointer_code_bits_total", frequency * length, stream=name)
+    if starts is not None:
+        bucket: int
+        start: int
+        end: int
+        for bucket, (start, end) in enumerate(zip(starts, starts[1:] + [None])):
+            metrics.add("pointer_bucket_codes_total",
+                        sum(frequencies[start:end]), stream=name, bucket=bucket)
+
+def compress_stream(in_file: TextIO, out_binary: BinaryIO, argv: List[str],
+      coder: str, dictionary: Optional[TrainedDictionary] = None) -> None:
+    """
+    Compress the whole of a text file into a single stream, of the header and
+    dictionary followed by the pointers. With a shared dictionary, only the
+    words which aren't in it are written before the pointers.
+
+    Parameters:
+    in_file - TextIO - text file to read from
+    out_binary - BinaryIO - binary file to write to
+    argv - List[str] - arguments to parse boundaries from
+    coder - str - the name of the coder to use, as from get_coder
+    dictionary - Optional[TrainedDictionary] - shared dictionary to use.
+     defaults to None
+
+    Return:
+    None
+    """
+
+    bw: BinaryWriter = BinaryWriter(out_binary)
+    with stage("tokenise"):
+        words: List[str] = list(get_words(in_file))
+    if dictionary is not None:
+        with stage("compile escaped words"):
+            trained_pointers: Iterator[int]
+            trained_codes: Sequence[Tuple[int, int]]
+            [(trained_pointers, trained_codes)] = write_trained_header(
+                    out_binary, dictionary, [words])
+        with stage("compile and write pointers"):
+            write_pointers(bw, trained_pointers, trained_codes)
+            bw.flush()
+        return
     words_dict: Dict[str, int]
     keywords: List[str]
-    words_dict, keywords = compile_dictionary(words)
+    counts: List[int]
+    with stage("compile dictionary"):
+        words_dict, keywords, counts = compile_counted_dictionary(words)
     words_dict[EOF] = len(words_dict)
-    prefix_boundaries: List[int] = get_boundaries(argv, len(keywords), "boundaries")
-    prefix_codes: List[List[int]] = list(generate_prefix_codes(prefix_boundaries))
+    with stage("generate codes"):
+        prefix_codes: Sequence[Tuple[int, int]] = write_coder(out_binary, argv,
+                                                  counts + [1], "boundaries", coder)
     pointers: Generator[int, None, None] = compile_pointers(words + [EOF], words_dict)
-    write_boundaries(stdout, prefix_boundaries)
-    write_dictionary(stdout, keywords)
-    write_pointers(bw, pointers, prefix_codes)
-    bw.flush()
+    with stage("write dictionary"):
+        write_dictionary(out_binary, keywords)
+    with stage("compile and write pointers"):
+        write_pointers(bw, pointers, prefix_codes)
+        bw.flush()
+
+def count_words(block: str) -> int:
+    """
+    Count the words in a block of text, which are the positions of an archive
+    written by this compressor.
+
+    Example usage:
+    >>> count_words("Don't panic, it's only a test!")
+    6
+    """
+
+    return sum(1 for _ in get_words(StringIO(block)))
+
+def compress_block(block: str, argv: List[str], coder: str,
+      dict_path: Optional[str] = None) -> bytes:
+    """
+    Compress a single block of text into its own stream.
+
+    Parameters:
+    block - str - the text to compress
+    argv - List[str] - arguments to parse boundaries from. these are copied,
+     so that every block sees the same arguments
+    coder - str - the name of the coder to use
+    dict_path - Optional[str] - path of a shared dictionary to use, which is
+     loaded once in each process. defaults to None
+
+    Return:
+    bytes - the compressed block
+    """
+
+    out_binary: BytesIO = BytesIO()
+    compress_stream(StringIO(block), out_binary, list(argv), coder,
+                    None if dict_path is None else load_trained(dict_path, 1))
+    return out_binary.getvalue()
+
+def main(stdin: TextIO, stdout: BinaryIO, argv: List[str]) -> None:
+    with profiled(argv), metrics.collected(argv):
+        coder: str = get_coder(argv)
+        block_size: Optional[int] = get_block_size(argv)
+        jobs: int = get_jobs(argv)
+        dict_path: Optional[str] = get_dict(argv)
+        archive: bool = get_archive(argv)
+        if block_size is None and jobs == 1 and not archive:
+            compress_stream(stdin, stdout, argv, coder, None if dict_path is None
+                            else load_trained(dict_path, 1))
+            return
+        compress_function: Callable[[str], bytes] = functools.partial(
+                compress_block, argv=argv, coder=coder, dict_path=dict_path)
+        if archive:
+            compress_archive(stdin, stdout, block_size or DEFAULT_BLOCK_SIZE,
+                             compress_function, count_words, jobs, whole_words=True)
+        else:
+            compress_blocks(stdin, stdout, block_size or DEFAULT_BLOCK_SIZE,
+                            compress_function, jobs, whole_words=True)
 
 if __name__ == "__main__":
     stdin: TextIO
@@ -1,10 +1,24 @@
 ##################################################################################
 
 import sys
+import functools
+
+from io import StringIO, BytesIO
 
 from readable_compression import get_std_streams
-from prefix_compression import padded_base, from_base, generate_prefix_codes, EOF
-from bytes_decompression import read_dictionary
+from prefix_codes import EOF, bucket_starts
+from trained_dictionary import (DICT_MARKER, DICTIONARY_SEPARATORS,
+                                TrainedStream, TrainedDictionary, get_dict,
+                                load_trained)
+from readable_decompression import WRITE_BATCH, write_batched
+from bytes_decompression import read_dictionary, read_until
+from huffman_compression import HUFFMAN_MARKER
+from huffman_decompression import HuffmanDecoder, TABLE_BITS, read_lengths
+from block_compression import BLOCK_MARKER, ARCHIVE_MARKER, get_jobs
+from block_decompression import (decompress_blocks, decompress_range, get_range,
+                                 slice_words)
+from profiling import profiled, stage
+import metrics
 
 from typing import *
 from typing.io import *
@@ -18,137 +32,474 @@ class EndOfBinaryFile(Exception):
 
 class BinaryReader:
     """
-    A class to read bits individually from a binary file by managing a bit buffer
+    A class to read binary codes from a file. Bytes are read from the file in
+    large blocks, and moved a few at a time into an integer accumulator, from
+    which codes are taken least significant bit first with a mask and a shift.
+    Codes can also be looked up in a table of (value, length) entries indexed
+    by the next few bits, in which case only length bits are consumed.
     """
 
-    def __init__(self, in_file: BinaryIO) -> None:
-        self.bit_buffer: List[int] = []
+    def __init__(self, in_file: BinaryIO, block_size: int = 1 << 16) -> None:
+        self.acc: int = 0
+        self.acc_bits: int = 0
+        self.block: bytes = b""
+        self.block_pos: int = 0
+        self.block_size: int = block_size
         self.in_file: BinaryIO = in_file
 
-    def _read_byte_into_buffer(self) -> None:
-        byte: bytes = self.in_file.read(1)
+    def _read_block(self) -> None:
+        self.block = self.in_file.read(self.block_size)
+        self.block_pos = 0
+        metrics.add("binary_reader_reads_total")
+        metrics.add("binary_reader_bytes_total", len(self.block))
+
+        if not self.block:
+            raise EndOfBinaryFile
 
-        if not byte:
+    def _fill(self, n: int) -> None:
+        while self.acc_bits < n:
+            if self.block_pos >= len(self.block):
+                self._read_block()
+            chunk: bytes = self.block[self.block_pos:self.block_pos + 32]
+            self.block_pos += len(chunk)
+            self.acc |= int.from_bytes(chunk, "little") << self.acc_bits
+            self.acc_bits += len(chunk) << 3
+
+    def read_bits(self, n: int) -> int:
+        if self.acc_bits < n:
+            self._fill(n)
+
+        value: int = self.acc & ((1 << n) - 1)
+        self.acc >>= n
+        self.acc_bits -= n
+        return value
+
+    def refill(self, acc: int, acc_bits: int, n: int) -> Tuple[int, int]:
+        """
+        Fill an accumulator which a decoding loop keeps in its own locals, having
+        taken it from acc and acc_bits, until it holds at least n bits, and give
+        it back. The loop takes codes from it itself, which saves a method call
+        for each code, and stores it back in acc and acc_bits if it stops
+        before the end of the file.
+        """
+
+        self.acc = acc
+        self.acc_bits = acc_bits
+        self._fill(n)
+        return self.acc, self.acc_bits
+
+    def read_bit(self) -> int:
+        return self.read_bits(1)
+
+    def peek_bits(self, n: int) -> int:
+        if self.acc_bits < n:
+            try:
+                self._fill(n)
+            except EndOfBinaryFile:
+                pass
+
+        return self.acc & ((1 << n) - 1)
+
+    def skip_bits(self, n: int) -> None:
+        if self.acc_bits < n:
             raise EndOfBinaryFile
 
-        self.bit_buffer = list(padded_base(2, byte[0], 8))
+        self.acc >>= n
+        self.acc_bits -= n
 
-    def read_bit(self) -> None:
-        if not self.bit_buffer:
-           self._read_byte_into_buffer()
+    def read_table(self, table: List[Tuple[int, int]],
+          n: int) -> Tuple[int, int]:
+        if self.acc_bits < n:
+            self.peek_bits(n)
 
-        return self.bit_buffer.pop(0)
+        entry: Tuple[int, int] = table[self.acc & ((1 << n) - 1)]
+        if self.acc_bits < entry[1]:
+            raise EndOfBinaryFile
 
-    def read_bits(self, n: int) -> None:
-        return [self.read_bit() for _ in range(n)]
+        self.acc >>= entry[1]
+        self.acc_bits -= entry[1]
+        return entry
 
-def decompress(out_file: TextIO, pointers: Iterable[int], words: List[str]) -> None:
+def decompress(out_file: TextIO, pointers: Iterable[int], words: List[str],
+      batch_size: int = WRITE_BATCH) -> None:
     """
     Decompress a series of pointer values, using a list of words, and write them
-    to an output file.
+    to an output file, up to the pointer to EOF.
 
     Parameters:
     out_file - TextIO - file to write to
     pointers - Iterable[int] - pointers to decompress
     words - List[str] - index of words to decompress them with
+    batch_size - int - number of words to write at a time. defaults to
+     WRITE_BATCH
 
     Return:
     None
     """
 
-    doSpace: bool = False
-    i: int
-    for i in pointers:
-        dec: str = words[i]
-        if dec == EOF:
-            break
+    # a callable iterator stops at the sentinel, without a check per word in
+    # Python
+    write_batched(out_file, iter(map(words.__getitem__, pointers).__next__, EOF),
+                  " ", batch_size)
 
-        if doSpace:
-            out_file.write(' ')
-        else:
-            doSpace = True
-
-        out_file.write(dec)
-
-def read_prefix_code(in_binary: BinaryReader, boundaries: List[int]) -> Tuple[int]:
+def read_prefix_code(in_binary: BinaryReader, boundaries: List[int],
+      starts: List[int]) -> int:
     """
     Read the next prefix code from file, by reading the prefix, and examining
-    it to determine how far to read, and then returning the prefix along with
-    the value.
+    it to determine how far to read, and then adding the value read to the
+    start of the bucket given by the prefix.
 
     Parameters:
     in_binary - BinaryReader - BinaryReader to read bits from
     boundaries - List[int] - the list of what the boundaries are
+    starts - List[int] - the first pointer of each bucket, as from
+     bucket_starts
 
     Return:
-    Tuple[int] - this is so that this prefix code can be hashed, so its value
-     can be retrieved from a dictionary
+    int - the pointer value of the code
     """
 
     bits: int = (len(boundaries) - 1).bit_length()
 
-    pref: List[int] = in_binary.read_bits(bits)
-    pref_val: int = from_base(2, pref)
-    
-    return tuple(pref + in_binary.read_bits(boundaries[pref_val]))
+    pref_val: int = in_binary.read_bits(bits)
+
+    return starts[pref_val] + in_binary.read_bits(boundaries[pref_val])
 
-def generate_translator(boundaries: List[int]) -> Dict[Tuple[int], int]:
+def generate_prefix_table(boundaries: List[int], starts: List[int],
+      table_bits: int) -> List[Tuple[int, int]]:
     """
-    Generate a dictionary from pointer tuples to their values.
+    Generate a table to decode prefix codes from the next table_bits bits of a
+    stream. Codes that fit in table_bits have an entry of their pointer and
+    length at every index that starts with them. Longer codes have an entry of
+    their bucket and a length of 0, so the rest of the code can be read
+    separately.
+
+    Example usage:
+    >>> generate_prefix_table([0, 1], [0, 1], 2)
+    [(0, 1), (1, 2), (0, 1), (2, 2)]
+    >>> generate_prefix_table([0, 3], [0, 1], 2)
+    [(0, 1), (1, 0), (0, 1), (1, 0)]
 
     Parameters:
-    boundaries - List[int] - the prefix boundaries to use
+    boundaries - List[int] - the prefix boundaries
+    starts - List[int] - the first pointer of each bucket, as from
+     bucket_starts
+    table_bits - int - number of bits to index the table by. must be at least
+     the length of the prefix
 
     Return:
-    Dict[Tuple[int], int] - a dictionary mapping from tuples to integers, which
-     are prefix codes to their values.
+    List[Tuple[int, int]] - a list of (pointer, length) entries
     """
 
-    i: List[int]
-    ind: int
-    return {tuple(i): ind for ind, i in enumerate(generate_prefix_codes(boundaries))}
+    bits: int = (len(boundaries) - 1).bit_length()
+    table: List[Tuple[int, int]] = [(0, 0)] * (1 << table_bits)
+    bucket: int
+    width: int
+    for bucket, width in enumerate(boundaries):
+        if bits + width > table_bits:
+            table[bucket::1 << bits] = ([(bucket, 0)]
+                                * len(range(bucket, len(table), 1 << bits)))
+            continue
+        step: int = 1 << (bits + width)
+        payload: int
+        for payload in range(2 ** width):
+            ind: int = bucket | payload << bits
+            table[ind::step] = ([(starts[bucket] + payload, bits + width)]
+                                * len(range(ind, len(table), step)))
+    return table
+
+class PrefixDecoder:
+    """
+    A class to decode the prefix codes of a set of boundaries from a
+    BinaryReader, by looking up the next few bits in a table, and only taking
+    the payload out separately for codes that are too long for the table. The
+    table is looked up and the code consumed from the reader's accumulator
+    directly, without the calls of read_table.
+    """
 
-def read_pointers(in_binary: BinaryReader, boundaries: List[int],
-      translator: Dict[Tuple[int], int]) -> Generator[int, None, None]:
+    def __init__(self, boundaries: List[int], table_bits: int = TABLE_BITS
+          ) -> None:
+        self.boundaries: List[int] = boundaries
+        self.starts: List[int] = bucket_starts(boundaries)
+        self.bits: int = (len(boundaries) - 1).bit_length()
+        self.table_bits: int = max(self.bits, min(table_bits,
+                                   self.bits + max(boundaries, default=0)))
+        self.mask: int = (1 << self.table_bits) - 1
+        self.table: List[Tuple[int, int]] = generate_prefix_table(
+                                    boundaries, self.starts, self.table_bits)
+        # the first pointer, code length and payload mask of each bucket, for
+        # the codes too long for the table
+        self.long_codes: List[Tuple[int, int, int]] = [
+                (start, self.bits + width, (1 << width) - 1)
+                for start, width in zip(self.starts, boundaries)]
+
+    def read(self, in_binary: BinaryReader) -> int:
+        if in_binary.acc_bits < self.table_bits:
+            in_binary.peek_bits(self.table_bits)
+
+        pointer: int
+        length: int
+        pointer, length = self.table[in_binary.acc & self.mask]
+        if not length:
+            start: int
+            payload_mask: int
+            start, length, payload_mask = self.long_codes[pointer]
+            if in_binary.acc_bits < length:
+                in_binary.peek_bits(length)
+            pointer = start + (in_binary.acc >> self.bits & payload_mask)
+        if in_binary.acc_bits < length:
+            raise EndOfBinaryFile
+
+        in_binary.acc >>= length
+        in_binary.acc_bits -= length
+        return pointer
+
+    def read_all(self, in_binary: BinaryReader) -> Generator[int, None, None]:
+        """
+        Read pointers from a BinaryReader, indefinitely, as with read, but with
+        the accumulator and the number of bits in it kept in locals, which the
+        reader only refills. Once fewer bits are left than the table is indexed
+        by, the last codes are read with read.
+        """
+
+        table: List[Tuple[int, int]] = self.table
+        table_bits: int = self.table_bits
+        mask: int = self.mask
+        bits: int = self.bits
+        long_codes: List[Tuple[int, int, int]] = self.long_codes
+        refill: Callable[[int, int, int], Tuple[int, int]] = in_binary.refill
+        acc: int = in_binary.acc
+        acc_bits: int = in_binary.acc_bits
+        pointer: int
+        length: int
+        start: int
+        payload_mask: int
+        try:
+            while True:
+                if acc_bits < table_bits:
+                    acc, acc_bits = refill(acc, acc_bits, table_bits)
+                pointer, length = table[acc & mask]
+                if not length:
+                    start, length, payload_mask = long_codes[pointer]
+                    if acc_bits < length:
+                        acc, acc_bits = refill(acc, acc_bits, length)
+                    pointer = start + (acc >> bits & payload_mask)
+                acc >>= length
+                acc_bits -= length
+                yield pointer
+        except EndOfBinaryFile:
+            pass
+
+        # refill has left what bits there are in the reader
+        while True:
+            yield self.read(in_binary)
+
+Decoder = Union[PrefixDecoder, HuffmanDecoder]
+
+def read_pointers(in_binary: BinaryReader,
+      decoder: Union[Decoder, "EscapedDecoder"]) -> Generator[int, None, None]:
     """
     Read pointers from a BinaryReader, indefinitely.
 
     Parameters:
     in_binary - BinaryReader - BinaryReader to read from
-    boundaries - List[int] - list of boundaries to use
-    translator - Dict[Tuple[int], int] - dictionary to translate prefix codes with
+    decoder - Union[Decoder, EscapedDecoder] - PrefixDecoder, HuffmanDecoder or
+     EscapedDecoder to decode codes with
 
     Return:
     Generator[int, None, None] - generator of pointer values
     """
 
-    while True:
-        pointer: int = translator[read_prefix_code(in_binary, boundaries)]
-        yield pointer
+    return decoder.read_all(in_binary)
 
-def read_boundaries(in_binary: BinaryIO) -> Generator[int, None, None]:
+def read_boundaries(in_binary: BinaryIO,
+      c: bytes = b"") -> Generator[int, None, None]:
     """
     Read boundaries from binary file.
 
     Parameters:
     in_binary - BinaryIO - binary file to read from
+    c - bytes - the first byte of the boundaries, if it has already been read
 
     Return:
     Generator[int, None, None] - a generator of the boundaries found
     """
 
-    c: bytes = in_binary.read(1)
-    while c != b"\xff":
-        yield ord(c)
-        c = in_binary.read(1)
+    c = c or in_binary.read(1)
+    if c != b"\xff":
+        yield from c + read_until(in_binary)
+
+def read_coder(in_binary: BinaryIO, c: bytes = b"") -> Decoder:
+    """
+    Read the description of the code used for a set of pointers, which is
+    either a set of prefix boundaries or a set of Huffman code lengths, and
+    create a decoder for it.
+
+    Parameters:
+    in_binary - BinaryIO - binary file to read from
+    c - bytes - the first byte of the description, if it has already been read
+
+    Return:
+    Decoder - PrefixDecoder or HuffmanDecoder for the code that was read
+    """
+
+    c = c or in_binary.read(1)
+    if c == HUFFMAN_MARKER:
+        return HuffmanDecoder(read_lengths(in_binary))
+    return PrefixDecoder(list(read_boundaries(in_binary, c)))
+
+class EscapedDecoder:
+    """
+    A class to decode the pointers of a stream compressed with a shared
+    dictionary, where the code for the escape is followed by the index of a
+    word which isn't in the dictionary, which is given back as a pointer past
+    those of the dictionary, as in EscapedCodes.
+    """
+
+    def __init__(self, decoder: Decoder, escape: int, size: int,
+          width: int) -> None:
+        self.decoder: Decoder = decoder
+        self.escape: int = escape
+        self.size: int = size
+        self.width: int = width
+
+    def read(self, in_binary: BinaryReader) -> int:
+        pointer: int = self.decoder.read(in_binary)
+        if pointer == self.escape:
+            return self.size + in_binary.read_bits(self.width)
+        return pointer
+
+    def read_all(self, in_binary: BinaryReader) -> Generator[int, None, None]:
+        while True:
+            yield self.read(in_binary)
+
+@functools.lru_cache(maxsize=None)
+def trained_decoder(stream: TrainedStream) -> Decoder:
+    """
+    Create a decoder for the codes of a stream of a shared dictionary, once for
+    each stream.
+
+    Parameters:
+    stream - TrainedStream - the stream of the dictionary
+
+    Return:
+    Decoder - PrefixDecoder or HuffmanDecoder for its codes
+    """
+
+    if stream.counts is not None:
+        return HuffmanDecoder(stream.counts)
+    return PrefixDecoder(stream.boundaries)
+
+def read_trained_header(in_binary: BinaryIO,
+      dictionary: Optional[TrainedDictionary]
+      ) -> List[Tuple[EscapedDecoder, List[Union[str, int]]]]:
+    """
+    Read the start of a stream compressed with a shared dictionary, after the
+    dictionary marker, which is the checksum of the dictionary followed by the
+    words of each stream which weren't in it.
+
+    Parameters:
+    in_binary - BinaryIO - binary file to read from
+    dictionary - Optional[TrainedDictionary] - the shared dictionary, which
+     must be the one the stream was compressed with
+
+    Return:
+    List[Tuple[EscapedDecoder, List[Union[str, int]]]] - the decoder for each
+     stream, and the word for each of its pointers
+    """
+
+    if dictionary is None:
+        raise ValueError("compressed with a shared dictionary, which must be "
+                         "given with --dict")
+    if int.from_bytes(in_binary.read(4), "little") != dictionary.checksum:
+        raise ValueError("compressed with a different shared dictionary")
+    results: List[Tuple[EscapedDecoder, List[Union[str, int]]]] = []
+    stream: TrainedStream
+    separator: bytes
+    end: bytes
+    for stream, (separator, end) in zip(dictionary.streams,
+                                        DICTIONARY_SEPARATORS):
+        escaped: List[str] = list(read_dictionary(in_binary, separator, end))
+        results.append((EscapedDecoder(trained_decoder(stream), stream.escape,
+                                       stream.size,
+                                       max(len(escaped) - 1, 0).bit_length()),
+                        stream.pointer_words + escaped))
+    return results
+
+def decompress_stream(in_binary: BinaryIO, out_file: TextIO,
+      c: bytes = b"", dictionary: Optional[TrainedDictionary] = None) -> None:
+    """
+    Decompress a single stream, of the header and dictionary followed by the
+    pointers, from a binary file.
+
+    Parameters:
+    in_binary - BinaryIO - binary file to read from
+    out_file - TextIO - text file to write to
+    c - bytes - the first byte of the stream, if it has already been read
+    dictionary - Optional[TrainedDictionary] - the shared dictionary the
+     stream was compressed with, if any. defaults to None
+
+    Return:
+    None
+    """
+
+    br: BinaryReader = BinaryReader(in_binary)
+    c = c or in_binary.read(1)
+    if c == DICT_MARKER:
+        escaped_decoder: EscapedDecoder
+        pointer_words: List[Union[str, int]]
+        with stage("read escaped words"):
+            [(escaped_decoder, pointer_words)] = read_trained_header(in_binary,
+                                                                    dictionary)
+        with stage("decode and write"):
+            decompress(out_file, read_pointers(br, escaped_decoder),
+                       pointer_words)
+        return
+    with stage("read codes"):
+        decoder: Decoder = read_coder(in_binary, c)
+    with stage("read dictionary"):
+        words: List[str] = list(read_dictionary(in_binary)) + [EOF]
+    pointers: Generator[int, None, None] = read_pointers(br, decoder)
+    with stage("decode and write"):
+        decompress(out_file, pointers, words)
+
+def decompress_block(block: bytes, dict_path: Optional[str] = None) -> str:
+    """
+    Decompress a single compressed block into a string.
+
+    Parameters:
+    block - bytes - the compressed block
+    dict_path - Optional[str] - path of the shared dictionary it was compressed
+     with, if any, which is loaded once in each process. defaults to None
+
+    Return:
+    str - the decompressed text
+    """
+
+    out_file: StringIO = StringIO()
+    decompress_stream(BytesIO(block), out_file, b"", None if dict_path is None
+                      else load_trained(dict_path, 1))
+    return out_file.getvalue()
 
 def main(stdin: BinaryIO, stdout: TextIO, argv: List[str]) -> None:
-    br: BinaryReader = BinaryReader(stdin)
-    prefix_boundaries: List[int] = list(read_boundaries(stdin))
-    translator: Dict[Tuple[int], int] = generate_translator(prefix_boundaries)
-    words: List[str] = list(read_dictionary(stdin)) + [EOF]
-    pointers: List[int] = read_pointers(br, prefix_boundaries, translator)
-    decompress(stdout, pointers, words)
+    with profiled(argv), metrics.collected(argv):
+        jobs: int = get_jobs(argv)
+        dict_path: Optional[str] = get_dict(argv)
+        text_range: Optional[Tuple[int, Optional[int]]] = get_range(argv,
+                                                                    stdin)
+        c: bytes = stdin.read(1)
+        decompress_function: Callable[[bytes], str] = functools.partial(
+                decompress_block, dict_path=dict_path)
+        if c == ARCHIVE_MARKER and text_range is not None:
+            decompress_range(stdin, stdout, decompress_function, *text_range,
+                             slice_words, jobs, " ")
+        elif c == BLOCK_MARKER or c == ARCHIVE_MARKER:
+            decompress_blocks(stdin, stdout, decompress_function, jobs, " ")
+        elif text_range is not None:
+            raise ValueError("--range needs an archive written with --archive")
+        else:
+            decompress_stream(stdin, stdout, c, None if dict_path is None
+                              else load_trained(dict_path, 1))
 
 if __name__ == '__main__':
     stdin: BinaryIO
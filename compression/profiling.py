@@ -0,0 +1,276 @@
+##################################################################################
+
+"""
+Functions to profile the stages of a compressor or decompressor, with the
+--profile flag. Each named stage records its wall time, its CPU time and the
+peak RSS of the process by the time it ended, and the report is written to
+stderr, or as JSON to a file given to the flag. Times are exclusive, so a stage
+nested inside another is not counted again in the outer one. Lazy stages which
+are consumed by a later stage are counted in the stage which consumes them, and
+so are named after both.
+
+With --profile-memory as well, the peak memory traced by tracemalloc while each
+stage ran is recorded too. Tracing slows down every allocation, by up to twenty
+times in the LZW decoder, so it is kept apart from the timings.
+
+When --profile is not given, stage gives back a context manager which does
+nothing, so that a run which isn't profiled does no more work than before.
+
+Example usage:
+    $ python prefix_compression.py --input ../text/rom_ju_intro.txt --profile > /dev/null
+    $ python lossless_compression.py --input big.txt --profile profile.json > big.lossless
+    $ python lzw_decompression.py --input big.lzw --profile --profile-memory > /dev/null
+"""
+
+import sys
+import json
+import time
+import argparse
+import contextlib
+import tracemalloc
+
+from flags import flag_parser
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from typing import *
+
+class Stage:
+    """
+    The totals of a named stage across every time it was entered.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+        self.calls: int = 0
+        self.wall: float = 0.0
+        self.cpu: float = 0.0
+        self.peak: Optional[int] = None
+        self.max_rss: Optional[int] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "calls": self.calls, "wall": self.wall,
+                "cpu": self.cpu, "peak_bytes": self.peak,
+                "max_rss_kib": self.max_rss}
+
+    def __repr__(self) -> str:
+        return "Stage({!r}, calls={}, wall={:.6f}, cpu={:.6f})".format(
+                self.name, self.calls, self.wall, self.cpu)
+
+class Profiler:
+    """
+    A profiler which keeps a stack of the stages being run, and charges time
+    and memory to the innermost one whenever a stage is entered or left.
+    """
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.stages: Dict[str, Stage] = {}
+        self.stack: List[Stage] = []
+        self.other: Stage = Stage("other")
+        self.trace_memory: bool = trace_memory
+        self.started: bool = trace_memory and not tracemalloc.is_tracing()
+        if self.started:
+            tracemalloc.start()
+        if trace_memory:
+            tracemalloc.reset_peak()
+        self.start_wall: float = time.perf_counter()
+        self.start_cpu: float = time.process_time()
+        self.last_wall: float = self.start_wall
+        self.last_cpu: float = self.start_cpu
+        self.total: Stage = Stage("total")
+
+    def charge(self) -> None:
+        """
+        Charge the time and memory used since the last switch to the innermost
+        stage, or to "other" if no stage is being run.
+        """
+
+        wall: float = time.perf_counter()
+        cpu: float = time.process_time()
+        current: Stage = self.stack[-1] if self.stack else self.other
+        current.wall += wall - self.last_wall
+        current.cpu += cpu - self.last_cpu
+        if resource is not None:
+            current.max_rss = self.total.max_rss = resource.getrusage(
+                    resource.RUSAGE_SELF).ru_maxrss
+        if self.trace_memory:
+            peak: int = tracemalloc.get_traced_memory()[1]
+            current.peak = max(current.peak or 0, peak)
+            self.total.peak = max(self.total.peak or 0, peak)
+            tracemalloc.reset_peak()
+        self.last_wall = wall
+        self.last_cpu = cpu
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Generator[None, None, None]:
+        """
+        Run the body of a with statement as a named stage.
+        """
+
+        self.charge()
+        if name not in self.stages:
+            self.stages[name] = Stage(name)
+        current: Stage = self.stages[name]
+        current.calls += 1
+        self.stack.append(current)
+        try:
+            yield
+        finally:
+            self.charge()
+            self.stack.pop()
+
+    def stop(self) -> None:
+        """
+        Stop profiling, charging the remaining time, and stop tracemalloc if this
+        profiler started it.
+        """
+
+        self.charge()
+        self.total.calls = 1
+        self.total.wall = self.last_wall - self.start_wall
+        self.total.cpu = self.last_cpu - self.start_cpu
+        if self.started:
+            tracemalloc.stop()
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Give the results of each stage, in the order they were first entered,
+        followed by the time spent outside any stage and the totals.
+        """
+
+        return {"stages": [stage.as_dict() for stage in self.stages.values()],
+                "other": self.other.as_dict(),
+                "total": self.total.as_dict()}
+
+    def write_text(self, out_file: TextIO) -> None:
+        """
+        Write the results as a table.
+        """
+
+        out_file.write("{:<28} {:>6} {:>10} {:>10} {:>14} {:>12}\n".format(
+                       "stage", "calls", "wall (s)", "cpu (s)", "max RSS (KiB)",
+                       "peak (KiB)"))
+        stage: Stage
+        for stage in list(self.stages.values()) + [self.other, self.total]:
+            out_file.write("{:<28} {:>6} {:>10.4f} {:>10.4f} {:>14} {:>12}\n"
+                           .format(stage.name, stage.calls, stage.wall,
+                                   stage.cpu, "-" if stage.max_rss is None
+                                   else stage.max_rss, "-" if stage.peak is None
+                                   else "{:.1f}".format(stage.peak / 1024)))
+
+PROFILER: Optional[Profiler] = None
+
+NULL_STAGE: ContextManager[None] = contextlib.nullcontext()
+
+def stage(name: str) -> ContextManager[None]:
+    """
+    Get a context manager to run a named stage in, which records it if the run
+    is being profiled, and otherwise does nothing.
+
+    Example usage:
+    >>> with stage("tokenise"):
+    ...     words = ["A", "B"]
+
+    Parameters:
+    name - str - the name of the stage
+
+    Return:
+    ContextManager[None] - context manager for the stage
+    """
+
+    return NULL_STAGE if PROFILER is None else PROFILER.stage(name)
+
+def get_profile(argv: List[str]) -> Optional[str]:
+    """
+    Parse where to write a profile from given arguments, using the --profile
+    flag, which can be given a file to write JSON to. Without a file, the
+    profile is written to stderr.
+
+    Example usage:
+    >>> get_profile(["--profile", "out.json"])
+    'out.json'
+    >>> get_profile(["--profile"])
+    '-'
+    >>> get_profile([]) is None
+    True
+
+    Parameters:
+    argv - List[str] - list of arguments to parse (and modify)
+
+    Return:
+    Optional[str] - the file to write to, "-" for stderr, or None to not
+     profile
+    """
+
+    parser: argparse.ArgumentParser = flag_parser("--profile", nargs="?",
+                                                  const="-")
+    args: argparse.Namespace
+    remaining: List[str]
+    args, remaining = parser.parse_known_args(argv)
+    argv[:] = remaining
+    return args.profile
+
+def get_profile_memory(argv: List[str]) -> bool:
+    """
+    Parse whether to trace memory while profiling from given arguments, using
+    the --profile-memory flag.
+
+    Example usage:
+    >>> get_profile_memory(["--profile-memory"])
+    True
+    >>> get_profile_memory(["--profile"])
+    False
+
+    Parameters:
+    argv - List[str] - list of arguments to parse (and modify)
+
+    Return:
+    bool - whether to trace memory with tracemalloc
+    """
+
+    # --profile must not be taken as an abbreviation of --profile-memory
+    parser: argparse.ArgumentParser = flag_parser(
+            "--profile-memory", allow_abbrev=False, action="store_true")
+    args: argparse.Namespace
+    remaining: List[str]
+    args, remaining = parser.parse_known_args(argv)
+    argv[:] = remaining
+    return args.profile_memory
+
+@contextlib.contextmanager
+def profiled(argv: List[str]) -> Generator[None, None, None]:
+    """
+    Profile the body of a with statement if --profile is given in the
+    arguments, tracing memory as well if --profile-memory is given, and write a
+    report at the end.
+
+    Parameters:
+    argv - List[str] - list of arguments to parse (and modify)
+
+    Return:
+    Generator[None, None, None] - context manager for the run
+    """
+
+    global PROFILER
+    target: Optional[str] = get_profile(argv)
+    trace_memory: bool = get_profile_memory(argv)
+    if target is None:
+        yield
+        return
+
+    PROFILER = Profiler(trace_memory)
+    try:
+        yield
+    finally:
+        profiler: Profiler = PROFILER
+        PROFILER = None
+        profiler.stop()
+        if target == "-":
+            profiler.write_text(sys.stderr)
+        else:
+            with open(target, "w") as out_file:
+                json.dump(profiler.report(), out_file, indent=2)
+                out_file.write("\n")
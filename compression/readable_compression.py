@@ -7,10 +7,19 @@ of unique words and using references to this index to store words. These
 """
 
 
+import io
+import os
+import re
 import sys
+import mmap
+import stat
+import time
 import string
 import argparse
 
+from profiling import profiled, stage
+import metrics
+
 from typing import *
 from typing.io import *
 
@@ -19,6 +28,12 @@ SomeText = Union[str, bytes]
 WHITESPACE: Set[str] = set(string.whitespace)
 LETTERS: Set[str] = set(string.ascii_letters)
 
+CHUNK_SIZE: int = 1 << 16
+
+# anything which is neither a letter nor whitespace, and so is dropped from words
+NON_WORD: Pattern = re.compile("[^{}{}]+".format(string.ascii_letters,
+                                                 re.escape(string.whitespace)))
+
 class std_streams:
     """
     An object to wrap around two file like objects, and provide boilerplate
@@ -40,12 +55,78 @@ class std_streams:
     def __repr__(self) -> str:
         return "std_streams({}, {})".format(self.stdin, self.stdout)
 
+class MappedFile(io.BufferedIOBase):
+    """
+    A read-only binary file backed by a memory map of a regular file, so that
+    reads are slices of the mapped pages rather than system calls into a
+    buffer. It takes ownership of the file it maps, and closes it when closed.
+    """
+
+    def __init__(self, in_file: IO) -> None:
+        if not stat.S_ISREG(os.fstat(in_file.fileno()).st_mode):
+            raise ValueError("only regular files can be mapped")
+        self.map: mmap.mmap = mmap.mmap(in_file.fileno(), 0,
+                                        access=mmap.ACCESS_READ)
+        self.pos: int = 0
+        self.in_file: IO = in_file
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        end: int = (len(self.map) if size is None or size < 0
+                    else min(self.pos + size, len(self.map)))
+        data: bytes = self.map[self.pos:end]
+        self.pos = max(self.pos, end)
+        return data
+
+    read1 = read
+
+    def readinto(self, buffer: bytearray) -> int:
+        data: bytes = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def peek(self, size: int = 0) -> bytes:
+        return self.map[self.pos:self.pos + max(size, CHUNK_SIZE)]
+
+    def close(self) -> None:
+        if not self.closed:
+            self.map.close()
+            self.in_file.close()
+        super().close()
+
+    def __repr__(self) -> str:
+        return "MappedFile({})".format(self.in_file)
+
+def map_file(in_file: IO, binary: bool) -> IO:
+    """
+    Memory map a file if possible, giving back an object which reads in the
+    same mode as the file. Anything that can't be mapped, such as a pipe or an
+    empty file, is given back as it is.
+
+    Parameters:
+    in_file - IO - the file to map
+    binary - bool - whether the file is opened in binary mode
+
+    Return:
+    IO - a file to read from
+    """
+
+    try:
+        mapped: MappedFile = MappedFile(in_file)
+    except (ValueError, OSError, io.UnsupportedOperation):
+        return in_file
+    return mapped if binary else io.TextIOWrapper(mapped,
+                                                  encoding=in_file.encoding)
+
 def get_std_streams(argv: List[str], in_binary: bool = False,
       out_binary: bool = False) -> std_streams:
     """
     Get an input to read from and an output to write to, by parsing the given
     arguments, using --input and --output flags, defaulting to stdin and stdout.
-    Allows binary mode to be requested.
+    Allows binary mode to be requested. With the --mmap flag, an input which is
+    a regular file is memory mapped, while pipes are read as usual.
 
     Example usage:
     >>> get_std_streams(["--output", "out.txt"], in_binary=True)
@@ -81,13 +162,19 @@ def get_std_streams(argv: List[str], in_binary: bool = False,
                     'w'), default=(sys.stdout.buffer if out_binary else sys.stdout))
     args: argparse.Namespace
     remaining: List[str]
+    parser.add_argument("--mmap", action="store_true")
     args, remaining = parser.parse_known_args(argv)
     argv[:] = remaining
+    if args.mmap:
+        args.input = map_file(args.input, in_binary)
     return std_streams(args.input, args.output)
 
-def get_words(words_file: TextIO) -> Generator[str, None, None]:
+def get_words(words_file: TextIO, chunk_size: int = CHUNK_SIZE
+      ) -> Generator[str, None, None]:
     """
-    Read whitespace separated words from a file. Ignores punctuation.
+    Read whitespace separated words from a file. Ignores punctuation. The file
+    is read in chunks, which are stripped of anything but letters and whitespace
+    and then split, carrying any word at the end of a chunk over to the next.
 
     Example usage (with the get_input_result helper function from test_readable_compression):
     >>> get_input_result(get_words, "One TwO THREE", [], wrapper=list)
@@ -98,9 +185,13 @@ def get_words(words_file: TextIO) -> Generator[str, None, None]:
     ['TWO']
     >>> get_input_result(get_words, "", [], wrapper=list)
     []
+    >>> get_input_result(get_words, "one two", [2], wrapper=list)
+    ['ONE', 'TWO']
 
     Parameters:
     words_file - TextIO - a text file to read strings fromm
+    chunk_size - int - number of characters to read at a time. defaults to
+     CHUNK_SIZE
 
     Return:
     Generator[str, None, None] - a generator of strings, representing words
@@ -108,18 +199,21 @@ def get_words(words_file: TextIO) -> Generator[str, None, None]:
     
     """
 
-    word: List[str] = []
-    c: str = words_file.read(1)
-    while c:
-        if c in LETTERS:
-            word.append(c.upper())
-        elif c in WHITESPACE:
-            if word:
-                yield "".join(word)
-                word = []
-        c = words_file.read(1)
-    if word:
-        yield "".join(word)
+    started: float = time.perf_counter()
+    count: int = 0
+    carry: str = ""
+    chunk: str
+    for chunk in iter(lambda: words_file.read(chunk_size), ""):
+        text: str = carry + NON_WORD.sub("", chunk).upper()
+        words: List[str] = text.split()
+        carry = words.pop() if words and text[-1] not in WHITESPACE else ""
+        count += len(words)
+        yield from words
+    if carry:
+        count += 1
+        yield carry
+    metrics.add_rate("tokenizer_tokens", count, time.perf_counter() - started,
+                     tokenizer="get_words")
 
 def compress_words(words: Iterable[str]) -> Tuple[List[str], List[int]]:
     """
@@ -211,12 +305,16 @@ def write_pointers(out_file: TextIO, pointers: List[int], encoder: Callable[[int
     out_file.write(separator.join(encoder(pointer) for pointer in pointers))
 
 def main(stdin: TextIO, stdout: TextIO, argv: List[str]) -> None:
-    words: List[str] = get_words(stdin)
-    unique_words: List[str]
-    pointers: List[int]
-    unique_words, pointers = compress_words(words)
-    write_dictionary(stdout, unique_words, " ", "\n")
-    write_pointers(stdout, pointers)
+    with profiled(argv), metrics.collected(argv):
+        words: List[str] = get_words(stdin)
+        unique_words: List[str]
+        pointers: List[int]
+        with stage("tokenise and index words"):
+            unique_words, pointers = compress_words(words)
+        with stage("write dictionary"):
+            write_dictionary(stdout, unique_words, " ", "\n")
+        with stage("write pointers"):
+            write_pointers(stdout, pointers)
     
 if __name__ == "__main__":
     stdin: TextIO
@@ -6,12 +6,17 @@ A script to decompress output from readable_compression back into normal
 """
 
 import sys
+import itertools
 
 from readable_compression import get_std_streams, SomeText
+from profiling import profiled, stage
+import metrics
 
 from typing import *
 from typing.io import *
 
+WRITE_BATCH: int = 1 << 12
+
 def read_dictionary(in_file: TextIO, separator: SomeText = " ",
       end: SomeText = "\n") -> Generator[str, None, None]:
     """
@@ -85,7 +90,47 @@ def read_pointers(in_file: TextIO, decoder: Callable[[SomeText], int] = int,
     if n:
         yield decoder("".join(n))
 
-def decompress(out_file: TextIO, pointers: Iterable[int], words: List[str]) -> None:
+def write_batched(out_file: TextIO, texts: Iterable[str], separator: str = "",
+      batch_size: int = WRITE_BATCH) -> None:
+    """
+    Write a series of strings to a file, joined by a separator. Strings are
+    joined and written a batch at a time, rather than with a call to write for
+    each one, while only holding a batch of them in memory at once. The number
+    of strings and batches written is added to the metrics.
+
+    Example usage:
+    >>> get_output_result(write_batched, [["a", "b", "c"], " ", 2])
+    'a b c'
+    >>> get_output_result(write_batched, [[]])
+    ''
+
+    Parameters:
+    out_file - TextIO - text file to write to
+    texts - Iterable[str] - strings to write
+    separator - str - text to write between strings. defaults to nothing
+    batch_size - int - number of strings to write at a time. defaults to
+     WRITE_BATCH
+
+    Return:
+    None
+    """
+
+    count: int = 0
+    batches: int = 0
+    iterator: Iterator[str] = iter(texts)
+    batch: List[str] = list(itertools.islice(iterator, batch_size))
+    while batch:
+        out_file.write(separator.join(batch))
+        count += len(batch)
+        batches += 1
+        batch = list(itertools.islice(iterator, batch_size))
+        if batch:
+            out_file.write(separator)
+    metrics.add("output_tokens_total", count)
+    metrics.add("output_batches_total", batches)
+
+def decompress(out_file: TextIO, pointers: Iterable[int], words: List[str],
+      batch_size: int = WRITE_BATCH) -> None:
     """
     Using pointers and unique words, decompress the file and write this to a given
     output file
@@ -102,24 +147,22 @@ def decompress(out_file: TextIO, pointers: Iterable[int], words: List[str]) -> N
     out_file - TextIO - text file to write to
     pointers - Iterable[int] - pointers to words to iterate over
     words - List[str] - words to index with pointers
+    batch_size - int - number of words to write at a time. defaults to
+     WRITE_BATCH
 
     Return:
     None
     """
 
-    do_space: bool = False
-    i: int
-    for i in pointers:
-        if do_space:
-            out_file.write(" ")
-        else:
-            do_space = True
-        out_file.write(words[i])
+    write_batched(out_file, map(words.__getitem__, pointers), " ", batch_size)
 
 def main(stdin: TextIO, stdout: TextIO, argv: List[str]) -> None:
-    words: List[str] = list(read_dictionary(stdin, " ", "\n"))
-    pointers: Generator[int, None, None] = read_pointers(stdin, int, " ")
-    decompress(stdout, pointers, words)
+    with profiled(argv), metrics.collected(argv):
+        with stage("read dictionary"):
+            words: List[str] = list(read_dictionary(stdin, " ", "\n"))
+        pointers: Generator[int, None, None] = read_pointers(stdin, int, " ")
+        with stage("read pointers and write"):
+            decompress(stdout, pointers, words)
 
 if __name__ == "__main__":
     stdin: TextIO
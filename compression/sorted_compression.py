@@ -11,10 +11,41 @@ import collections
 
 from readable_compression import (get_std_streams, get_words,
                                   write_dictionary, write_pointers)
+from profiling import profiled, stage
+import metrics
 
 from typing import *
 from typing.io import *
 
+def compile_counted_dictionary(words: Iterable[str]
+      ) -> Tuple[Dict[str, int], List[str], List[int]]:
+    """
+    Compile a dictionary and list of unique words sorted by frequency, as
+    compile_dictionary does, along with the number of times each word occurs.
+
+    Example usage:
+    >>> compile_counted_dictionary(["FOO", "BAR", "FOO", "BAR", "FOO", "EGGS"])
+    ({'FOO': 0, 'BAR': 1, 'EGGS': 2}, ['FOO', 'BAR', 'EGGS'], [3, 2, 1])
+    >>> compile_counted_dictionary([])
+    ({}, [], [])
+
+    Parameters:
+    words - Iterable[str] - the sequence of words to process
+
+    Return:
+    Tuple[Dict[str, int], List[str], List[int]] - a tuple of the dictionary to
+     be used in compressing, the list of unique words in order to write to
+     file, and the frequency of each of these words, in descending order
+    """
+
+    c: collections.Counter = collections.Counter(words)
+    common: List[Tuple[str, int]] = c.most_common()
+    words_list: List[str] = [i[0] for i in common]
+    i: str
+    ind: int
+    return ({i: ind for ind, i in enumerate(words_list)}, words_list,
+            [i[1] for i in common])
+
 def compile_dictionary(words: Iterable[str]) -> Tuple[Dict[str, int], List[str]]:
     """
     Compile a dictionary and list of unique words sorted by frequency, using
@@ -37,11 +68,10 @@ def compile_dictionary(words: Iterable[str]) -> Tuple[Dict[str, int], List[str]]
      compressing, and of the list of unique words in order to write to file.
     """
 
-    c: collections.Counter = collections.Counter(words)
-    words_list: List[str] = [i[0] for i in c.most_common()]
-    i: str
-    ind: int
-    return {i: ind for ind, i in enumerate(words_list)}, words_list
+    words_dict: Dict[str, int]
+    words_list: List[str]
+    words_dict, words_list, _ = compile_counted_dictionary(words)
+    return words_dict, words_list
     
 def compile_pointers(words: List[str], words_dict: Dict[str, int]) -> Generator[int, None, None]:
     """
@@ -69,13 +99,18 @@ def compile_pointers(words: List[str], words_dict: Dict[str, int]) -> Generator[
     return (words_dict[word] for word in words)
     
 def main(stdin: TextIO, stdout: TextIO, argv: List[str]) -> None:
-    words: List[str] = list(get_words(stdin))
-    words_dict: Dict[str, int]
-    keywords: List[str]
-    words_dict, keywords = compile_dictionary(words)
-    pointers: Generator[int, None, None] = compile_pointers(words, words_dict)
-    write_dictionary(stdout, keywords)
-    write_pointers(stdout, pointers)
+    with profiled(argv), metrics.collected(argv):
+        with stage("tokenise"):
+            words: List[str] = list(get_words(stdin))
+        words_dict: Dict[str, int]
+        keywords: List[str]
+        with stage("compile dictionary"):
+            words_dict, keywords = compile_dictionary(words)
+        pointers: Generator[int, None, None] = compile_pointers(words, words_dict)
+        with stage("write dictionary"):
+            write_dictionary(stdout, keywords)
+        with stage("compile and write pointers"):
+            write_pointers(stdout, pointers)
     
 if __name__ == "__main__":
     stdin: TextIO
@@ -0,0 +1,267 @@
+##################################################################################
+
+"""
+A script to generate seeded synthetic text for scale testing, from kilobytes to
+gigabytes. Words are drawn from a generated vocabulary with Zipfian frequencies,
+so that a few short words are very common and most words are rare, and are
+separated by spaces or by a mix of punctuation, broken into lines. The text is
+generated as a stream of chunks, so it is never held in memory as a whole, and
+the same seed and settings always give the same text, whatever the chunk size.
+
+The vocabulary size stresses compile_dictionary and the word indices, the skew
+stresses how well the prefix and Huffman codes do, the density of punctuation
+stresses get_runs and the punctuation dictionary, and all of them drive the
+size of the LZW dictionary.
+
+Example usage:
+    $ python synthetic_corpus.py --size 100M --seed 1 --output big.txt
+    $ python synthetic_corpus.py --size 1M --punctuation 0.6 | python lzw_compression.py | wc -c
+"""
+
+import io
+import sys
+import random
+import argparse
+import itertools
+
+from readable_compression import CHUNK_SIZE
+
+from typing import *
+
+VOCABULARY_SIZE: int = 20000
+SKEW: float = 1.0
+LINE_LENGTH: int = 72
+PUNCTUATION_DENSITY: float = 0.15
+
+# number of words drawn from the random number generator at a time, which is
+# fixed so that the text doesn't depend on the chunk size
+WORD_BATCH: int = 1024
+
+# the letters that words are made of, weighted by their rough frequency in
+# English. each syllable is an optional onset, a vowel and an optional coda
+ONSETS: str = "tnshrdlcmwfgypbvkjxqz"
+ONSET_WEIGHTS: List[float] = [9.1, 6.7, 6.3, 6.1, 6.0, 4.3, 4.0, 2.8, 2.4, 2.4,
+                              2.2, 2.0, 2.0, 1.9, 1.5, 1.0, 0.8, 0.2, 0.2, 0.1,
+                              0.1]
+VOWELS: str = "eaoiuy"
+VOWEL_WEIGHTS: List[float] = [12.7, 8.2, 7.5, 7.0, 2.8, 1.0]
+CODAS: str = "nstrdlmck"
+CODA_WEIGHTS: List[float] = [6.7, 6.3, 9.1, 6.0, 4.3, 4.0, 2.4, 1.4, 0.8]
+
+# separators which replace a space, and their weights. those in ENDINGS end a
+# sentence, so the next word is capitalised
+PUNCTUATION: List[str] = [", ", ". ", "; ", ": ", "! ", "? ", " -- ", "'s ",
+                          "' ", " (", ") ", "\" ", " 1 ", "... "]
+PUNCTUATION_WEIGHTS: List[float] = [35, 30, 4, 3, 3, 4, 3, 6, 2, 2, 2, 3, 1, 2]
+ENDINGS: Set[str] = {". ", "! ", "? ", "... "}
+
+SUFFIXES: Dict[str, int] = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+def parse_size(size: str) -> int:
+    """
+    Parse a number of characters, which can have a suffix of K, M or G for
+    powers of 1024.
+
+    Example usage:
+    >>> parse_size("1500")
+    1500
+    >>> parse_size("2k")
+    2048
+    >>> parse_size("1.5M")
+    1572864
+
+    Parameters:
+    size - str - the size to parse
+
+    Return:
+    int - the number of characters
+    """
+
+    size = size.strip().upper()
+    suffix: str = size[-1:] if size[-1:] in SUFFIXES else ""
+    try:
+        return int(float(size[:len(size) - len(suffix)]) * SUFFIXES[suffix])
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid size: {!r}".format(size))
+
+def make_vocabulary(size: int, rng: random.Random) -> List[str]:
+    """
+    Generate a vocabulary of unique lowercase words, ordered roughly from
+    shortest to longest, so that the most frequent words are the shortest, as
+    in natural language.
+
+    Parameters:
+    size - int - the number of words
+    rng - random.Random - random number generator to draw from
+
+    Return:
+    List[str] - the vocabulary, by rank
+    """
+
+    onset_weights: List[float] = list(itertools.accumulate(ONSET_WEIGHTS))
+    vowel_weights: List[float] = list(itertools.accumulate(VOWEL_WEIGHTS))
+    coda_weights: List[float] = list(itertools.accumulate(CODA_WEIGHTS))
+    words: Set[str] = set()
+    vocabulary: List[str] = []
+    while len(vocabulary) < size:
+        # syllables are drawn for a batch of words at a time
+        lengths: List[int] = [min(6, 1 + int(rng.expovariate(1.1)))
+                              for _ in range(WORD_BATCH)]
+        total: int = sum(lengths)
+        syllables: List[str] = [
+                (onset if r < 0.8 else "") + vowel + (coda if r < 0.32 else "")
+                for onset, vowel, coda, r in zip(
+                    rng.choices(ONSETS, cum_weights=onset_weights, k=total),
+                    rng.choices(VOWELS, cum_weights=vowel_weights, k=total),
+                    rng.choices(CODAS, cum_weights=coda_weights, k=total),
+                    [rng.random() for _ in range(total)])]
+        start: int = 0
+        length: int
+        for length in lengths:
+            word: str = "".join(syllables[start:start + length])
+            start += length
+            if word not in words and len(vocabulary) < size:
+                words.add(word)
+                vocabulary.append(word)
+    keys: Dict[str, float] = {word: len(word) + rng.random() * 4
+                              for word in vocabulary}
+    vocabulary.sort(key=keys.__getitem__)
+    return vocabulary
+
+def generate_text(size: Optional[int], seed: int = 0,
+      vocabulary_size: int = VOCABULARY_SIZE, skew: float = SKEW,
+      line_length: int = LINE_LENGTH, punctuation: float = PUNCTUATION_DENSITY,
+      chunk_size: int = CHUNK_SIZE) -> Generator[str, None, None]:
+    """
+    Generate synthetic text as a stream of chunks. The word of rank r is drawn
+    with a weight of 1 / r ** skew, and each word is followed by punctuation
+    with a probability of the density given, or else by a space. A separator ending
+    in a space is ended with a newline instead once a line is line_length
+    characters long.
+
+    Example usage:
+    >>> len("".join(generate_text(1000, seed=3)))
+    1000
+    >>> "".join(generate_text(1000)) == "".join(generate_text(1000, chunk_size=7))
+    True
+
+    Parameters:
+    size - Optional[int] - the number of characters to generate, or None to
+     generate forever
+    seed - int - seed for the random number generator. defaults to 0
+    vocabulary_size - int - the number of unique words. defaults to
+     VOCABULARY_SIZE
+    skew - float - the exponent of the Zipf distribution, where 0 makes every
+     word equally likely. defaults to SKEW
+    line_length - int - the length after which lines are broken. defaults to
+     LINE_LENGTH
+    punctuation - float - the probability that a word is followed by
+     punctuation rather than a space. defaults to PUNCTUATION_DENSITY
+    chunk_size - int - the least number of characters in each chunk, except
+     the last. defaults to CHUNK_SIZE
+
+    Return:
+    Generator[str, None, None] - generator of chunks of text
+    """
+
+    rng: random.Random = random.Random(seed)
+    vocabulary: List[str] = make_vocabulary(vocabulary_size, rng)
+    cum_weights: List[float] = list(itertools.accumulate(
+            1 / (rank + 1) ** skew for rank in range(vocabulary_size)))
+    # a space takes the rest of the weight, so that punctuation has the density
+    # given
+    spaces: float = (sum(PUNCTUATION_WEIGHTS) * (1 - punctuation) / punctuation
+                     if punctuation > 0 else 1.0)
+    separator_weights: List[float] = list(itertools.accumulate(
+            [spaces] + (PUNCTUATION_WEIGHTS if punctuation > 0
+                        else [0.0] * len(PUNCTUATION))))
+
+    remaining: Optional[int] = size
+    pieces: List[str] = []
+    pending: int = 0
+    column: int = 0
+    capital: bool = True
+    while remaining is None or remaining > 0:
+        words: List[str] = rng.choices(vocabulary, cum_weights=cum_weights,
+                                       k=WORD_BATCH)
+        separators: List[str] = rng.choices([" "] + PUNCTUATION,
+                                            cum_weights=separator_weights,
+                                            k=WORD_BATCH)
+        word: str
+        separator: str
+        for word, separator in zip(words, separators):
+            if capital:
+                word = word.capitalize()
+            capital = separator in ENDINGS
+            column += len(word) + len(separator)
+            if column >= line_length and separator.endswith(" "):
+                separator = separator[:-1] + "\n"
+                column = 0
+            pieces.append(word)
+            pieces.append(separator)
+            pending += len(word) + len(separator)
+
+        if pending >= chunk_size or (remaining is not None
+                                     and pending >= remaining):
+            text: str = "".join(pieces)
+            if remaining is not None:
+                text = text[:remaining]
+                remaining -= len(text)
+            yield text
+            pieces = []
+            pending = 0
+
+class GeneratedText(io.TextIOBase):
+    """
+    A readable text file of synthetic text from generate_text, which can be
+    given to the compressors and tests in place of a real file, without the
+    text ever being held in memory as a whole.
+    """
+
+    def __init__(self, size: Optional[int], **kwargs: Any) -> None:
+        self.chunks: Iterator[str] = generate_text(size, **kwargs)
+        self.buffer: str = ""
+        # the position in the buffer to read from, so that reads don't copy
+        # the rest of the buffer, which is only dropped when it's refilled
+        self.offset: int = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> str:
+        if size is None or size < 0:
+            text: str = self.buffer[self.offset:] + "".join(self.chunks)
+            self.buffer = ""
+            self.offset = 0
+            return text
+        while len(self.buffer) - self.offset < size:
+            chunk: Optional[str] = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer = self.buffer[self.offset:] + chunk
+            self.offset = 0
+        text = self.buffer[self.offset:self.offset + size]
+        self.offset += len(text)
+        return text
+
+def main(argv: List[str]) -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=parse_size, default=1 << 20,
+                        help="number of characters, with an optional K, M or G")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--vocabulary", type=int, default=VOCABULARY_SIZE)
+    parser.add_argument("--skew", type=float, default=SKEW)
+    parser.add_argument("--line-length", type=int, default=LINE_LENGTH)
+    parser.add_argument("--punctuation", type=float,
+                        default=PUNCTUATION_DENSITY)
+    parser.add_argument("--output", type=argparse.FileType("w"),
+                        default=sys.stdout)
+    args: argparse.Namespace = parser.parse_args(argv[1:])
+
+    with args.output as out_file:
+        out_file.writelines(generate_text(args.size, args.seed, args.vocabulary,
+                                          args.skew, args.line_length,
+                                          args.punctuation))
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,95 @@
+import os
+import re
+import tempfile
+import itertools
+import unittest
+
+from io import StringIO, BytesIO
+
+from readable_compression import get_words
+from lossless_compression import get_runs
+import prefix_compression
+import lossless_compression
+
+from archive_grep import *
+
+TEXT: str = ("Two households, both alike in dignity,\n"
+             "In fair Verona, where we lay our scene,\n"
+             "From ancient grudge break to new mutiny,\n"
+             "Where civil blood makes civil hands unclean.\n") * 20
+
+def compressed(module: Any, argv: List[str]) -> BytesIO:
+    out_binary: BytesIO = BytesIO()
+    module.main(StringIO(TEXT), out_binary, argv)
+    return BytesIO(out_binary.getvalue())
+
+def scan(tokens: List[str], pattern: str, lossless: bool) -> List[int]:
+    starts: Iterable[int] = (itertools.accumulate(map(len, tokens), initial=0)
+                             if lossless else itertools.count())
+    return [start for start, token in zip(starts, tokens)
+            if re.search(pattern, token)]
+
+class TestArchiveGrep(unittest.TestCase):
+    def check(self, module: Any, lossless: bool, argv: List[str]) -> None:
+        tokens: List[str] = (list(get_runs(StringIO(TEXT))) if lossless
+                             else list(get_words(StringIO(TEXT))))
+        pattern: str
+        for pattern in ["^WHERE$", "^Where$", "CIVIL|civil", "^[A-Z]+Y$",
+                        "zebra", ",\n"]:
+            self.assertEqual([match.position for match in
+                              grep(compressed(module, argv), pattern,
+                                   lossless=lossless)],
+                             scan(tokens, pattern, lossless))
+
+    def test_prefix(self) -> None:
+        argv: List[str]
+        for argv in [[], ["--coder", "huffman"], ["--block-size", "100"],
+                     ["--archive", "--block-size", "100"]]:
+            self.check(prefix_compression, False, argv)
+
+    def test_lossless(self) -> None:
+        argv: List[str]
+        for argv in [[], ["--coder", "huffman"], ["--archive"]]:
+            self.check(lossless_compression, True, argv)
+
+    def test_context(self) -> None:
+        matches: List[Match] = list(grep(compressed(prefix_compression, []),
+                                         "VERONA", context=2))
+        self.assertEqual(matches[0], Match(8, "IN FAIR VERONA WHERE WE"))
+        self.assertEqual(len(matches), 20)
+        matches = list(grep(compressed(lossless_compression, []), "^Verona$",
+                            lossless=True, context=1))
+        self.assertEqual(matches[0], Match(TEXT.index("Verona"),
+                                           "fair Verona, where"))
+        self.assertEqual(list(grep(compressed(lossless_compression, []),
+                                   "^tw", re.IGNORECASE, True, 1))[0],
+                         Match(0, "Two households"))
+
+    def test_skip(self) -> None:
+        in_binary: BytesIO = compressed(lossless_compression,
+                                        ["--archive", "--block-size", "50"])
+        in_binary.read(1)
+        blocks: List[bytes] = list(read_frames(in_binary))
+        self.assertEqual(grep_block(blocks[0], "zebra", lossless=True,
+                                    skip=True), ([], None))
+        self.assertEqual(grep_block(blocks[0], "zebra", lossless=True),
+                         ([], 50))
+
+    def test_main(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            in_path: str = os.path.join(tmp, "text.arc")
+            out_path: str = os.path.join(tmp, "matches.txt")
+            with open(in_path, "wb") as out_binary:
+                out_binary.write(compressed(prefix_compression, ["--archive"])
+                                 .getvalue())
+            main(["archive_grep.py", "--count", "VERONA", "--input", in_path,
+                  "--output", out_path])
+            with open(out_path) as in_file:
+                self.assertEqual(in_file.read(), "20\n")
+            main(["archive_grep.py", "^DIG", "--input", in_path, "--output",
+                  out_path, "--jobs", "2"])
+            with open(out_path) as in_file:
+                self.assertEqual(in_file.readline(), "5: DIGNITY\n")
+
+if __name__ == "__main__":
+    unittest.main()
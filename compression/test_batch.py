@@ -0,0 +1,124 @@
+import io
+import os
+import contextlib
+import tempfile
+import unittest
+
+from batch import *
+
+TEXTS: List[str] = ["Don't panic!\n", "", "the cat sat on the mat, the end\n"]
+
+class TestBatch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.sources: List[str] = []
+        i: int
+        text: str
+        for i, text in enumerate(TEXTS):
+            path: str = os.path.join(self.tmp.name, "in", "{}.txt".format(i))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as out_file:
+                out_file.write(text)
+            self.sources.append(path)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def round_trip(self, codec: str, processes: int = 1) -> List[str]:
+        out_dir: str = os.path.join(self.tmp.name, codec)
+        jobs: List[Job] = [Job(source, target_path(source, out_dir,
+                                                   "." + codec))
+                           for source in self.sources]
+        results: List[Result] = list(run_batch(jobs, codec,
+                                               processes=processes))
+        self.assertEqual([result.error for result in results],
+                         [None] * len(jobs))
+        self.assertEqual([result.source for result in results], self.sources)
+        back: List[Job] = [Job(job.target, job.target + ".txt") for job in jobs]
+        results = list(run_batch(back, codec, decompress=True,
+                                 processes=processes))
+        self.assertEqual([result.error for result in results],
+                         [None] * len(jobs))
+        outputs: List[str] = []
+        job: Job
+        for job in back:
+            with open(job.target, "rb") as in_file:
+                outputs.append(in_file.read().decode())
+        return outputs
+
+    def test_lossless(self) -> None:
+        self.assertEqual(self.round_trip("lossless"), TEXTS)
+        self.assertEqual(self.round_trip("lzw"), TEXTS)
+        self.assertEqual(self.round_trip("lzw-bytes"), TEXTS)
+
+    def test_lossy(self) -> None:
+        self.assertEqual(self.round_trip("prefix"),
+                         ["DONT PANIC", "", "THE CAT SAT ON THE MAT THE END"])
+
+    def test_processes(self) -> None:
+        self.assertEqual(self.round_trip("lossless-huffman", processes=2),
+                         TEXTS)
+
+    def test_errors(self) -> None:
+        jobs: List[Job] = [Job(os.path.join(self.tmp.name, "missing.txt"),
+                               os.path.join(self.tmp.name, "missing.lzw")),
+                           Job(self.sources[0], self.sources[0] + ".lzw")]
+        results: List[Result] = list(run_batch(jobs, "lzw"))
+        self.assertIsNotNone(results[0].error)
+        self.assertIsNone(results[1].error)
+
+    def test_failed_output(self) -> None:
+        bad: str = os.path.join(self.tmp.name, "bad.lzw")
+        with open(bad, "wb") as out_binary:
+            out_binary.write(b"\xff" * 10)
+        jobs: List[Job] = [Job(bad, bad + ".txt"),
+                           Job(os.path.join(self.tmp.name, "missing.txt"),
+                               os.path.join(self.tmp.name, "missing.txt.lzw"))]
+        results: List[Result] = list(run_batch(jobs[:1], "lzw",
+                                               decompress=True))
+        results.extend(run_batch(jobs[1:], "lzw"))
+        self.assertTrue(all(result.error is not None for result in results))
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["bad.lzw", "in"])
+
+    def test_nested_jobs(self) -> None:
+        jobs: List[Job] = [Job(source, source + ".lossless")
+                           for source in self.sources]
+        with self.assertRaises(ValueError):
+            run_batch(jobs, "lossless", argv=["--jobs", "2"], processes=2)
+        err_file: io.StringIO = io.StringIO()
+        with contextlib.redirect_stderr(err_file), \
+             self.assertRaises(SystemExit):
+            main(["batch.py", "lossless", "--jobs", "2"] + self.sources
+                 + ["--", "--jobs", "2"])
+        self.assertIn("--jobs as well", err_file.getvalue())
+        # either one on its own is fine
+        results: List[Result] = list(run_batch(jobs, "lossless",
+                                               argv=["--jobs", "2"]))
+        self.assertEqual([result.error for result in results],
+                         [None] * len(jobs))
+
+    def test_help(self) -> None:
+        out_file: io.StringIO = io.StringIO()
+        with contextlib.redirect_stdout(out_file), \
+             self.assertRaises(SystemExit):
+            main(["batch.py", "--help"])
+        self.assertIn("--jobs", out_file.getvalue())
+        self.assertIn("--glob", out_file.getvalue())
+
+    def test_target_path(self) -> None:
+        self.assertEqual(target_path("a.txt", None, ".lzw"), "a.txt.lzw")
+        self.assertEqual(target_path("a.txt.lzw", None, "-.lzw"), "a.txt")
+        self.assertEqual(target_path("a.txt", None, "-.lzw"), "a.txt.out")
+        self.assertEqual(target_path(os.path.join("a", "b.txt"), "out", ".x"),
+                         os.path.join("out", "a", "b.txt.x"))
+
+    def test_read_manifest(self) -> None:
+        manifest: str = os.path.join(self.tmp.name, "manifest")
+        with open(manifest, "w") as out_file:
+            out_file.write("# inputs\na.txt\n\nb.txt\tc.lzw\n")
+        self.assertEqual(read_manifest(manifest, "out", ".lzw"),
+                         [Job("a.txt", os.path.join("out", "a.txt.lzw")),
+                          Job("b.txt", "c.lzw")])
+
+if __name__ == "__main__":
+    unittest.main()
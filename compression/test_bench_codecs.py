@@ -0,0 +1,58 @@
+import io
+import os
+import subprocess
+import tempfile
+import unittest
+
+from bench_codecs import *
+
+class TestBenchCodecs(unittest.TestCase):
+    def test_run_measured(self) -> None:
+        # a parent much larger than the command, whose memory the command
+        # mustn't be charged for
+        inflated: bytearray = bytearray(128 << 20)
+        inflated[::4096] = b"\x01" * len(range(0, len(inflated), 4096))
+        with tempfile.TemporaryDirectory() as tmp:
+            in_path: str = os.path.join(tmp, "input.txt")
+            out_path: str = os.path.join(tmp, "output")
+            with open(in_path, "w") as in_file:
+                in_file.write("foo bar foo")
+            elapsed: float
+            rss: int
+            elapsed, rss = run_measured([sys.executable, "-c", "pass"],
+                                        in_path, out_path)
+            self.assertGreater(elapsed, 0)
+            self.assertGreater(rss, 0)
+            self.assertLess(rss, (len(inflated) >> 10) // 4)
+            run_measured([sys.executable, "-c",
+                          "import sys; sys.stdout.write(sys.stdin.read())"],
+                         in_path, out_path)
+            with open(out_path) as out_file:
+                self.assertEqual(out_file.read(), "foo bar foo")
+            with self.assertRaises(subprocess.CalledProcessError):
+                run_measured([sys.executable, "-c", "raise SystemExit(3)"],
+                             in_path, out_path)
+        del inflated
+
+    def test_write_words(self) -> None:
+        text: str
+        words: str
+        for text, words in [("Don't panic!\n", "DONT PANIC"), ("", ""),
+                            ("  one  two\n\nthree ", "ONE TWO THREE")]:
+            out_file: io.StringIO = io.StringIO()
+            write_words(io.StringIO(text), out_file)
+            self.assertEqual(out_file.getvalue(), words)
+
+    def test_get_corpora(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            corpora: Dict[str, str] = get_corpora([], 5000, tmp)
+            self.assertTrue({"source", "synthetic", "synthetic_punct"}
+                            <= set(corpora))
+            with open(corpora["synthetic"]) as in_file:
+                self.assertEqual(in_file.read(),
+                                 "".join(generate_text(5000)))
+            self.assertTrue(all(os.path.getsize(path) for path
+                                in corpora.values()))
+
+if __name__ == "__main__":
+    unittest.main()
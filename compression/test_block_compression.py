@@ -0,0 +1,153 @@
+import argparse
+import functools
+import unittest
+
+from io import StringIO, BytesIO
+
+from test_readable_compression import get_input_result, get_output_result
+
+from block_compression import *
+from block_decompression import (read_frames, read_index, parse_range,
+                                 get_range, decompress_blocks,
+                                 decompress_range, slice_words)
+import prefix_compression
+import prefix_decompression
+import lossless_decompression
+
+TEXT: str = "".join("{} ".format(i) for i in range(1000))
+
+def archive(text: str, block_size: int) -> BytesIO:
+    out_binary: BytesIO = BytesIO()
+    compress_archive(StringIO(text), out_binary, block_size, str.encode, len)
+    return BytesIO(out_binary.getvalue())
+
+def read_range(in_binary: BytesIO, start: int, end: Optional[int]) -> str:
+    out_file: StringIO = StringIO()
+    in_binary.seek(1)
+    decompress_range(in_binary, out_file, bytes.decode, start, end)
+    return out_file.getvalue()
+
+class Unseekable(BytesIO):
+    def seekable(self) -> bool:
+        return False
+
+    def seek(self, *args: Any) -> int:
+        raise OSError("not seekable")
+
+class TestBlockCompression(unittest.TestCase):
+    def test_get_block_size(self) -> None:
+        self.assertEqual(get_block_size(["--block-size", "1000"]), 1000)
+        self.assertEqual(get_block_size(["--foo"]), None)
+
+    def test_get_jobs(self) -> None:
+        self.assertEqual(get_jobs(["--jobs", "4"]), 4)
+        self.assertEqual(get_jobs([]), 1)
+
+    def test_read_blocks(self) -> None:
+        self.assertEqual(get_input_result(read_blocks, "abcdefg", [3],
+                         wrapper=list), ["abc", "def", "g"])
+        self.assertEqual(get_input_result(read_blocks, "", [3],
+                         wrapper=list), [])
+        self.assertEqual(get_input_result(read_blocks, "ab cdefg h", [3, True],
+                         wrapper=list), ["ab ", "cdefg ", "h"])
+        self.assertEqual(get_input_result(read_blocks, "abcdefg", [3, True],
+                         wrapper=list), ["abcdef", "g"])
+        self.assertEqual(get_input_result(read_blocks, "a\tbcd\ne", [4, True],
+                         wrapper=list), ["a\t", "bcd\n", "e"])
+        text: str = "ab cdefghijklmnop q r"
+        size: int
+        for size in range(1, 8):
+            blocks: List[str] = get_input_result(read_blocks, text,
+                                                 [size, True], wrapper=list)
+            self.assertEqual("".join(blocks), text)
+            self.assertTrue(all(len(block) <= 2 * size for block in blocks))
+
+    def test_ordered_map(self) -> None:
+        self.assertEqual(list(ordered_map(abs, range(-20, 0), 2)),
+                         list(range(20, 0, -1)))
+        self.assertEqual(list(ordered_map(abs, [], 2)), [])
+
+    def test_write_frame(self) -> None:
+        self.assertEqual(get_output_result(write_frame, [b"abc"], binary=True),
+                         b"\x03\xffabc")
+        self.assertEqual(get_output_result(write_frame, [b""], binary=True),
+                         b"\x00\xff")
+
+    def test_frames(self) -> None:
+        out_binary: BytesIO = BytesIO()
+        compress_blocks(StringIO("x" * 1000), out_binary, 300,
+                        lambda block: block.encode("ascii"))
+        self.assertEqual(out_binary.getvalue()[:1], BLOCK_MARKER)
+        self.assertEqual(get_input_result(read_frames,
+                         out_binary.getvalue()[1:], [], wrapper=list,
+                         binary=True), [b"x" * 300] * 3 + [b"x" * 100])
+
+    def test_get_archive(self) -> None:
+        self.assertTrue(get_archive(["--archive"]))
+        self.assertFalse(get_archive([]))
+
+    def test_parse_range(self) -> None:
+        self.assertEqual(parse_range("3:9"), (3, 9))
+        self.assertEqual(parse_range("3:"), (3, None))
+        self.assertEqual(parse_range(":9"), (0, 9))
+        for text in ["3", "a:b", "-1:2"]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_range(text)
+
+    def test_archive_index(self) -> None:
+        in_binary: BytesIO = archive(TEXT, 1000)
+        offsets: List[int]
+        starts: List[int]
+        offsets, starts = read_index(in_binary)
+        self.assertEqual(starts, list(range(0, len(TEXT), 1000)) + [len(TEXT)])
+        self.assertEqual(offsets[0], 1)
+        in_binary.seek(offsets[2])
+        self.assertEqual(next(read_frames(in_binary)), TEXT[2000:3000].encode())
+        self.assertEqual(read_index(archive("", 10)), ([], [0]))
+
+    def test_archive_sequential(self) -> None:
+        in_binary: BytesIO = archive(TEXT, 700)
+        self.assertEqual(in_binary.read(1), ARCHIVE_MARKER)
+        out_file: StringIO = StringIO()
+        decompress_blocks(in_binary, out_file, bytes.decode)
+        self.assertEqual(out_file.getvalue(), TEXT)
+
+    def test_decompress_range(self) -> None:
+        in_binary: BytesIO = archive(TEXT, 700)
+        start: int
+        end: Optional[int]
+        for start, end in [(0, 10), (695, 705), (700, 1400), (1234, 3210),
+                           (3880, None), (0, None), (5, 5), (10000, None),
+                           (3000, 100000)]:
+            self.assertEqual(read_range(in_binary, start, end), TEXT[start:end])
+
+    def test_decompress_range_words(self) -> None:
+        out_binary: BytesIO = BytesIO()
+        compress_archive(StringIO("the cat. sat on the mat " * 50),
+                         out_binary, 40,
+                         functools.partial(prefix_compression.compress_block,
+                                           argv=[], coder="prefix"),
+                         prefix_compression.count_words, whole_words=True)
+        words: List[str] = "THE CAT SAT ON THE MAT".split() * 50
+        in_binary: BytesIO = BytesIO(out_binary.getvalue())
+        start: int
+        end: int
+        for start, end in [(0, 3), (4, 20), (100, 299), (298, 400)]:
+            out_file: StringIO = StringIO()
+            decompress_range(in_binary, out_file,
+                             prefix_decompression.decompress_block, start, end,
+                             slice_words, separator=" ")
+            self.assertEqual(out_file.getvalue(), " ".join(words[start:end]))
+
+    def test_unseekable(self) -> None:
+        with self.assertRaises(ValueError):
+            read_index(Unseekable(archive(TEXT, 700).getvalue()))
+        self.assertEqual(get_range(["--range", "1:2"], BytesIO()), (1, 2))
+        self.assertIsNone(get_range([], Unseekable()))
+        with self.assertRaises(SystemExit):
+            get_range(["--range", "1:2"], Unseekable())
+        main: Callable[[BinaryIO, TextIO, List[str]], None]
+        for main in [prefix_decompression.main, lossless_decompression.main]:
+            with self.assertRaises(SystemExit):
+                main(Unseekable(archive(TEXT, 700).getvalue()), StringIO(),
+                     ["decompress", "--range", "0:10"])
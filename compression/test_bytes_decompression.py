@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from test_readable_compression import get_input_result, get_output_result
@@ -15,6 +16,18 @@ class TestBytesDecompression(unittest.TestCase):
         self.assertEqual(decode_pointer(b"\x00\x01"), 255)
         self.assertEqual(decode_pointer(b"\x0f"), 15)
 
+    def test_read_until(self) -> None:
+        data: bytes = b"ab" * 5000 + b"\xffcd"
+        in_file: BinaryIO
+        for in_file in (io.BytesIO(data), io.BufferedReader(io.BytesIO(data),
+                        buffer_size=16)):
+            self.assertEqual(read_until(in_file), b"ab" * 5000)
+            self.assertEqual(in_file.read(), b"cd")
+        self.assertEqual(get_input_result(read_until, b"abc", [b"\n"],
+                         binary=True), b"abc")
+        self.assertEqual(get_input_result(read_until, b"\xff", [],
+                         binary=True), b"")
+
     def test_read_dictionary(self) -> None:
         self.assertEqual(get_input_result(read_dictionary, b"ONE TWO THREE\nabc",
                          [], wrapper=list, binary=True), ['ONE', 'TWO', 'THREE'])
@@ -30,5 +43,6 @@ class TestBytesDecompression(unittest.TestCase):
                  wrapper=list, binary=True), [2])
         self.assertEqual(get_input_result(read_pointers, b"\xfe", [],
                  wrapper=list, binary=True), [254])
-
-
+        self.assertEqual(get_input_result(read_pointers,
+                 b"\x01\x02\xff" * 5000, [], wrapper=list, binary=True),
+                 [511] * 5000)
@@ -0,0 +1,27 @@
+import unittest
+
+from flags import *
+
+class TestFlags(unittest.TestCase):
+    def test_flag_parser(self) -> None:
+        parser: argparse.ArgumentParser = flag_parser("--size", type=int)
+        self.assertIs(flag_parser("--size", type=int), parser)
+        self.assertIsNot(flag_parser("--size", type=int, default=1), parser)
+        self.assertEqual(parser.parse_known_args(["a", "--size", "3"]),
+                         (argparse.Namespace(size=3), ["a"]))
+        # the parser keeps nothing from one parse to the next
+        self.assertEqual(parser.parse_known_args([]),
+                         (argparse.Namespace(size=None), []))
+
+    def test_abbreviations(self) -> None:
+        self.assertEqual(flag_parser("--profile-memory", action="store_true")
+                         .parse_known_args(["--profile"])[0].profile_memory,
+                         True)
+        self.assertEqual(flag_parser("--profile-memory", allow_abbrev=False,
+                                     action="store_true")
+                         .parse_known_args(["--profile"]),
+                         (argparse.Namespace(profile_memory=False),
+                          ["--profile"]))
+
+if __name__ == "__main__":
+    unittest.main()
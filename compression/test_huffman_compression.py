@@ -0,0 +1,29 @@
+import unittest
+
+from test_readable_compression import get_input_result, get_output_result
+
+from huffman_compression import *
+
+class TestHuffmanCompression(unittest.TestCase):
+    def test_huffman_lengths(self) -> None:
+        self.assertEqual(huffman_lengths([5, 3, 1, 1]), [1, 2, 3, 3])
+        self.assertEqual(huffman_lengths([1, 1, 1, 1]), [2, 2, 2, 2])
+        self.assertEqual(huffman_lengths([7]), [1])
+        self.assertEqual(huffman_lengths([]), [])
+
+    def test_length_counts(self) -> None:
+        self.assertEqual(length_counts([1, 2, 3, 3]), [1, 1, 2])
+        self.assertEqual(length_counts([2, 2]), [0, 2])
+        self.assertEqual(length_counts([]), [])
+
+    def test_canonical_codes(self) -> None:
+        self.assertEqual(canonical_codes([1, 1, 2]),
+                         [(0, 1), (1, 2), (3, 3), (7, 3)])
+        self.assertEqual(canonical_codes([0, 2]), [(0, 2), (2, 2)])
+        self.assertEqual(canonical_codes([1]), [(0, 1)])
+
+    def test_write_lengths(self) -> None:
+        self.assertEqual(get_output_result(write_lengths, [[1, 0, 300]],
+                         binary=True), b"\xfe\x03\x01\xff\x00\xff-\x01\xff")
+        self.assertEqual(get_output_result(write_lengths, [[]],
+                         binary=True), b"\xfe\x00")
@@ -0,0 +1,37 @@
+import unittest
+
+from io import BytesIO
+
+from test_readable_compression import get_input_result, get_output_result
+
+from prefix_compression import BinaryWriter
+from prefix_decompression import BinaryReader
+from huffman_compression import canonical_codes, huffman_lengths, length_counts
+from huffman_decompression import *
+
+def decode_all(counts: List[int], pointers: List[int],
+      table_bits: int) -> List[int]:
+    codes: List[Tuple[int, int]] = canonical_codes(counts)
+    out_file: BytesIO = BytesIO()
+    bw: BinaryWriter = BinaryWriter(out_file)
+    bw.write_codes(codes[pointer] for pointer in pointers)
+    bw.flush()
+    br: BinaryReader = BinaryReader(BytesIO(out_file.getvalue()))
+    decoder: HuffmanDecoder = HuffmanDecoder(counts, table_bits)
+    return [decoder.read(br) for _ in pointers]
+
+class TestHuffmanDecompression(unittest.TestCase):
+    def test_read_lengths(self) -> None:
+        self.assertEqual(get_input_result(read_lengths,
+                         b"\x03\x01\xff\x00\xff-\x01\xff", [], binary=True),
+                         [1, 0, 300])
+        self.assertEqual(get_input_result(read_lengths, b"\x00", [],
+                         binary=True), [])
+
+    def test_decoder(self) -> None:
+        frequencies: List[int] = [2 ** (20 - i) for i in range(20)] + [1]
+        counts: List[int] = length_counts(huffman_lengths(frequencies))
+        pointers: List[int] = [i * 7 % 21 for i in range(200)]
+        self.assertEqual(decode_all(counts, pointers, 10), pointers)
+        self.assertEqual(decode_all(counts, pointers, 3), pointers)
+        self.assertEqual(decode_all([1], [0, 0, 0], 10), [0, 0, 0])
@@ -0,0 +1,33 @@
+import unittest
+
+from test_readable_compression import get_input_result
+
+from lossless_compression import *
+
+class TestLosslessCompression(unittest.TestCase):
+    def test_get_runs(self) -> None:
+        self.assertEqual(get_input_result(get_runs, "Hi, there!", [],
+                         wrapper=list), ["Hi", ", ", "there", "!"])
+        self.assertEqual(get_input_result(get_runs, "", [], wrapper=list), [])
+        self.assertEqual(get_input_result(get_runs, "...", [], wrapper=list),
+                         ["..."])
+
+    def test_get_runs_chunks(self) -> None:
+        text: str = "Runs, of punctuation -- and letters!\n"
+        chunk_size: int
+        for chunk_size in range(1, len(text) + 2):
+            self.assertEqual(get_input_result(get_runs, text, [chunk_size],
+                             wrapper=list), ["Runs", ", ", "of", " ",
+                             "punctuation", " -- ", "and", " ", "letters",
+                             "!\n"])
+
+    def test_get_runs_non_ascii(self) -> None:
+        self.assertEqual(get_input_result(get_runs, "caf\xe9s", [],
+                         wrapper=list), ["caf", "\xe9", "s"])
+        self.assertEqual(get_input_result(get_runs, "\xe9a", [2],
+                         wrapper=list), ["", "\xe9", "a"])
+
+    def test_separate_runs(self) -> None:
+        self.assertEqual(separate_runs(["Hi", ", ", "there", "!"]),
+                         (False, ["Hi", "there"], [", ", "!"]))
+        self.assertEqual(separate_runs([]), (True, [], []))
@@ -0,0 +1,49 @@
+import unittest
+
+from test_readable_compression import get_input_result
+
+from lzw_compression import *
+
+class TestLZWCompression(unittest.TestCase):
+    def test_get_max_bits(self) -> None:
+        self.assertEqual(get_max_bits(["--max-bits", "12"]), 12)
+        self.assertEqual(get_max_bits(["--foo"]), None)
+
+    def test_get_policy(self) -> None:
+        self.assertEqual(get_policy(["--full", "reset"]), "reset")
+        self.assertEqual(get_policy([]), "freeze")
+
+    def test_first_code(self) -> None:
+        self.assertEqual(first_code(100, None, "reset"), 100)
+        self.assertEqual(first_code(100, 12, "freeze"), 100)
+        self.assertEqual(first_code(100, 12, "reset"), 101)
+
+    def test_get_pointers(self) -> None:
+        self.assertEqual(get_input_result(get_pointers, "abab", [],
+                         wrapper=list), [(10, 7), (11, 7), (100, 7)])
+        self.assertEqual(get_input_result(get_pointers, "", [], wrapper=list),
+                         [])
+        self.assertEqual(get_input_result(get_pointers, "aaaa", [12, "reset"],
+                         wrapper=list), [(10, 8), (101, 8), (10, 8)])
+
+    def test_get_pointers_full(self) -> None:
+        text: str = "".join(chr(97 + i % 7 * i % 5) for i in range(5000))
+        codes: List[Tuple[int, int]] = get_input_result(get_pointers, text,
+                                                        [8, "freeze"], wrapper=list)
+        self.assertEqual(max(width for _, width in codes), 8)
+        self.assertLess(max(code for code, _ in codes), 256)
+        codes = get_input_result(get_pointers, text, [8, "reset"],
+                                 wrapper=list)
+        self.assertIn((100, 8), codes)
+        self.assertEqual(max(width for _, width in codes), 8)
+
+    def test_get_byte_mode(self) -> None:
+        self.assertTrue(get_byte_mode(["--bytes"]))
+        self.assertFalse(get_byte_mode(["--max-bits", "9"]))
+
+    def test_get_byte_pointers(self) -> None:
+        self.assertEqual(get_input_result(get_byte_pointers, b"\xff\xff\xff",
+                         [], wrapper=list, binary=True), [(255, 9), (256, 9)])
+        self.assertEqual(get_input_result(get_byte_pointers, b"\x00\x00",
+                         [9, "reset"], wrapper=list, binary=True),
+                         [(0, 9), (0, 9)])
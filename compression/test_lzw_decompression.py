@@ -0,0 +1,69 @@
+import itertools
+import unittest
+
+from io import BytesIO, StringIO
+
+from prefix_compression import BinaryWriter
+from prefix_decompression import BinaryReader
+from lzw_compression import get_pointers, get_byte_pointers, POLICIES
+from lzw_decompression import *
+
+def round_trip(text: str, max_bits: Optional[int], policy: str) -> str:
+    out_file: BytesIO = BytesIO()
+    bw: BinaryWriter = BinaryWriter(out_file)
+    bw.write_codes(get_pointers(StringIO(text), max_bits, policy))
+    bw.flush()
+    return "".join(read_pointers(BinaryReader(BytesIO(out_file.getvalue())),
+                                 max_bits, policy))
+
+class TestLZWDecompression(unittest.TestCase):
+    def test_read_pointers(self) -> None:
+        text: str = "abababababa the cat sat on the mat\n" * 50
+        self.assertEqual(round_trip(text, None, "freeze"), text)
+
+    def test_read_pointers_full(self) -> None:
+        text: str = "".join(chr(97 + i % 7 * i % 5) for i in range(5000))
+        max_bits: int
+        policy: str
+        for max_bits in (8, 9, 16):
+            for policy in POLICIES:
+                self.assertEqual(round_trip(text, max_bits, policy), text)
+                self.assertEqual(round_trip("a" * 3000, max_bits, policy),
+                                 "a" * 3000)
+
+    def test_read_chunks(self) -> None:
+        # with phrases longer than the window, and with most phrases too long
+        # to be kept whole
+        texts: List[str] = [
+            "".join(chr(97 + i % 11 * i % 7) for i in range(5000)),
+            "".join("ab"[i * i % 7 % 2] for i in range(3000))]
+        text: str
+        max_bits: Optional[int]
+        policy: str
+        short_phrase: int
+        for text, (max_bits, policy) in itertools.product(
+                texts, ((None, "freeze"), (9, "freeze"), (9, "reset"))):
+            out_file: BytesIO = BytesIO()
+            bw: BinaryWriter = BinaryWriter(out_file)
+            bw.write_codes(get_pointers(StringIO(text), max_bits, policy))
+            bw.flush()
+            for short_phrase in (SHORT_PHRASE, 2, 1):
+                chunks: List[bytes] = list(read_chunks(
+                        BinaryReader(BytesIO(out_file.getvalue())), max_bits,
+                        policy, ALPHABET.encode("ascii"), window_size=64,
+                        chunk_size=16, short_phrase=short_phrase))
+                self.assertEqual(b"".join(chunks).decode("ascii"), text)
+                self.assertTrue(all(len(chunk) >= 16 for chunk in chunks[:-1]))
+
+    def test_read_byte_pointers(self) -> None:
+        data: bytes = bytes(i * i % 251 for i in range(4000)) + "ünïcödé".encode()
+        max_bits: Optional[int]
+        policy: str
+        for max_bits in (None, 9, 12):
+            for policy in POLICIES:
+                out_file: BytesIO = BytesIO()
+                bw: BinaryWriter = BinaryWriter(out_file)
+                bw.write_codes(get_byte_pointers(BytesIO(data), max_bits, policy))
+                bw.flush()
+                self.assertEqual(b"".join(read_byte_pointers(BinaryReader(
+                        BytesIO(out_file.getvalue())), max_bits, policy)), data)
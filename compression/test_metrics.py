@@ -0,0 +1,138 @@
+import os
+import json
+import tempfile
+import unittest
+
+from io import StringIO, BytesIO
+
+import metrics
+
+from metrics import *
+from prefix_compression import BinaryWriter, write_coder
+from prefix_decompression import BinaryReader
+from readable_compression import get_words
+from readable_decompression import write_batched
+from lossless_compression import get_runs
+from lzw_compression import get_pointers
+from lzw_decompression import read_pointers
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self) -> None:
+        metrics.METRICS = Metrics()
+
+    def tearDown(self) -> None:
+        metrics.METRICS = None
+
+    def test_metrics(self) -> None:
+        collection: Metrics = metrics.METRICS
+        add("reads_total")
+        add("reads_total", 2)
+        add("reads_total", 5, kind="block")
+        set_gauge("size", 3)
+        set_gauge("size", 4)
+        self.assertEqual(collection.get("reads_total"), 3)
+        self.assertEqual(collection.get("reads_total", kind="block"), 5)
+        self.assertEqual(collection.get("size"), 4)
+        with self.assertRaises(ValueError):
+            add("size")
+        self.assertEqual(collection.as_json()["size"],
+                         {"type": "gauge", "values": [{"labels": {},
+                                                       "value": 4}]})
+
+    def test_add_rate(self) -> None:
+        add_rate("tokens", 10, 2.0, tokenizer="a")
+        add_rate("tokens", 30, 2.0, tokenizer="a")
+        self.assertEqual(metrics.METRICS.get("tokens_total", tokenizer="a"), 40)
+        self.assertEqual(metrics.METRICS.get("tokens_per_second",
+                                             tokenizer="a"), 10)
+
+    def test_as_prometheus(self) -> None:
+        add("codes_total", 3, stream='a"b', bits=4)
+        set_gauge("width", 9)
+        self.assertEqual(metrics.METRICS.as_prometheus(),
+                         "# TYPE codes_total counter\n"
+                         'codes_total{bits="4",stream="a\\"b"} 3\n'
+                         "# TYPE width gauge\n"
+                         "width 9\n")
+
+    def test_disabled(self) -> None:
+        metrics.METRICS = None
+        self.assertFalse(enabled())
+        add("reads_total")
+        set_gauge("size", 1)
+        with collected(["--foo"]):
+            self.assertFalse(enabled())
+
+    def test_collected(self) -> None:
+        metrics.METRICS = None
+        self.assertEqual(get_metrics(["--metrics"]), "-")
+        self.assertEqual(get_metrics_format(["--metrics", "--metrics-format",
+                                             "prometheus"]), "prometheus")
+        with tempfile.TemporaryDirectory() as tmp:
+            path: str = os.path.join(tmp, "metrics.json")
+            with collected(["--metrics", path]):
+                add("reads_total", 2)
+            self.assertFalse(enabled())
+            with open(path) as in_file:
+                self.assertEqual(json.load(in_file)["reads_total"]["values"],
+                                 [{"labels": {}, "value": 2}])
+
+    def test_binary_io(self) -> None:
+        out_file: BytesIO = BytesIO()
+        bw: BinaryWriter = BinaryWriter(out_file, chunk_size=4)
+        bw.write_codes([(5, 3)] * 30)
+        bw.flush()
+        collection: Metrics = metrics.METRICS
+        self.assertEqual(collection.get("binary_writer_bits_total"), 90)
+        self.assertEqual(collection.get("binary_writer_bytes_total"), 12)
+        self.assertEqual(collection.get("binary_writer_padding_bits_total"), 6)
+        br: BinaryReader = BinaryReader(BytesIO(out_file.getvalue()),
+                                        block_size=5)
+        self.assertEqual([br.read_bits(3) for _ in range(30)], [5] * 30)
+        self.assertEqual(collection.get("binary_reader_reads_total"), 3)
+        self.assertEqual(collection.get("binary_reader_bytes_total"), 12)
+
+    def test_code_usage(self) -> None:
+        write_coder(BytesIO(), ["--boundaries", "1", "2"], [5, 3, 2, 1, 1, 1],
+                    "boundaries", "prefix")
+        collection: Metrics = metrics.METRICS
+        self.assertEqual(collection.get("pointer_bucket_codes_total",
+                                        stream="boundaries", bucket=0), 8)
+        self.assertEqual(collection.get("pointer_bucket_codes_total",
+                                        stream="boundaries", bucket=1), 5)
+        self.assertEqual(collection.get("pointer_codes_total",
+                                        stream="boundaries", bits=2), 8)
+        self.assertEqual(collection.get("pointer_code_bits_total",
+                                        stream="boundaries"), 8 * 2 + 5 * 3)
+
+    def test_tokenizers(self) -> None:
+        self.assertEqual(len(list(get_words(StringIO("a b c d"), 3))), 4)
+        self.assertEqual(len(list(get_runs(StringIO("a, b\xe9c"), 3))), 5)
+        collection: Metrics = metrics.METRICS
+        self.assertEqual(collection.get("tokenizer_tokens_total",
+                                        tokenizer="get_words"), 4)
+        self.assertEqual(collection.get("tokenizer_tokens_total",
+                                        tokenizer="get_runs"), 5)
+
+    def test_write_batched(self) -> None:
+        write_batched(StringIO(), map(str, range(10)), " ", 4)
+        self.assertEqual(metrics.METRICS.get("output_tokens_total"), 10)
+        self.assertEqual(metrics.METRICS.get("output_batches_total"), 3)
+
+    def test_lzw(self) -> None:
+        text: str = "".join(chr(97 + i % 7 * i % 5) for i in range(5000))
+        out_file: BytesIO = BytesIO()
+        bw: BinaryWriter = BinaryWriter(out_file)
+        bw.write_codes(get_pointers(StringIO(text), 9, "reset"))
+        bw.flush()
+        "".join(read_pointers(BinaryReader(BytesIO(out_file.getvalue())), 9,
+                              "reset"))
+        collection: Metrics = metrics.METRICS
+        name: str
+        for name in ["lzw_dictionary_entries_total", "lzw_resets_total",
+                     "lzw_code_width_changes_total", "lzw_dictionary_size"]:
+            self.assertEqual(collection.get(name, side="compress"),
+                             collection.get(name, side="decompress"))
+        self.assertGreater(collection.get("lzw_resets_total", side="compress"), 0)
+        self.assertEqual(collection.get("lzw_output_bytes_total",
+                                        side="decompress"), len(text))
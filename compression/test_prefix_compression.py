@@ -0,0 +1,81 @@
+import unittest
+
+from io import BytesIO
+
+from test_readable_compression import get_input_result, get_output_result
+
+from prefix_compression import *
+
+def write_with(out_file: BinaryIO, codes: List[Tuple[int, int]]) -> None:
+    bw: BinaryWriter = BinaryWriter(out_file)
+    bw.write_codes(codes)
+    bw.flush()
+
+def code_cost(frequencies: List[int], boundaries: List[int]) -> int:
+    codes: PrefixCodes = PrefixCodes(boundaries)
+    return (sum(frequency * codes[i][1] for i, frequency in enumerate(frequencies))
+            + 8 * len(boundaries))
+
+class TestPrefixCompression(unittest.TestCase):
+    def test_padded_base(self) -> None:
+        self.assertEqual(list(padded_base(10, 123, 5)), [3, 2, 1, 0, 0])
+        self.assertEqual(list(padded_base(2, 10, 6)), [0, 1, 0, 1, 0, 0])
+        self.assertEqual(list(padded_base(2, 7, 0)), [])
+
+    def test_generate_prefix_codes(self) -> None:
+        self.assertEqual(list(generate_prefix_codes([0, 1])),
+                         [(0, 1), (1, 2), (3, 2)])
+        self.assertEqual(list(generate_prefix_codes([2])),
+                         [(0, 2), (1, 2), (2, 2), (3, 2)])
+
+    def test_bucket_starts(self) -> None:
+        self.assertEqual(bucket_starts([0, 1, 3]), [0, 1, 3])
+        self.assertEqual(bucket_starts([4, 4]), [0, 16])
+        self.assertEqual(bucket_starts([]), [0])
+
+    def test_prefix_codes(self) -> None:
+        boundaries: List[int]
+        for boundaries in ([0, 1], [2], [1, 3, 3, 5], [0, 0, 2]):
+            self.assertEqual(list(PrefixCodes(boundaries)),
+                             list(generate_prefix_codes(boundaries)))
+        self.assertEqual(PrefixCodes([20, 30])[2 ** 30],
+                         (1 | (2 ** 30 - 2 ** 20) << 1, 31))
+        with self.assertRaises(IndexError):
+            PrefixCodes([0, 1])[3]
+
+    def test_optimal_boundaries(self) -> None:
+        self.assertEqual(optimal_boundaries([100, 1, 1, 1, 1, 1, 1, 1]), [0, 3])
+        self.assertEqual(optimal_boundaries([1]), [0])
+        frequencies: List[int] = [1000 // (i + 1) for i in range(300)]
+        boundaries: List[int] = optimal_boundaries(frequencies)
+        self.assertGreaterEqual(len(PrefixCodes(boundaries)), 300)
+        self.assertLess(code_cost(frequencies, boundaries),
+                        code_cost(frequencies, get_boundaries([], 299, "b")))
+        boundaries = optimal_boundaries(frequencies, exact_size=16)
+        self.assertGreaterEqual(len(PrefixCodes(boundaries)), 300)
+        self.assertLessEqual(code_cost(frequencies,
+                                       optimal_boundaries(frequencies)),
+                             code_cost(frequencies, boundaries))
+
+    def test_get_boundaries(self) -> None:
+        self.assertEqual(get_boundaries(["--b", "1", "2"], 3, "b", [1] * 4),
+                         [1, 2])
+        self.assertEqual(get_boundaries([], 3, "b", [1] * 4), [2])
+
+    def test_binary_writer(self) -> None:
+        self.assertEqual(get_output_result(write_with, [[(1, 1), (0, 7)]],
+                         binary=True), b"\x01")
+        self.assertEqual(get_output_result(write_with, [[(5, 3)]],
+                         binary=True), b"\x05")
+        self.assertEqual(get_output_result(write_with, [[(0x1ff, 9)]],
+                         binary=True), b"\xff\x01")
+        self.assertEqual(get_output_result(write_with, [[]], binary=True), b"")
+
+    def test_binary_writer_bits(self) -> None:
+        out_file: BytesIO = BytesIO()
+        bw: BinaryWriter = BinaryWriter(out_file, chunk_size=1)
+        bw.write([1, 0, 1, 0, 0, 0, 0, 0, 1])
+        bw.write_codes([(0xabc, 12)] * 1000)
+        bw.flush()
+        self.assertEqual(out_file.getvalue()[:2], b"\x05\x79")
+        self.assertEqual(len(out_file.getvalue()), 1502)
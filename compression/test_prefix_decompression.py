@@ -0,0 +1,93 @@
+import unittest
+
+from io import BytesIO
+
+from test_readable_compression import get_input_result, get_output_result
+
+from prefix_compression import BinaryWriter, PrefixCodes
+from prefix_decompression import *
+
+def read_codes(in_file: BinaryIO, lengths: List[int]) -> List[int]:
+    br: BinaryReader = BinaryReader(in_file, block_size=3)
+    return [br.read_bits(length) for length in lengths]
+
+class TestPrefixDecompression(unittest.TestCase):
+    def test_read_bits(self) -> None:
+        self.assertEqual(get_input_result(read_codes, b"\x05", [[3]],
+                         binary=True), [5])
+        self.assertEqual(get_input_result(read_codes, b"\xff\x01", [[9]],
+                         binary=True), [0x1ff])
+        self.assertEqual(get_input_result(read_codes, b"\x05\x79", [[1, 8, 3]],
+                         binary=True), [1, 130, 4])
+        self.assertEqual(get_input_result(read_codes, b"", [[]],
+                         binary=True), [])
+
+    def test_end_of_file(self) -> None:
+        with self.assertRaises(EndOfBinaryFile):
+            get_input_result(read_codes, b"\x05", [[3, 6]], binary=True)
+
+    def test_round_trip(self) -> None:
+        codes: List[Tuple[int, int]] = [(i * 7919 % (1 << (i % 30 + 1)),
+                                         i % 30 + 1) for i in range(5000)]
+        out_file: BytesIO = BytesIO()
+        bw: BinaryWriter = BinaryWriter(out_file)
+        bw.write_codes(codes)
+        bw.flush()
+        self.assertEqual(get_input_result(read_codes, out_file.getvalue(),
+                         [[length for _, length in codes]], binary=True),
+                         [value for value, _ in codes])
+
+    def test_read_prefix_code(self) -> None:
+        self.assertEqual(get_input_result(lambda f: read_prefix_code(
+                         BinaryReader(f), [0, 1], [0, 1]), b"\x07", [],
+                         binary=True), 2)
+        self.assertEqual(get_input_result(lambda f: read_prefix_code(
+                         BinaryReader(f), [4, 4], [0, 16]), b"\x21", [],
+                         binary=True), 16)
+
+    def test_generate_prefix_table(self) -> None:
+        self.assertEqual(generate_prefix_table([0, 1], [0, 1], 2),
+                         [(0, 1), (1, 2), (0, 1), (2, 2)])
+        self.assertEqual(generate_prefix_table([0, 3], [0, 1], 2),
+                         [(0, 1), (1, 0), (0, 1), (1, 0)])
+
+    def test_prefix_decoder(self) -> None:
+        boundaries: List[int]
+        for boundaries in ([0, 1], [1, 3, 3, 5], [4], [0, 2, 9, 12]):
+            codes: PrefixCodes = PrefixCodes(boundaries)
+            pointers: List[int] = [i * 37 % len(codes) for i in range(300)]
+            out_file: BytesIO = BytesIO()
+            bw: BinaryWriter = BinaryWriter(out_file)
+            bw.write_codes(codes[pointer] for pointer in pointers)
+            bw.flush()
+            br: BinaryReader = BinaryReader(BytesIO(out_file.getvalue()))
+            decoder: PrefixDecoder = PrefixDecoder(boundaries, 6)
+            self.assertEqual([decoder.read(br) for _ in pointers], pointers)
+
+    def test_read_pointers(self) -> None:
+        boundaries: List[int]
+        for boundaries in ([0, 1], [1, 3, 3, 5], [4], [0, 2, 9, 12]):
+            codes: PrefixCodes = PrefixCodes(boundaries)
+            length: int
+            # ending with long codes and short ones, which are read from the
+            # last few bits, fewer than the table is indexed by
+            for length in [0, 1, 2, 5, 300, 301]:
+                pointers: List[int] = [i * 37 % len(codes)
+                                       for i in range(length)]
+                out_file: BytesIO = BytesIO()
+                bw: BinaryWriter = BinaryWriter(out_file)
+                bw.write_codes(codes[pointer] for pointer in pointers)
+                bw.flush()
+                table_bits: int
+                for table_bits in [1, 6, 10]:
+                    br: BinaryReader = BinaryReader(
+                                            BytesIO(out_file.getvalue()))
+                    decoder: PrefixDecoder = PrefixDecoder(boundaries,
+                                                           table_bits)
+                    read: Generator[int, None, None] = read_pointers(br,
+                                                                     decoder)
+                    self.assertEqual([next(read) for _ in pointers], pointers)
+                    with self.assertRaises(EndOfBinaryFile):
+                        # the padding of the last byte holds fewer than 8 codes
+                        for _ in range(8):
+                            next(read)
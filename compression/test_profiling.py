@@ -0,0 +1,69 @@
+import os
+import json
+import time
+import tempfile
+import unittest
+
+from io import StringIO
+
+import readable_compression
+
+from profiling import *
+
+class TestProfiling(unittest.TestCase):
+    def test_get_profile(self) -> None:
+        argv: List[str] = ["--profile", "out.json", "--foo"]
+        self.assertEqual(get_profile(argv), "out.json")
+        self.assertEqual(argv, ["--foo"])
+        self.assertEqual(get_profile(["--profile"]), "-")
+        self.assertEqual(get_profile([]), None)
+
+    def test_get_profile_memory(self) -> None:
+        argv: List[str] = ["--profile", "--profile-memory"]
+        self.assertTrue(get_profile_memory(argv))
+        self.assertEqual(argv, ["--profile"])
+        self.assertFalse(get_profile_memory(["--profile"]))
+
+    def test_stage_off(self) -> None:
+        self.assertIs(stage("foo"), NULL_STAGE)
+        with profiled([]):
+            self.assertIs(stage("foo"), NULL_STAGE)
+
+    def test_profiled(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path: str = os.path.join(tmp, "profile.json")
+            with profiled(["--profile", path, "--profile-memory"]):
+                with stage("outer"):
+                    time.sleep(0.02)
+                    with stage("inner"):
+                        data: List[int] = list(range(100000))
+                        time.sleep(0.02)
+                with stage("inner"):
+                    pass
+            self.assertIs(stage("foo"), NULL_STAGE)
+            with open(path) as in_file:
+                report: Dict[str, Any] = json.load(in_file)
+        outer: Dict[str, Any]
+        inner: Dict[str, Any]
+        outer, inner = report["stages"]
+        self.assertEqual((outer["name"], outer["calls"]), ("outer", 1))
+        self.assertEqual((inner["name"], inner["calls"]), ("inner", 2))
+        self.assertLess(outer["wall"], 0.035)
+        self.assertGreaterEqual(inner["wall"], 0.02)
+        self.assertGreater(inner["peak_bytes"], 100000 * 8)
+        self.assertGreaterEqual(report["total"]["wall"],
+                                outer["wall"] + inner["wall"])
+
+    def test_main(self) -> None:
+        err: StringIO = StringIO()
+        out: StringIO = StringIO()
+        stderr: TextIO = sys.stderr
+        sys.stderr = err
+        try:
+            readable_compression.main(StringIO("foo bar foo"), out,
+                                      ["--profile"])
+        finally:
+            sys.stderr = stderr
+        self.assertEqual(out.getvalue(), "FOO BAR\n0 1 0")
+        self.assertIn("tokenise and index words", err.getvalue())
+        self.assertIn("max RSS", err.getvalue())
@@ -1,4 +1,6 @@
+import os
 import unittest
+import tempfile
 
 from io import StringIO, BytesIO
 
@@ -88,6 +90,34 @@ class TestReadableCompression(unittest.TestCase):
         self.assertEqual(get_input_result(get_words, "there's 1 th1ng", [],
                             wrapper=list), ["THERES", "THNG"])
 
+    def test_get_words_chunks(self) -> None:
+        text: str = "Some\twords, spanning chunks -- 1 2 3\nat  odd pl4ces "
+        chunk_size: int
+        for chunk_size in range(1, len(text) + 2):
+            self.assertEqual(get_input_result(get_words, text, [chunk_size],
+                             wrapper=list), ["SOME", "WORDS", "SPANNING",
+                             "CHUNKS", "AT", "ODD", "PLCES"])
+
+    def test_mapped_file(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path: str = os.path.join(tmp, "mapped.txt")
+            with open(path, "w") as out_file:
+                out_file.write("One two\nthree")
+            in_file: IO
+            with map_file(open(path, "rb"), True) as in_file:
+                self.assertIsInstance(in_file, MappedFile)
+                self.assertEqual(in_file.read(3), b"One")
+                self.assertEqual(in_file.peek(1)[:4], b" two")
+                self.assertEqual(in_file.read(), b" two\nthree")
+                self.assertEqual(in_file.read(), b"")
+            with map_file(open(path), False) as in_file:
+                self.assertEqual(list(get_words(in_file)),
+                                 ["ONE", "TWO", "THREE"])
+
+            open(path, "w").close()
+            with map_file(open(path, "rb"), True) as in_file:
+                self.assertNotIsInstance(in_file, MappedFile)
+
     def test_compress_words(self) -> None:
         self.assertEqual(compress_words(["ONE", "TWO", "ONE"]), (["ONE", "TWO"],
                          [0, 1, 0]))
@@ -26,5 +26,17 @@ class TestReadableDecompression(unittest.TestCase):
                          "BAR FOO")
         self.assertEqual(get_output_result(decompress, [[0], ["FOO"]]), "FOO")
         self.assertEqual(get_output_result(decompress, [[], []]), "")
+        self.assertEqual(get_output_result(decompress, [[0, 1, 1],
+                         ["FOO", "BAR"], 2]), "FOO BAR BAR")
+
+    def test_write_batched(self) -> None:
+        words: List[str] = [str(i) for i in range(10)]
+        batch_size: int
+        for batch_size in range(1, 12):
+            self.assertEqual(get_output_result(write_batched, [words, ", ",
+                             batch_size]), ", ".join(words))
+        self.assertEqual(get_output_result(write_batched, [iter("abc")]),
+                         "abc")
+        self.assertEqual(get_output_result(write_batched, [[], " "]), "")
 
 
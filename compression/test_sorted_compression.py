@@ -13,6 +13,12 @@ class TestSortedCompression(unittest.TestCase):
             ({"FOO": 0}, ["FOO"]))
         self.assertEqual(compile_dictionary([]), ({}, []))
 
+    def test_compile_counted_dictionary(self) -> None:
+        self.assertEqual(compile_counted_dictionary(
+                         ["FOO", "BAR", "FOO", "BAR", "FOO", "EGGS"]),
+            ({"FOO": 0, "BAR": 1, "EGGS": 2}, ["FOO", "BAR", "EGGS"], [3, 2, 1]))
+        self.assertEqual(compile_counted_dictionary([]), ({}, [], []))
+
     def test_compile_pointers(self) -> None:
         self.assertEqual(list(compile_pointers(["FOO", "BAR"],
             {"FOO": 1, "BAR": 0})), [1, 0])
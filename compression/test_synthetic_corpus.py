@@ -0,0 +1,88 @@
+import string
+import argparse
+import unittest
+import collections
+
+from io import StringIO, BytesIO
+
+from readable_compression import get_words
+from lossless_compression import get_runs
+from prefix_compression import BinaryWriter
+from prefix_decompression import BinaryReader
+from lzw_compression import get_pointers
+from lzw_decompression import read_pointers
+
+from synthetic_corpus import *
+
+class TestSyntheticCorpus(unittest.TestCase):
+    def test_parse_size(self) -> None:
+        self.assertEqual(parse_size("10"), 10)
+        self.assertEqual(parse_size("3K"), 3072)
+        self.assertEqual(parse_size("2g"), 2 << 30)
+        with self.assertRaises(argparse.ArgumentTypeError):
+            parse_size("lots")
+
+    def test_generate_text(self) -> None:
+        text: str = "".join(generate_text(50000, seed=5))
+        self.assertEqual(len(text), 50000)
+        self.assertEqual("".join(generate_text(50000, seed=5, chunk_size=100)),
+                         text)
+        self.assertNotEqual("".join(generate_text(50000, seed=6)), text)
+        self.assertEqual("".join(generate_text(0)), "")
+        self.assertTrue(set(text) <= set(string.printable))
+
+    def test_generate_text_chunks(self) -> None:
+        chunks: List[str] = list(generate_text(100000, chunk_size=1000))
+        self.assertTrue(all(len(chunk) >= 1000 for chunk in chunks[:-1]))
+        self.assertEqual(sum(map(len, chunks)), 100000)
+        forever: Iterator[str] = generate_text(None, chunk_size=1000)
+        self.assertTrue(all(next(forever) for _ in range(200)))
+
+    def test_generate_text_settings(self) -> None:
+        text: str = "".join(generate_text(100000, vocabulary_size=50,
+                                          line_length=40, punctuation=0))
+        # the last word may be cut short
+        self.assertEqual(len(set(list(get_words(StringIO(text)))[:-1])), 50)
+        self.assertEqual(get_input_runs(text)[1], {" ", "\n"})
+        self.assertTrue(all(len(line) < 60 for line in text.split("\n")))
+
+        flat: collections.Counter = collections.Counter(get_words(StringIO(
+                "".join(generate_text(100000, skew=0)))))
+        steep: collections.Counter = collections.Counter(get_words(StringIO(
+                "".join(generate_text(100000, skew=1.5)))))
+        self.assertGreater(steep.most_common(1)[0][1],
+                           2 * flat.most_common(1)[0][1])
+
+        dense: Set[str] = get_input_runs("".join(generate_text(100000,
+                                                 punctuation=0.8)))[1]
+        self.assertTrue({", ", ". ", "? "} <= dense)
+
+    def test_generated_text(self) -> None:
+        in_file: GeneratedText = GeneratedText(10000, seed=2, chunk_size=64)
+        self.assertEqual(in_file.read(10) + in_file.read(),
+                         "".join(generate_text(10000, seed=2)))
+        self.assertEqual(in_file.read(5), "")
+        size: int
+        # reads within a chunk, across several, and past the end
+        for size in [1, 7, 64, 100, 20000]:
+            in_file = GeneratedText(10000, seed=2, chunk_size=64)
+            text: str = ""
+            read: str = in_file.read(size)
+            while read:
+                self.assertLessEqual(len(read), size)
+                text += read
+                read = in_file.read(size)
+            self.assertEqual(text, "".join(generate_text(10000, seed=2)))
+
+    def test_lzw_round_trip(self) -> None:
+        out_file: BytesIO = BytesIO()
+        bw: BinaryWriter = BinaryWriter(out_file)
+        bw.write_codes(get_pointers(GeneratedText(200000, punctuation=0.4)))
+        bw.flush()
+        self.assertEqual("".join(read_pointers(BinaryReader(BytesIO(
+                out_file.getvalue())))),
+                "".join(generate_text(200000, punctuation=0.4)))
+
+def get_input_runs(text: str) -> Tuple[Set[str], Set[str]]:
+    runs: List[str] = list(get_runs(StringIO(text)))
+    return set(runs[::2]), set(runs[1::2])
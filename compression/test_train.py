@@ -0,0 +1,131 @@
+import os
+import tempfile
+import unittest
+
+from io import StringIO, BytesIO
+
+from test_readable_compression import get_input_result
+
+from prefix_codes import PrefixCodes
+from trained_dictionary import (EscapedCodes, TrainedDictionary, read_codes,
+                                read_trained, load_trained)
+import prefix_compression
+import prefix_decompression
+import lossless_compression
+import lossless_decompression
+
+from train import *
+
+SAMPLE: str = ("the cat sat on the mat. the dog sat on the log; "
+               "the cat and the dog ran off!\n")
+
+def trained(lossless: bool = False, argv: Optional[List[str]] = None,
+      size: Optional[int] = None) -> TrainedDictionary:
+    out_binary: BytesIO = BytesIO()
+    train([StringIO(SAMPLE)], out_binary, argv or [], lossless, size)
+    return read_trained(BytesIO(out_binary.getvalue()), 1234)
+
+def round_trip(compressor: Any, decompressor: Any, text: str,
+      dictionary: TrainedDictionary) -> Tuple[str, int]:
+    out_binary: BytesIO = BytesIO()
+    compressor.compress_stream(StringIO(text), out_binary, [], "prefix",
+                               dictionary)
+    out_file: StringIO = StringIO()
+    decompressor.decompress_stream(BytesIO(out_binary.getvalue()), out_file,
+                                   b"", dictionary)
+    return out_file.getvalue(), len(out_binary.getvalue())
+
+class TestTrain(unittest.TestCase):
+    def test_escape_weight(self) -> None:
+        self.assertEqual(escape_weight([5, 3, 1, 1], 0), 2)
+        self.assertEqual(escape_weight([5, 3], 4), 4)
+        self.assertEqual(escape_weight([], 0), 1)
+
+    def test_read_codes(self) -> None:
+        self.assertEqual(get_input_result(read_codes, b"\x01\x02\xff", [],
+                                          binary=True), ([1, 2], None))
+        self.assertEqual(get_input_result(read_codes, b"\xff", [], binary=True),
+                         ([], None))
+        self.assertEqual(get_input_result(read_codes, b"\xfe\x02\x00\xff\x04\xff",
+                                          [], binary=True), (None, [0, 4]))
+
+    def test_escaped_codes(self) -> None:
+        codes: PrefixCodes = PrefixCodes([1, 2])
+        escaped: EscapedCodes = EscapedCodes(codes, 1, 4, 2)
+        self.assertEqual(escaped[3], codes[3])
+        self.assertEqual(escaped[4], (codes[1][0], codes[1][1] + 2))
+        value: int
+        length: int
+        value, length = escaped[6]
+        self.assertEqual(length, codes[1][1] + 2)
+        self.assertEqual(value >> codes[1][1], 2)
+
+    def test_train(self) -> None:
+        dictionary: TrainedDictionary = trained()
+        [stream] = dictionary.streams
+        self.assertEqual(stream.words[:2], ["THE", "CAT"])
+        self.assertEqual(stream.size, len(set(SAMPLE.upper().split())) + 2)
+        self.assertEqual(dictionary.checksum, 1234)
+        self.assertEqual(len(trained(size=3).streams[0].words), 3)
+        self.assertIsNotNone(trained(argv=["--coder", "huffman"])
+                             .streams[0].counts)
+        self.assertEqual(len(trained(lossless=True).streams), 2)
+
+    def test_lossy_round_trip(self) -> None:
+        dictionary: TrainedDictionary
+        for dictionary in [trained(), trained(argv=["--coder", "huffman"]),
+                           trained(size=2)]:
+            self.assertEqual(round_trip(prefix_compression, prefix_decompression,
+                                        "The dog sat.", dictionary)[0],
+                             "THE DOG SAT")
+            self.assertEqual(round_trip(prefix_compression, prefix_decompression,
+                                        "a zebra, a yak and the cat",
+                                        dictionary)[0],
+                             "A ZEBRA A YAK AND THE CAT")
+            self.assertEqual(round_trip(prefix_compression, prefix_decompression,
+                                        "", dictionary)[0], "")
+
+    def test_lossless_round_trip(self) -> None:
+        dictionary: TrainedDictionary
+        for dictionary in [trained(True), trained(True, ["--coder", "huffman"])]:
+            text: str
+            for text in ["the cat sat on the log.\n", "A zebra?! -- the yak",
+                         "", "..."]:
+                self.assertEqual(round_trip(lossless_compression,
+                                            lossless_decompression, text,
+                                            dictionary)[0], text)
+
+    def test_smaller(self) -> None:
+        text: str = "the cat sat on the mat, the dog sat on the log"
+        out_binary: BytesIO = BytesIO()
+        prefix_compression.compress_stream(StringIO(text), out_binary, [],
+                                           "prefix")
+        self.assertLess(round_trip(prefix_compression, prefix_decompression,
+                                   text, trained())[1],
+                        len(out_binary.getvalue()) / 2)
+
+    def test_wrong_dictionary(self) -> None:
+        out_binary: BytesIO = BytesIO()
+        prefix_compression.compress_stream(StringIO("the cat"), out_binary, [],
+                                           "prefix", trained())
+        other: TrainedDictionary = trained()
+        other.checksum += 1
+        with self.assertRaises(ValueError):
+            prefix_decompression.decompress_stream(
+                    BytesIO(out_binary.getvalue()), StringIO(), b"", other)
+        with self.assertRaises(ValueError):
+            prefix_decompression.decompress_stream(
+                    BytesIO(out_binary.getvalue()), StringIO())
+
+    def test_load_trained(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path: str = os.path.join(tmp, "words.dict")
+            with open(path, "wb") as out_binary:
+                train([StringIO(SAMPLE)], out_binary, [])
+            dictionary: TrainedDictionary = load_trained(path, 1)
+            self.assertIs(load_trained(path, 1), dictionary)
+            with self.assertRaises(ValueError):
+                load_trained(path, 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+##################################################################################
+
+"""
+A script to train a shared dictionary on a sample corpus, for compressing many
+small texts. For a small text, the dictionary written by the compressors takes
+up most of the output, so instead the words of the sample are counted once, and
+their dictionary and the codes for their pointers are written to a file which
+the compressors and decompressors are then given with --dict. A stream
+compressed with it holds only its pointers, and the few words which weren't in
+the sample, each of which is written as an escape code followed by its index
+among them.
+
+The escape is weighted by the number of words seen only once in the sample, as
+an estimate of how often an unseen word turns up, together with any words left
+out by --size, and takes its place among the words in order of that weight.
+
+With --lossless, the dictionary is trained on the runs of letters and of
+punctuation taken by lossless_compression.py, and otherwise on the words taken
+by prefix_compression.py. The codes are prefix boundaries, or Huffman codes
+with --coder huffman, and --boundaries, --wboundaries and --pboundaries are
+taken as they are by the compressors.
+
+Example usage:
+    $ python train.py --input sample.txt --input more.txt --output words.dict
+    $ python prefix_compression.py --dict words.dict --input note.txt > note.prefix
+    $ python prefix_decompression.py --dict words.dict --input note.prefix
+    $ python train.py --lossless --coder huffman --input sample.txt --output runs.dict
+"""
+
+import sys
+import argparse
+
+from readable_compression import get_words
+from lossless_compression import get_runs, separate_runs
+from sorted_compression import compile_counted_dictionary
+from prefix_compression import get_coder, write_coder
+from trained_dictionary import DICT_MARKER, DICTIONARY_SEPARATORS
+from bytes_compression import encode_pointer, write_dictionary
+
+from typing import *
+
+def escape_weight(counts: List[int], dropped: int) -> int:
+    """
+    Find the weight to give the escape of a stream, which is the number of
+    words seen once, plus the number of times words left out of the dictionary
+    were seen, or at least 1.
+
+    Example usage:
+    >>> escape_weight([5, 3, 1, 1], 0)
+    2
+    >>> escape_weight([5, 3], 4)
+    4
+    >>> escape_weight([], 0)
+    1
+
+    Parameters:
+    counts - List[int] - the frequency of each word kept, in descending order
+    dropped - int - the total frequency of the words left out
+
+    Return:
+    int - the weight of the escape
+    """
+
+    return max(1, counts.count(1) + dropped)
+
+def write_stream(out_binary: BinaryIO, argv: List[str], tokens: List[str],
+      size: Optional[int], name: str, coder: str, separators: Tuple[bytes, bytes]
+      ) -> None:
+    """
+    Write one stream of a shared dictionary: the codes for its pointers, as
+    from write_coder, the pointer of its escape, and its words in order of
+    frequency.
+
+    Parameters:
+    out_binary - BinaryIO - binary file to write to
+    argv - List[str] - arguments to parse boundaries from
+    tokens - List[str] - the words of the sample
+    size - Optional[int] - the most words to keep, or None to keep them all
+    name - str - name of the flag used for boundaries in the arguments
+    coder - str - the name of the coder to use, as from get_coder
+    separators - Tuple[bytes, bytes] - the bytes between and after the words
+
+    Return:
+    None
+    """
+
+    words: List[str]
+    counts: List[int]
+    _, words, counts = compile_counted_dictionary(tokens)
+    dropped: int = sum(counts[size:]) if size is not None else 0
+    words, counts = words[:size], counts[:size]
+    weight: int = escape_weight(counts, dropped)
+    escape: int = sum(1 for count in counts if count >= weight)
+    write_coder(out_binary, argv,
+                counts[:escape] + [weight] + counts[escape:] + [1], name, coder)
+    out_binary.write(encode_pointer(escape) + b"\xff")
+    write_dictionary(out_binary, words, *separators)
+
+def train(in_files: Iterable[TextIO], out_binary: BinaryIO, argv: List[str],
+      lossless: bool = False, size: Optional[int] = None) -> None:
+    """
+    Train a shared dictionary on a number of sample files, and write it to a
+    binary file, as read by trained_dictionary.read_trained.
+
+    Parameters:
+    in_files - Iterable[TextIO] - the sample files to read
+    out_binary - BinaryIO - binary file to write to
+    argv - List[str] - arguments to parse the coder and boundaries from
+    lossless - bool - whether to train on the runs of the lossless compressor
+     rather than on words. defaults to False
+    size - Optional[int] - the most words to keep in each stream. defaults to
+     None, to keep them all
+
+    Return:
+    None
+    """
+
+    coder: str = get_coder(argv)
+    streams: List[List[str]] = [[], []] if lossless else [[]]
+    in_file: TextIO
+    for in_file in in_files:
+        if lossless:
+            words: List[str]
+            punc: List[str]
+            _, words, punc = separate_runs(list(get_runs(in_file)))
+            streams[0].extend(words)
+            streams[1].extend(punc)
+        else:
+            streams[0].extend(get_words(in_file))
+
+    names: List[str] = ["wboundaries", "pboundaries"] if lossless else ["boundaries"]
+    out_binary.write(DICT_MARKER + bytes([len(streams)]))
+    tokens: List[str]
+    name: str
+    separators: Tuple[bytes, bytes]
+    for tokens, name, separators in zip(streams, names, DICTIONARY_SEPARATORS):
+        write_stream(out_binary, argv, tokens, size, name, coder, separators)
+
+def main(argv: List[str]) -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    # the sample files are given with --input rather than as positional
+    # arguments, so that flags for the coder can't be taken for files
+    parser.add_argument("--input", type=argparse.FileType("r"),
+                        action="append")
+    parser.add_argument("--output", type=argparse.FileType("wb"),
+                        default=sys.stdout.buffer)
+    parser.add_argument("--lossless", action="store_true")
+    parser.add_argument("--size", type=int,
+                        help="the most words to keep in each stream")
+    args: argparse.Namespace
+    remaining: List[str]
+    args, remaining = parser.parse_known_args(argv[1:])
+
+    with args.output as out_binary:
+        train(args.input or [sys.stdin], out_binary, remaining, args.lossless,
+              args.size)
+
+if __name__ == "__main__":
+    main(sys.argv)
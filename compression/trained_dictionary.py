@@ -0,0 +1,292 @@
+##################################################################################
+
+"""
+Shared dictionaries made by train.py, with which a small text is compressed as
+only the words missing from the dictionary, followed by the pointers. Each
+stream of a dictionary holds its words in order of frequency, the codes for
+their pointers, and an escape, which stands for any word not in the
+dictionary.
+"""
+
+import os
+import zlib
+import argparse
+import itertools
+import functools
+
+from io import BytesIO
+
+from sorted_compression import compile_counted_dictionary
+from bytes_compression import write_dictionary
+from bytes_decompression import decode_pointer, read_until, read_dictionary
+from huffman_compression import HUFFMAN_MARKER, canonical_codes
+from huffman_decompression import read_lengths
+from prefix_codes import EOF, PrefixCodes
+from flags import flag_parser
+
+from typing import *
+
+def read_codes(in_binary: BinaryIO) -> Tuple[Optional[List[int]],
+                                             Optional[List[int]]]:
+    """
+    Read a description of codes written by write_coder, as the compressor needs
+    it to rebuild the codes themselves.
+
+    Example usage:
+    >>> get_input_result(read_codes, b"\\x01\\x02\\xff", [], binary=True)
+    ([1, 2], None)
+    >>> get_input_result(read_codes, b"\\xfe\\x02\\x00\\xff\\x04\\xff", [],
+    ... binary=True)
+    (None, [0, 4])
+
+    Parameters:
+    in_binary - BinaryIO - binary file to read from
+
+    Return:
+    Tuple[Optional[List[int]], Optional[List[int]]] - the prefix boundaries,
+     or the Huffman code length counts, whichever was written
+    """
+
+    c: bytes = in_binary.read(1)
+    if c == HUFFMAN_MARKER:
+        return None, read_lengths(in_binary)
+    return ([] if c == b"\xff" else list(c + read_until(in_binary))), None
+
+# a shared dictionary file, made by train.py, starts with this marker, as does
+# a stream compressed with one
+DICT_MARKER: bytes = b"\xfc"
+
+# the bytes between and after the entries of the dictionary of each stream:
+# words, and in the lossless compressor runs of punctuation
+DICTIONARY_SEPARATORS: List[Tuple[bytes, bytes]] = [(b" ", b"\n"), (b"A", b"B")]
+
+class EscapedCodes:
+    """
+    A class that acts as a read-only list of the codes for the pointers of a
+    stream compressed with a shared dictionary. The first pointers are those of
+    the shared dictionary itself, along with the escape and EOF, and the rest
+    stand for the words which weren't in it, each of which is written as the
+    code for the escape followed by its index among them in a fixed number of
+    bits.
+    """
+
+    def __init__(self, codes: Sequence[Tuple[int, int]], escape: int,
+          size: int, width: int) -> None:
+        self.codes: Sequence[Tuple[int, int]] = codes
+        self.escape: int = escape
+        self.size: int = size
+        self.width: int = width
+
+    def __len__(self) -> int:
+        return self.size + (1 << self.width)
+
+    def __getitem__(self, pointer: int) -> Tuple[int, int]:
+        if pointer < self.size:
+            return self.codes[pointer]
+        value: int
+        length: int
+        value, length = self.codes[self.escape]
+        return value | (pointer - self.size) << length, length + self.width
+
+    def __repr__(self) -> str:
+        return "EscapedCodes({!r}, {}, {}, {})".format(self.codes, self.escape,
+                                                       self.size, self.width)
+
+class TrainedStream:
+    """
+    The words of one stream of a shared dictionary, in order of frequency, and
+    the codes for their pointers. The escape, which stands for any word not in
+    the dictionary, takes the pointer given by its own frequency in training,
+    and EOF takes the last pointer.
+    """
+
+    def __init__(self, words: List[str], escape: int,
+          boundaries: Optional[List[int]], counts: Optional[List[int]]) -> None:
+        self.words: List[str] = words
+        self.escape: int = escape
+        self.boundaries: Optional[List[int]] = boundaries
+        self.counts: Optional[List[int]] = counts
+        self.size: int = len(words) + 2
+        self.eof: int = self.size - 1
+        self.codes: Sequence[Tuple[int, int]] = (PrefixCodes(boundaries)
+                if counts is None else canonical_codes(counts))
+        ind: int
+        word: str
+        self.index: Dict[str, int] = {word: ind + (ind >= escape)
+                                      for ind, word in enumerate(words)}
+        # the word for each pointer, as the decompressor looks them up
+        self.pointer_words: List[Union[str, int]] = (words[:escape] + [""]
+                                                     + words[escape:] + [EOF])
+
+    def compile(self, words: List[str]
+          ) -> Tuple[Iterator[int], List[str], EscapedCodes]:
+        """
+        Find the pointers of a list of words, followed by EOF, along with the
+        words which aren't in the dictionary, in order of frequency, and the
+        codes to write the pointers with.
+
+        Example usage:
+        >>> stream = TrainedStream(["THE", "CAT"], 1, [0, 1, 1], None)
+        >>> pointers, escaped, codes = stream.compile(["THE", "DOG", "CAT"])
+        >>> list(pointers), escaped
+        ([0, 4, 2, 3], ['DOG'])
+        >>> codes[4] == codes[1]
+        True
+
+        Parameters:
+        words - List[str] - the words to find the pointers of
+
+        Return:
+        Tuple[Iterator[int], List[str], EscapedCodes] - the pointers, the
+         escaped words, and the codes for every pointer
+        """
+
+        index: Dict[str, int] = self.index
+        escaped_dict: Dict[str, int]
+        escaped: List[str]
+        escaped_dict, escaped, _ = compile_counted_dictionary(
+                word for word in words if word not in index)
+        size: int = self.size
+        word: str
+        pointers: Iterator[int] = itertools.chain(
+                (index[word] if word in index else size + escaped_dict[word]
+                 for word in words), [self.eof])
+        return pointers, escaped, EscapedCodes(self.codes, self.escape, size,
+                                               max(len(escaped) - 1, 0).bit_length())
+
+    def __repr__(self) -> str:
+        return "TrainedStream({} words, escape={})".format(len(self.words),
+                                                           self.escape)
+
+class TrainedDictionary:
+    """
+    A shared dictionary made by train.py, of a stream of words for the lossy
+    compressors, or streams of words and punctuation for the lossless one,
+    along with a checksum of the file it was read from, which is written to
+    each stream compressed with it.
+    """
+
+    def __init__(self, streams: List[TrainedStream], checksum: int) -> None:
+        self.streams: List[TrainedStream] = streams
+        self.checksum: int = checksum
+
+    def __repr__(self) -> str:
+        return "TrainedDictionary({!r}, {:08x})".format(self.streams,
+                                                        self.checksum)
+
+def read_trained(in_binary: BinaryIO, checksum: int = 0) -> TrainedDictionary:
+    """
+    Read a shared dictionary written by train.py. This is the dictionary marker
+    and the number of streams, followed by the codes of each stream as from
+    write_coder, the pointer of its escape, and its words.
+
+    Parameters:
+    in_binary - BinaryIO - binary file to read from
+    checksum - int - the checksum of the file. defaults to 0
+
+    Return:
+    TrainedDictionary - the dictionary read
+    """
+
+    if in_binary.read(1) != DICT_MARKER:
+        raise ValueError("not a dictionary made by train.py")
+    n_streams: int = in_binary.read(1)[0]
+    streams: List[TrainedStream] = []
+    separator: bytes
+    end: bytes
+    for separator, end in DICTIONARY_SEPARATORS[:n_streams]:
+        boundaries: Optional[List[int]]
+        counts: Optional[List[int]]
+        boundaries, counts = read_codes(in_binary)
+        escape: int = decode_pointer(read_until(in_binary))
+        streams.append(TrainedStream(list(read_dictionary(in_binary, separator,
+                                                          end)),
+                                     escape, boundaries, counts))
+    return TrainedDictionary(streams, checksum)
+
+@functools.lru_cache(maxsize=16)
+def _load_trained(path: str, mtime: int) -> TrainedDictionary:
+    with open(path, "rb") as in_binary:
+        data: bytes = in_binary.read()
+    return read_trained(BytesIO(data), zlib.crc32(data))
+
+def load_trained(path: str, n_streams: int) -> TrainedDictionary:
+    """
+    Load a shared dictionary from a file, checking that it has the number of
+    streams the codec needs. Dictionaries are cached for as long as their file
+    is unchanged, so that running many small files through a codec in one
+    process only reads the dictionary once.
+
+    Parameters:
+    path - str - path of the dictionary
+    n_streams - int - the number of streams the codec needs
+
+    Return:
+    TrainedDictionary - the dictionary read
+    """
+
+    dictionary: TrainedDictionary = _load_trained(path,
+                                                  os.stat(path).st_mtime_ns)
+    if len(dictionary.streams) != n_streams:
+        raise ValueError("{} was trained for the {} compressor".format(path,
+                         "lossless" if len(dictionary.streams) == 2 else "lossy"))
+    return dictionary
+
+def get_dict(argv: List[str]) -> Optional[str]:
+    """
+    Parse the path of a shared dictionary from given arguments, using the --dict
+    flag.
+
+    Example usage:
+    >>> get_dict(["--dict", "words.dict"])
+    'words.dict'
+    >>> get_dict([]) is None
+    True
+
+    Parameters:
+    argv - List[str] - list of arguments to parse (and modify)
+
+    Return:
+    Optional[str] - the path of the dictionary, or None to not use one
+    """
+
+    parser: argparse.ArgumentParser = flag_parser("--dict")
+    args: argparse.Namespace
+    remaining: List[str]
+    args, remaining = parser.parse_known_args(argv)
+    argv[:] = remaining
+    return args.dict
+
+def write_trained_header(out_binary: BinaryIO, dictionary: TrainedDictionary,
+      streams: List[List[str]]
+      ) -> List[Tuple[Iterator[int], Sequence[Tuple[int, int]]]]:
+    """
+    Start a stream compressed with a shared dictionary, by writing the
+    dictionary marker and the checksum of the dictionary, followed by the words
+    of each stream which aren't in the dictionary.
+
+    Parameters:
+    out_binary - BinaryIO - binary file to write to
+    dictionary - TrainedDictionary - the shared dictionary
+    streams - List[List[str]] - the words of each stream
+
+    Return:
+    List[Tuple[Iterator[int], Sequence[Tuple[int, int]]]] - the pointers of
+     each stream, ending with EOF, and the codes to write them with
+    """
+
+    out_binary.write(DICT_MARKER + dictionary.checksum.to_bytes(4, "little"))
+    results: List[Tuple[Iterator[int], Sequence[Tuple[int, int]]]] = []
+    stream: TrainedStream
+    words: List[str]
+    separator: bytes
+    end: bytes
+    for stream, words, (separator, end) in zip(dictionary.streams, streams,
+                                                DICTIONARY_SEPARATORS):
+        pointers: Iterator[int]
+        escaped: List[str]
+        codes: EscapedCodes
+        pointers, escaped, codes = stream.compile(words)
+        write_dictionary(out_binary, escaped, separator, end)
+        results.append((pointers, codes))
+    return results
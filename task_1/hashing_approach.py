@@ -5,7 +5,7 @@ precomputation and hashing.
 
 import sys
 
-from sentence_indices import locations, clean_sentence
+from sentence_indices import clean_sentence
 
 from typing import *
 
@@ -15,9 +15,9 @@ def build_dictionary(sentence: List[str]) -> Dict[str, List[int]]:
 
     Example usage:
     >>> build_dictionary(["ONE", "TWO", "THREE"])
-    {'THREE': [3], 'TWO': [2], 'ONE': [1]}
+    {'ONE': [1], 'TWO': [2], 'THREE': [3]}
     >>> build_dictionary(["ONE", "TWO", "ONE"])
-    {'TWO': [2], 'ONE': [1, 3]}
+    {'ONE': [1, 3], 'TWO': [2]}
     >>> build_dictionary(["CAT", "DOG", "DOG", "CAT"])
     {'CAT': [1, 4], 'DOG': [2, 3]}
 
@@ -28,8 +28,14 @@ def build_dictionary(sentence: List[str]) -> Dict[str, List[int]]:
     dictionary mapping from strings to lists of integers
     """
 
+    # a single pass, rather than a call to locations for each word, which
+    # would take time proportional to the length times the number of words
+    location_dict: Dict[str, List[int]] = {}
+    ind: int
     word: str
-    return {word: locations(sentence, word) for word in sentence}
+    for ind, word in enumerate(sentence, 1):
+        location_dict.setdefault(word, []).append(ind)
+    return location_dict
 
 def main() -> None:
     sentence: List[str] = clean_sentence(sys.stdin.read())
@@ -0,0 +1,402 @@
+"""
+A script to find the locations at which words appear in a text, using an
+inverted index which is built once, in a single pass over the text, and saved
+to a file. Queries memory map the file rather than reading it, so that opening
+even a very large index takes almost no time, and a lookup only touches the
+few terms of its binary search and the locations of the word itself.
+
+The file is a header, followed by the offset of each term in the term text and
+of its first location in the locations, the text of the terms in sorted order,
+and the locations of each term, as unsigned 32 bit integers in the byte order
+of the machine that built it. Locations are 1-based, as in sentence_indices.
+
+Building holds the locations of at most RUN_LOCATIONS words in memory at once.
+A longer text is indexed a run of that many words at a time, each run is
+written to a temporary file in the same format, and the runs are merged into
+the index, so only the terms themselves are held for the whole text.
+
+Example usage:
+    $ python inverted_index.py build corpus.idx < corpus.txt
+    $ python inverted_index.py build corpus.idx --run-locations 1000000 < big.txt
+    $ python inverted_index.py query corpus.idx ask not
+"""
+
+import os
+import sys
+import mmap
+import heapq
+import array
+import struct
+import argparse
+import operator
+import contextlib
+import itertools
+import tempfile
+
+from typing import *
+
+CHUNK_SIZE: int = 1 << 16
+# the number of locations indexed in memory before a run is written out, which
+# with the dictionary around them comes to a few hundred megabytes
+RUN_LOCATIONS: int = 1 << 24
+
+MAGIC: bytes = b"IIDX"
+# magic, byte order, number of terms, number of locations, length of term text
+HEADER: struct.Struct = struct.Struct("=4s4sQQQ")
+BYTE_ORDERS: Dict[str, bytes] = {"little": b"LE\0\0", "big": b"BE\0\0"}
+
+def read_words(in_file: TextIO, chunk_size: int = CHUNK_SIZE
+      ) -> Generator[str, None, None]:
+    """
+    Read the words of a text file a chunk at a time, cleaned as by
+    sentence_indices.clean_sentence. A word which runs over the end of a chunk
+    is carried over to the next.
+
+    Example usage:
+    >>> from io import StringIO
+    >>> list(read_words(StringIO("Ask not what your country"), 5))
+    ['ASK', 'NOT', 'WHAT', 'YOUR', 'COUNTRY']
+
+    Parameters:
+    in_file - TextIO - text file to read from
+    chunk_size - int - number of characters to read at a time. defaults to
+     CHUNK_SIZE
+
+    Return:
+    Generator[str, None, None] - generator of uppercase words
+    """
+
+    carry: str = ""
+    chunk: str
+    for chunk in iter(lambda: in_file.read(chunk_size), ""):
+        words: List[str] = (carry + chunk).upper().split()
+        carry = words.pop() if words and not chunk[-1].isspace() else ""
+        yield from words
+    if carry:
+        yield carry
+
+def build_index(words: Iterable[str], start: int = 1
+      ) -> Dict[str, array.array]:
+    """
+    Build an inverted index of the locations of each word, in a single pass.
+    The whole index is held in memory, so a large text is better indexed with
+    build_file.
+
+    Example usage:
+    >>> build_index(["CAT", "DOG", "DOG", "CAT"])
+    {'CAT': array('I', [1, 4]), 'DOG': array('I', [2, 3])}
+    >>> build_index(["DOG"], 5)
+    {'DOG': array('I', [5])}
+
+    Parameters:
+    words - Iterable[str] - the words of the text
+    start - int - the location of the first word, for a run of a longer text.
+     defaults to 1
+
+    Return:
+    Dict[str, array.array] - the locations of each word, in ascending order
+    """
+
+    index: Dict[str, array.array] = {}
+    ind: int
+    word: str
+    for ind, word in enumerate(words, start):
+        postings: Optional[array.array] = index.get(word)
+        if postings is None:
+            postings = index[word] = array.array("I")
+        postings.append(ind)
+    return index
+
+def write_terms(out_binary: BinaryIO, terms: List[bytes],
+      counts: Iterable[int]) -> None:
+    """
+    Write the header of an inverted index, and everything before its
+    locations, which are written after it in the order of the terms.
+
+    Parameters:
+    out_binary - BinaryIO - binary file to write to
+    terms - List[bytes] - the terms, sorted by their UTF-8 encoding
+    counts - Iterable[int] - the number of locations of each term
+
+    Return:
+    None
+    """
+
+    term_offsets: array.array = array.array("I", [0])
+    posting_starts: array.array = array.array("I", [0])
+    term: bytes
+    count: int
+    for term, count in zip(terms, counts):
+        term_offsets.append(term_offsets[-1] + len(term))
+        posting_starts.append(posting_starts[-1] + count)
+    text: bytes = b"".join(terms)
+
+    out_binary.write(HEADER.pack(MAGIC, BYTE_ORDERS[sys.byteorder], len(terms),
+                                 posting_starts[-1], len(text)))
+    out_binary.write(term_offsets)
+    out_binary.write(posting_starts)
+    # the locations are aligned to their size, so that they can be cast in
+    # place from the mapped file
+    out_binary.write(text + bytes(-len(text) % term_offsets.itemsize))
+
+def write_index(out_binary: BinaryIO, index: Dict[str, array.array]) -> None:
+    """
+    Write an inverted index to a file, with its terms sorted by their UTF-8
+    encoding, so that they can be binary searched in place.
+
+    Parameters:
+    out_binary - BinaryIO - binary file to write to
+    index - Dict[str, array.array] - the locations of each word
+
+    Return:
+    None
+    """
+
+    terms: List[str] = sorted(index, key=lambda word: word.encode("utf-8"))
+    write_terms(out_binary, [term.encode("utf-8") for term in terms],
+                (len(index[term]) for term in terms))
+    term: str
+    for term in terms:
+        out_binary.write(index[term])
+
+class InvertedIndex:
+    """
+    An inverted index written by write_index, memory mapped from its file. The
+    term offsets, location starts and locations are views of the mapped file
+    itself, so nothing is read until it is looked up.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as in_binary:
+            self.map: mmap.mmap = mmap.mmap(in_binary.fileno(), 0,
+                                            access=mmap.ACCESS_READ)
+        magic: bytes
+        order: bytes
+        magic, order, self.n_terms, self.n_locations, text_length = \
+                HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError("{} is not an inverted index".format(path))
+        if order != BYTE_ORDERS[sys.byteorder]:
+            raise ValueError("{} was built on a machine of the other byte order"
+                             .format(path))
+
+        view: memoryview = memoryview(self.map)
+        itemsize: int = array.array("I").itemsize
+        start: int = HEADER.size
+        end: int = start + (self.n_terms + 1) * itemsize
+        self.term_offsets: memoryview = view[start:end].cast("I")
+        start, end = end, end + (self.n_terms + 1) * itemsize
+        self.posting_starts: memoryview = view[start:end].cast("I")
+        start, end = end, end + text_length
+        self.text: memoryview = view[start:end]
+        start = end + (-text_length % itemsize)
+        # the position of the locations in the file
+        self.locations_start: int = start
+        self.locations: memoryview = view[start:start
+                                          + self.n_locations * itemsize].cast("I")
+        view.release()
+
+    def term(self, ind: int) -> bytes:
+        return bytes(self.text[self.term_offsets[ind]:self.term_offsets[ind + 1]])
+
+    def find(self, word: str) -> Optional[int]:
+        """
+        Find the index of a term, by binary search, case insensitively.
+        """
+
+        key: bytes = word.upper().encode("utf-8")
+        low: int = 0
+        high: int = self.n_terms
+        while low < high:
+            mid: int = (low + high) // 2
+            if self.term(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.n_terms and self.term(low) == key:
+            return low
+        return None
+
+    def count(self, ind: int) -> int:
+        """
+        Find the number of locations of the term at an index.
+        """
+
+        return self.posting_starts[ind + 1] - self.posting_starts[ind]
+
+    def postings(self, word: str) -> memoryview:
+        """
+        Find the locations of a word, as a view of the mapped file, which is
+        empty if the word doesn't appear.
+        """
+
+        ind: Optional[int] = self.find(word)
+        if ind is None:
+            return self.locations[0:0]
+        return self.locations[self.posting_starts[ind]:
+                              self.posting_starts[ind + 1]]
+
+    def __len__(self) -> int:
+        return self.n_terms
+
+    def close(self) -> None:
+        for view in (self.term_offsets, self.posting_starts, self.text,
+                     self.locations):
+            view.release()
+        try:
+            self.map.close()
+        except BufferError:
+            # locations returned by postings are still in use, and the map is
+            # closed once the last of them is collected
+            pass
+
+    def __enter__(self) -> "InvertedIndex":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return "InvertedIndex({} terms, {} locations)".format(self.n_terms,
+                                                              self.n_locations)
+
+def merge_terms(runs: List[InvertedIndex]
+      ) -> Iterator[Tuple[bytes, int, int]]:
+    """
+    Merge the terms of several inverted indices in sorted order. A term found
+    in more than one index comes from each in the order they are given.
+
+    Parameters:
+    runs - List[InvertedIndex] - the indices to merge
+
+    Return:
+    Iterator[Tuple[bytes, int, int]] - iterator of each term, the index it is
+     from, and its index among the terms of that index
+    """
+
+    order: int
+    run: InvertedIndex
+    return heapq.merge(*(zip(map(run.term, range(len(run))),
+                             itertools.repeat(order), itertools.count())
+                         for order, run in enumerate(runs)))
+
+def merge_indices(out_binary: BinaryIO, paths: List[str]) -> None:
+    """
+    Merge the inverted indices of consecutive runs of a text into one index of
+    the whole text. The terms of the runs are merged in sorted order, and as
+    every location of one run comes before those of the next, the locations of
+    a term are those of each run in turn. Each run is visited in the order of
+    its own terms, so its locations are read from the file sequentially, rather
+    than through the map, which would keep every page of them resident.
+
+    Parameters:
+    out_binary - BinaryIO - binary file to write to
+    paths - List[str] - paths of the indices of the runs, in order
+
+    Return:
+    None
+    """
+
+    with contextlib.ExitStack() as stack:
+        runs: List[InvertedIndex] = [stack.enter_context(InvertedIndex(path))
+                                     for path in paths]
+        in_binaries: List[BinaryIO] = [stack.enter_context(open(path, "rb"))
+                                       for path in paths]
+        run: InvertedIndex
+        in_binary: BinaryIO
+        for run, in_binary in zip(runs, in_binaries):
+            in_binary.seek(run.locations_start)
+
+        terms: List[bytes] = []
+        counts: List[int] = []
+        term: bytes
+        group: Iterator[Tuple[bytes, int, int]]
+        for term, group in itertools.groupby(merge_terms(runs),
+                                             key=operator.itemgetter(0)):
+            terms.append(term)
+            counts.append(sum(runs[order].count(ind)
+                              for _, order, ind in group))
+        write_terms(out_binary, terms, counts)
+
+        # the terms are merged again rather than remembering which runs each
+        # appeared in, and the runs tied on a term come out in order
+        itemsize: int = array.array("I").itemsize
+        order: int
+        ind: int
+        for _, order, ind in merge_terms(runs):
+            out_binary.write(in_binaries[order].read(runs[order].count(ind)
+                                                     * itemsize))
+
+def build_file(out_binary: BinaryIO, words: Iterable[str],
+      run_locations: int = RUN_LOCATIONS) -> None:
+    """
+    Build an inverted index of a text, and write it to a file, as write_index,
+    holding the locations of at most run_locations words in memory at once. A
+    text with more words than that is indexed a run at a time, and the runs
+    are spilled to a temporary directory and merged with merge_indices.
+
+    Parameters:
+    out_binary - BinaryIO - binary file to write to
+    words - Iterable[str] - the words of the text
+    run_locations - int - the number of words in each run. defaults to
+     RUN_LOCATIONS
+
+    Return:
+    None
+    """
+
+    word_iter: Iterator[str] = iter(words)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths: List[str] = []
+        start: int = 1
+        while True:
+            index: Dict[str, array.array] = build_index(
+                    itertools.islice(word_iter, run_locations), start)
+            count: int = sum(map(len, index.values()))
+            if count < run_locations and not paths:
+                # the whole text fit in one run
+                write_index(out_binary, index)
+                return
+            if count:
+                path: str = os.path.join(tmp, "{}.run".format(len(paths)))
+                with open(path, "wb") as run_binary:
+                    write_index(run_binary, index)
+                paths.append(path)
+            # freed before the next run is built
+            index.clear()
+            if count < run_locations:
+                break
+            start += count
+        merge_indices(out_binary, paths)
+
+def main(argv: List[str]) -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    commands: argparse._SubParsersAction = parser.add_subparsers(dest="command",
+                                                                 required=True)
+    build: argparse.ArgumentParser = commands.add_parser("build")
+    build.add_argument("index")
+    build.add_argument("--input", type=argparse.FileType("r"),
+                       default=sys.stdin)
+    build.add_argument("--run-locations", type=int, default=RUN_LOCATIONS,
+                       metavar="WORDS",
+                       help="index this many words in memory at a time")
+    query: argparse.ArgumentParser = commands.add_parser("query")
+    query.add_argument("index")
+    query.add_argument("words", nargs="*")
+    args: argparse.Namespace = parser.parse_args(argv[1:])
+
+    if args.command == "build":
+        if args.run_locations < 1:
+            parser.error("--run-locations must be at least 1")
+        with args.input as in_file, open(args.index, "wb") as out_binary:
+            build_file(out_binary, read_words(in_file), args.run_locations)
+        return
+
+    with InvertedIndex(args.index) as index:
+        word: str
+        for word in args.words:
+            print(f"the word {word} appears at the indices "
+                  f"{index.postings(word).tolist()}")
+
+if __name__ == "__main__":
+    main(sys.argv)
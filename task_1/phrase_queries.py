@@ -0,0 +1,207 @@
+"""
+A script to find where phrases, or words near each other, appear in a text,
+from the sorted locations of their words in an inverted index. Rather than
+scanning the text, the lists of locations are intersected by galloping
+through them, driven by the rarest word, so that a query costs time in
+proportion to the locations of its rarest word (times a logarithm), even when
+it also has a word like "THE" with millions of locations.
+
+Example usage:
+    $ python inverted_index.py build corpus.idx < corpus.txt
+    $ python phrase_queries.py corpus.idx "what you can do" "ask not"
+    $ python phrase_queries.py corpus.idx --near 3 "country you"
+"""
+
+import sys
+import bisect
+import argparse
+
+from inverted_index import InvertedIndex
+from sentence_indices import clean_sentence
+
+from typing import *
+
+def gallop(postings: Sequence[int], target: int, low: int = 0) -> int:
+    """
+    Find the index of the first location at least as large as a target, no
+    earlier than a given index, by doubling the step from that index before
+    binary searching, so that short moves are cheap.
+
+    Example usage:
+    >>> gallop([1, 3, 5, 7, 9, 11], 6)
+    3
+    >>> gallop([1, 3, 5, 7, 9, 11], 3, 2)
+    2
+    >>> gallop([1, 3, 5], 8)
+    3
+
+    Parameters:
+    postings - Sequence[int] - locations in ascending order
+    target - int - location to search for
+    low - int - index to start from. defaults to 0
+
+    Return:
+    int - index of the first location at least target, or len(postings) if
+     there is none
+    """
+
+    size: int = len(postings)
+    if low >= size or postings[low] >= target:
+        return low
+    step: int = 1
+    while low + step < size and postings[low + step] < target:
+        low += step
+        step *= 2
+    return bisect.bisect_left(postings, target, low + 1, min(low + step, size))
+
+def phrase(postings: Sequence[Sequence[int]]) -> List[int]:
+    """
+    Find the locations at which a phrase starts, given the locations of each
+    of its words in order, by leapfrogging through them: a candidate start is
+    checked against each word, rarest first, and the first which doesn't
+    match gives the next candidate.
+
+    Example usage:
+    >>> phrase([[1, 4, 7], [2, 5, 9], [3, 8]])
+    [1]
+    >>> phrase([[1, 2, 3]])
+    [1, 2, 3]
+    >>> phrase([[1, 4], []])
+    []
+
+    Parameters:
+    postings - Sequence[Sequence[int]] - the locations of each word of the
+     phrase, in ascending order
+
+    Return:
+    List[int] - the locations at which the phrase starts
+    """
+
+    if not postings or not all(postings):
+        return []
+    order: List[int] = sorted(range(len(postings)),
+                              key=lambda ind: len(postings[ind]))
+    cursors: List[int] = [0] * len(postings)
+    starts: List[int] = []
+    target: int = postings[order[0]][0] - order[0]
+    while True:
+        ind: int
+        for ind in order:
+            cursors[ind] = gallop(postings[ind], target + ind, cursors[ind])
+            if cursors[ind] == len(postings[ind]):
+                return starts
+            start: int = postings[ind][cursors[ind]] - ind
+            if start != target:
+                target = start
+                break
+        else:
+            starts.append(target)
+            target += 1
+
+def within(postings: Sequence[int], location: int, distance: int,
+      low: int) -> Tuple[bool, int]:
+    """
+    Check whether there is a location within a distance of another, galloping
+    from a given index.
+
+    Example usage:
+    >>> within([2, 10, 20], 7, 3, 0)
+    (True, 1)
+    >>> within([2, 10, 20], 15, 4, 1)
+    (False, 2)
+
+    Parameters:
+    postings - Sequence[int] - locations in ascending order
+    location - int - location to look around
+    distance - int - the furthest a location can be, either side
+    low - int - index to start from
+
+    Return:
+    Tuple[bool, int] - whether there is such a location, and the index to
+     start from when checking a later location
+    """
+
+    low = gallop(postings, location - distance, low)
+    return low < len(postings) and postings[low] <= location + distance, low
+
+def near(postings: Sequence[Sequence[int]], distance: int) -> List[int]:
+    """
+    Find the locations of the first word of a query which have each of the
+    other words within a distance of them, either side. The candidates are
+    only taken from around the rarest of the other words, and then checked
+    against the rest. A word is always within any distance of itself.
+
+    Example usage:
+    >>> near([[1, 10, 20], [12, 30]], 2)
+    [10]
+    >>> near([[1, 10, 20], [12, 30], [8]], 2)
+    [10]
+    >>> near([[1, 10, 20], [12, 30], [8]], 1)
+    []
+    >>> near([[5, 6]], 0)
+    [5, 6]
+
+    Parameters:
+    postings - Sequence[Sequence[int]] - the locations of each word, in
+     ascending order
+    distance - int - the furthest the other words can be, either side
+
+    Return:
+    List[int] - the locations of the first word with all of the others near
+    """
+
+    if not postings or not all(postings):
+        return []
+    first: Sequence[int] = postings[0]
+    others: List[Sequence[int]] = sorted(postings[1:], key=len)
+    if not others:
+        return list(first)
+
+    candidates: List[int] = []
+    cursor: int = 0
+    location: int
+    for location in others[0]:
+        cursor = gallop(first, location - distance, cursor)
+        ind: int
+        for ind in range(cursor, len(first)):
+            if first[ind] > location + distance:
+                break
+            if not candidates or first[ind] > candidates[-1]:
+                candidates.append(first[ind])
+
+    cursors: List[int] = [0] * len(others)
+    found: List[int] = []
+    for location in candidates:
+        ok: bool = True
+        for ind in range(1, len(others)):
+            ok, cursors[ind] = within(others[ind], location, distance,
+                                      cursors[ind])
+            if not ok:
+                break
+        if ok:
+            found.append(location)
+    return found
+
+def main(argv: List[str]) -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("index", help="index written by inverted_index.py")
+    parser.add_argument("queries", nargs="*")
+    parser.add_argument("--near", type=int, metavar="DISTANCE",
+                        help="find words within DISTANCE words of the first, "
+                             "rather than phrases")
+    args: argparse.Namespace = parser.parse_intermixed_args(argv[1:])
+
+    with InvertedIndex(args.index) as index:
+        query: str
+        for query in args.queries:
+            postings: List[memoryview] = [index.postings(word)
+                                          for word in clean_sentence(query)]
+            if args.near is None:
+                print(f"the phrase {query} appears at the indices "
+                      f"{phrase(postings)}")
+            else:
+                print(f"the words {query} appear within {args.near} at the "
+                      f"indices {near(postings, args.near)}")
+
+if __name__ == "__main__":
+    main(sys.argv)
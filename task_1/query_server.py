@@ -0,0 +1,300 @@
+"""
+A server which loads an index once and answers queries for the locations of
+words from many clients at once, so that each query doesn't have to start an
+interpreter, read the text and build the dictionary again. It listens on TCP,
+or on a Unix socket, and speaks JSON, one object per line.
+
+A request holds a batch of queries, each of which is a word, a phrase, or with
+"near" a set of words to find within that many words of each other:
+
+    {"id": 1, "queries": ["ask", "what you can do"]}
+    {"id": 2, "queries": ["country ask"], "near": 4}
+
+and the response gives the locations found for each, with how long it took:
+
+    {"id": 1, "results": [{"query": "ask", "locations": [1, 10],
+                           "seconds": 1.2e-05}, ...]}
+
+or an "error" if the request can't be answered. The index is one written by
+inverted_index.py, or with --text a text file which is indexed when the
+server starts.
+
+Example usage:
+    $ python query_server.py serve corpus.idx --port 4530 &
+    $ python query_server.py client --port 4530 ask "what you can do"
+    $ python query_server.py serve --text speech.txt --unix /tmp/words.sock &
+    $ python query_server.py client --unix /tmp/words.sock --near 4 "country ask"
+"""
+
+import sys
+import json
+import time
+import array
+import asyncio
+import argparse
+import functools
+
+from inverted_index import InvertedIndex, build_index, read_words
+from phrase_queries import phrase, near
+from sentence_indices import clean_sentence
+
+from typing import *
+
+HOST: str = "127.0.0.1"
+PORT: int = 4530
+# the longest line either side will read, since the locations of a common word
+# can run to many megabytes
+LIMIT: int = 1 << 28
+
+Lookup = Callable[[str], Sequence[int]]
+
+def dictionary_lookup(index: Dict[str, array.array]) -> Lookup:
+    """
+    Make a lookup from an index built in memory by
+    inverted_index.build_index.
+
+    Example usage:
+    >>> lookup = dictionary_lookup(build_index(["CAT", "DOG", "CAT"]))
+    >>> lookup("cat").tolist(), lookup("eel").tolist()
+    ([1, 3], [])
+
+    Parameters:
+    index - Dict[str, array.array] - the locations of each word
+
+    Return:
+    Lookup - function from a word to its locations
+    """
+
+    empty: array.array = array.array("I")
+    return lambda word: index.get(word.upper(), empty)
+
+def answer(lookup: Lookup, request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Answer a batch of queries, timing each one.
+
+    Example usage:
+    >>> lookup = dictionary_lookup(build_index(["CAT", "DOG", "CAT"]))
+    >>> response = answer(lookup, {"id": 7, "queries": ["cat", "dog cat"]})
+    >>> response["id"], [result["locations"] for result in response["results"]]
+    (7, [[1, 3], [2]])
+
+    Parameters:
+    lookup - Lookup - function from a word to its locations
+    request - Dict[str, Any] - the request, with a list of "queries", and
+     optionally an "id" to return and a "near" distance
+
+    Return:
+    Dict[str, Any] - the response, with the results of each query
+    """
+
+    if not isinstance(request, dict):
+        raise ValueError("a request must be an object")
+    queries: Any = request.get("queries")
+    if (not isinstance(queries, list)
+            or not all(isinstance(query, str) for query in queries)):
+        raise ValueError("queries must be a list of strings")
+    distance: Any = request.get("near")
+    # bool is a subclass of int, but true isn't a distance
+    if distance is not None and (isinstance(distance, bool)
+                                 or not isinstance(distance, int)
+                                 or distance < 0):
+        raise ValueError("near must be a non-negative integer")
+
+    results: List[Dict[str, Any]] = []
+    query: str
+    for query in queries:
+        start: float = time.perf_counter()
+        postings: List[Sequence[int]] = [lookup(word)
+                                         for word in clean_sentence(query)]
+        locations: List[int]
+        if distance is not None:
+            locations = near(postings, distance)
+        elif len(postings) == 1:
+            locations = list(postings[0])
+        else:
+            locations = phrase(postings)
+        results.append({"query": query, "locations": locations,
+                        "seconds": time.perf_counter() - start})
+    return {"id": request.get("id"), "results": results}
+
+def respond(lookup: Lookup, line: bytes) -> bytes:
+    """
+    Answer a line of a request with a line of a response, or of an error if it
+    can't be answered.
+
+    Example usage:
+    >>> lookup = dictionary_lookup(build_index(["CAT", "DOG", "CAT"]))
+    >>> respond(lookup, b'{"queries": [], "id": 1}')
+    b'{"id": 1, "results": []}\\n'
+    >>> respond(lookup, b'{"queries": ["cat"], "near": true}')
+    b'{"error": "near must be a non-negative integer"}\\n'
+
+    Parameters:
+    lookup - Lookup - function from a word to its locations
+    line - bytes - the request, as JSON
+
+    Return:
+    bytes - the response, as a line of JSON
+    """
+
+    response: Dict[str, Any]
+    try:
+        response = answer(lookup, json.loads(line))
+    except ValueError as e:
+        response = {"error": str(e)}
+    return json.dumps(response).encode("utf-8") + b"\n"
+
+async def handle(lookup: Lookup, reader: asyncio.StreamReader,
+      writer: asyncio.StreamWriter) -> None:
+    """
+    Answer the requests of one client, a line at a time, until it
+    disconnects. A request which can't be answered gets an error rather than
+    ending the connection. Requests are answered in the default executor, so
+    that a slow one, or the encoding of a large response, doesn't hold up the
+    other clients.
+
+    Parameters:
+    lookup - Lookup - function from a word to its locations
+    reader - asyncio.StreamReader - stream to read requests from
+    writer - asyncio.StreamWriter - stream to write responses to
+
+    Return:
+    None
+    """
+
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    try:
+        while True:
+            line: bytes = await reader.readline()
+            if not line:
+                break
+            writer.write(await loop.run_in_executor(None, respond, lookup,
+                                                    line))
+            await writer.drain()
+    except (ConnectionError, ValueError):
+        # the client went away, or sent a line longer than LIMIT, after which
+        # there is no telling where the next request starts
+        pass
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+async def start(lookup: Lookup, host: str = HOST, port: int = PORT,
+      path: Optional[str] = None) -> asyncio.AbstractServer:
+    """
+    Start a server answering queries, on a Unix socket if a path is given, and
+    otherwise over TCP.
+
+    Parameters:
+    lookup - Lookup - function from a word to its locations
+    host - str - host to listen on. defaults to HOST
+    port - int - port to listen on, or 0 for any. defaults to PORT
+    path - Optional[str] - path of a Unix socket to listen on instead
+
+    Return:
+    asyncio.AbstractServer - the server, which is already listening
+    """
+
+    client: Callable[..., Awaitable[None]] = functools.partial(handle, lookup)
+    if path is not None:
+        return await asyncio.start_unix_server(client, path, limit=LIMIT)
+    return await asyncio.start_server(client, host, port, limit=LIMIT)
+
+class Client:
+    """
+    A client of a query server, which sends requests and waits for each
+    response in turn.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader,
+          writer: asyncio.StreamWriter) -> None:
+        self.reader: asyncio.StreamReader = reader
+        self.writer: asyncio.StreamWriter = writer
+        self.count: int = 0
+
+    @classmethod
+    async def connect(cls, host: str = HOST, port: int = PORT,
+          path: Optional[str] = None) -> "Client":
+        if path is not None:
+            return cls(*await asyncio.open_unix_connection(path, limit=LIMIT))
+        return cls(*await asyncio.open_connection(host, port, limit=LIMIT))
+
+    async def query(self, queries: List[str], distance: Optional[int] = None
+          ) -> List[Dict[str, Any]]:
+        """
+        Send a batch of queries, and return the result of each.
+        """
+
+        self.count += 1
+        request: Dict[str, Any] = {"id": self.count, "queries": queries}
+        if distance is not None:
+            request["near"] = distance
+        self.writer.write(json.dumps(request).encode("utf-8") + b"\n")
+        await self.writer.drain()
+        line: bytes = await self.reader.readline()
+        if not line:
+            raise ConnectionError("the server closed the connection")
+        response: Dict[str, Any] = json.loads(line)
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response["results"]
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+
+async def serve_forever(lookup: Lookup, args: argparse.Namespace) -> None:
+    server: asyncio.AbstractServer = await start(lookup, args.host, args.port,
+                                                 args.unix)
+    async with server:
+        await server.serve_forever()
+
+async def serve(args: argparse.Namespace) -> None:
+    if args.text:
+        with open(args.index) as in_file:
+            lookup: Lookup = dictionary_lookup(build_index(read_words(in_file)))
+        await serve_forever(lookup, args)
+    else:
+        with InvertedIndex(args.index) as index:
+            await serve_forever(index.postings, args)
+
+async def run_client(args: argparse.Namespace) -> None:
+    client: Client = await Client.connect(args.host, args.port, args.unix)
+    try:
+        result: Dict[str, Any]
+        for result in await client.query(args.queries, args.near):
+            print(f"the query {result['query']} appears at the indices "
+                  f"{result['locations']} "
+                  f"({result['seconds'] * 1000:.3f} ms)")
+    finally:
+        await client.close()
+
+def main(argv: List[str]) -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    commands: argparse._SubParsersAction = parser.add_subparsers(dest="command",
+                                                                 required=True)
+    serve_parser: argparse.ArgumentParser = commands.add_parser("serve")
+    serve_parser.add_argument("index", help="index written by inverted_index.py")
+    serve_parser.add_argument("--text", action="store_true",
+                              help="index a text file when starting instead")
+    client_parser: argparse.ArgumentParser = commands.add_parser("client")
+    client_parser.add_argument("queries", nargs="+")
+    client_parser.add_argument("--near", type=int, metavar="DISTANCE")
+    command: argparse.ArgumentParser
+    for command in [serve_parser, client_parser]:
+        command.add_argument("--host", default=HOST)
+        command.add_argument("--port", type=int, default=PORT)
+        command.add_argument("--unix", metavar="PATH",
+                             help="use a Unix socket rather than TCP")
+    args: argparse.Namespace = parser.parse_args(argv[1:])
+
+    try:
+        asyncio.run(serve(args) if args.command == "serve" else run_client(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main(sys.argv)
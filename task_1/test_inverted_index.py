@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+from io import StringIO, BytesIO
+
+from hashing_approach import build_dictionary
+from sentence_indices import clean_sentence, locations
+
+from inverted_index import *
+
+TEXT: str = "Ask not what your country can do for you, ask what you can do\n"
+
+class TestInvertedIndex(unittest.TestCase):
+    def test_read_words(self) -> None:
+        size: int
+        for size in [1, 3, 7, 1000]:
+            self.assertEqual(list(read_words(StringIO(TEXT), size)),
+                             clean_sentence(TEXT))
+        self.assertEqual(list(read_words(StringIO(""))), [])
+        self.assertEqual(list(read_words(StringIO("  one  "), 2)), ["ONE"])
+
+    def test_build_index(self) -> None:
+        words: List[str] = clean_sentence(TEXT)
+        self.assertEqual({word: postings.tolist() for word, postings
+                          in build_index(words).items()},
+                         build_dictionary(words))
+        self.assertEqual(build_index([]), {})
+
+    def test_query(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path: str = os.path.join(tmp, "text.idx")
+            with open(path, "wb") as out_binary:
+                write_index(out_binary, build_index(read_words(StringIO(TEXT))))
+            with InvertedIndex(path) as index:
+                self.assertEqual(len(index), 10)
+                self.assertEqual(index.postings("ask").tolist(), [1, 10])
+                self.assertEqual(index.postings("YOU").tolist(), [12])
+                self.assertEqual(index.postings("you,").tolist(), [9])
+                self.assertEqual(index.postings("BACON").tolist(), [])
+                word: str
+                for word in set(clean_sentence(TEXT)):
+                    self.assertEqual(index.postings(word).tolist(),
+                                     locations(clean_sentence(TEXT), word))
+
+    def test_build_file(self) -> None:
+        words: List[str] = clean_sentence(TEXT * 3)
+        expected: BytesIO = BytesIO()
+        write_index(expected, build_index(words))
+        run_locations: int
+        # one run, several, and a text which fills its last run exactly
+        for run_locations in [1000, 1, 5, len(words) // 3, len(words)]:
+            out_binary: BytesIO = BytesIO()
+            build_file(out_binary, words, run_locations)
+            self.assertEqual(out_binary.getvalue(), expected.getvalue())
+        empty: BytesIO = BytesIO()
+        build_file(empty, [], 4)
+        self.assertEqual(len(empty.getvalue()), HEADER.size + 8)
+
+    def test_empty(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path: str = os.path.join(tmp, "empty.idx")
+            with open(path, "wb") as out_binary:
+                write_index(out_binary, {})
+            with InvertedIndex(path) as index:
+                self.assertEqual(len(index), 0)
+                self.assertEqual(index.postings("ONE").tolist(), [])
+            with open(path, "wb") as out_binary:
+                out_binary.write(b"not an index" * 4)
+            with self.assertRaises(ValueError):
+                InvertedIndex(path)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import array
+import random
+import tempfile
+import unittest
+
+from io import StringIO
+
+from inverted_index import InvertedIndex, build_index, read_words, write_index
+from sentence_indices import locations
+
+from phrase_queries import *
+
+TEXT: str = ("ask not what your country can do for you "
+             "ask what you can do for your country")
+
+def scan_phrase(sentence: List[str], words: List[str]) -> List[int]:
+    return [ind + 1 for ind in range(len(sentence) - len(words) + 1)
+            if sentence[ind:ind + len(words)] == words]
+
+def scan_near(sentence: List[str], words: List[str], distance: int
+      ) -> List[int]:
+    return [location for location in locations(sentence, words[0])
+            if all(any(abs(other - location) <= distance
+                       for other in locations(sentence, word))
+                   for word in words[1:])]
+
+class TestPhraseQueries(unittest.TestCase):
+    def test_gallop(self) -> None:
+        postings: List[int] = list(range(0, 100, 3))
+        target: int
+        for target in range(-1, 102):
+            low: int
+            for low in [0, 5, 20, len(postings)]:
+                self.assertEqual(gallop(postings, target, low),
+                                 max(low, (target + 2) // 3 if target > 0
+                                          else 0))
+        self.assertEqual(gallop([], 4), 0)
+
+    def test_phrase(self) -> None:
+        sentence: List[str] = clean_sentence(TEXT)
+        index: Dict[str, array.array] = build_index(sentence)
+        self.assertEqual(phrase([index["WHAT"], index["YOU"], index["CAN"],
+                                 index["DO"]]), [11])
+        self.assertEqual(phrase([index["CAN"], index["DO"], index["FOR"]]),
+                         [6, 13])
+        self.assertEqual(phrase([index["DO"], index["ASK"]]), [])
+        self.assertEqual(phrase([]), [])
+
+    def test_near(self) -> None:
+        sentence: List[str] = clean_sentence(TEXT)
+        index: Dict[str, array.array] = build_index(sentence)
+        self.assertEqual(near([index["COUNTRY"], index["ASK"]], 3), [])
+        self.assertEqual(near([index["COUNTRY"], index["ASK"]], 4), [5])
+        self.assertEqual(near([index["ASK"], index["YOU"], index["NOT"]], 7),
+                         [])
+        self.assertEqual(near([index["ASK"], index["YOU"], index["NOT"]], 8),
+                         [1, 10])
+        self.assertEqual(near([index["ASK"]], 0), [1, 10])
+
+    def test_against_scan(self) -> None:
+        generator: random.Random = random.Random(453)
+        trial: int
+        for trial in range(300):
+            sentence: List[str] = [generator.choice("ABC")
+                                   for _ in range(generator.randint(0, 40))]
+            words: List[str] = [generator.choice("ABC")
+                                for _ in range(generator.randint(1, 3))]
+            postings: List[List[int]] = [locations(sentence, word)
+                                         for word in words]
+            distance: int = generator.randint(0, 4)
+            self.assertEqual(phrase(postings), scan_phrase(sentence, words))
+            self.assertEqual(near(postings, distance),
+                             scan_near(sentence, words, distance))
+
+    def test_mapped(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path: str = os.path.join(tmp, "text.idx")
+            with open(path, "wb") as out_binary:
+                write_index(out_binary, build_index(read_words(StringIO(TEXT))))
+            with InvertedIndex(path) as index:
+                postings: List[memoryview] = [index.postings(word) for word
+                                              in clean_sentence("can do for")]
+                self.assertEqual(phrase(postings), [6, 13])
+                self.assertEqual(near(postings, 1), [])
+                self.assertEqual(near(postings, 2), [6, 13])
+
+if __name__ == "__main__":
+    unittest.main()
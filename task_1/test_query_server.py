@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import asyncio
+import tempfile
+import unittest
+
+from io import StringIO
+
+from inverted_index import write_index
+
+from query_server import *
+
+TEXT: str = ("ask not what your country can do for you "
+             "ask what you can do for your country")
+
+class TestAnswer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.lookup: Lookup = dictionary_lookup(build_index(
+                read_words(StringIO(TEXT))))
+
+    def test_answer(self) -> None:
+        response: Dict[str, Any] = answer(self.lookup, {
+                "id": "a", "queries": ["ask", "can do for", "bacon", ""]})
+        self.assertEqual(response["id"], "a")
+        self.assertEqual([result["query"] for result in response["results"]],
+                         ["ask", "can do for", "bacon", ""])
+        self.assertEqual([result["locations"]
+                          for result in response["results"]],
+                         [[1, 10], [6, 13], [], []])
+        self.assertTrue(all(result["seconds"] >= 0
+                            for result in response["results"]))
+        self.assertEqual(answer(self.lookup, {"queries": ["country ask"],
+                                              "near": 4})
+                         ["results"][0]["locations"], [5])
+
+    def test_errors(self) -> None:
+        request: Any
+        for request in [[], {}, {"queries": "ask"}, {"queries": [1]},
+                        {"queries": ["ask"], "near": "far"},
+                        {"queries": ["ask"], "near": -1},
+                        {"queries": ["ask"], "near": True}]:
+            with self.assertRaises(ValueError):
+                answer(self.lookup, request)
+
+class TestServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.tmp: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        path: str = os.path.join(self.tmp.name, "text.idx")
+        with open(path, "wb") as out_binary:
+            write_index(out_binary, build_index(read_words(StringIO(TEXT))))
+        self.index: InvertedIndex = InvertedIndex(path)
+        self.server: asyncio.AbstractServer = await start(self.index.postings,
+                                                          port=0)
+        self.port: int = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+        self.index.close()
+        self.tmp.cleanup()
+
+    async def ask(self, queries: List[str]) -> List[List[int]]:
+        client: Client = await Client.connect(port=self.port)
+        try:
+            return [result["locations"]
+                    for result in await client.query(queries)]
+        finally:
+            await client.close()
+
+    async def test_concurrent(self) -> None:
+        answers: List[List[List[int]]] = await asyncio.gather(
+                *(self.ask(["ask", "what you can do"]) for _ in range(20)))
+        self.assertEqual(answers, [[[1, 10], [11]]] * 20)
+
+    async def test_connection(self) -> None:
+        client: Client = await Client.connect(port=self.port)
+        try:
+            self.assertEqual(
+                    [result["locations"] for result
+                     in await client.query(["country ask"], 4)], [[5]])
+            with self.assertRaises(ValueError):
+                await client.query("not a list")
+            # the connection is still usable after an error
+            self.assertEqual((await client.query(["not"]))[0]["locations"],
+                             [2])
+            client.writer.write(b"not json\n")
+            self.assertIn("error", json.loads(await client.reader.readline()))
+        finally:
+            await client.close()
+
+    async def test_slow_query(self) -> None:
+        def slow_lookup(word: str) -> Sequence[int]:
+            if word == "SLOW":
+                time.sleep(0.5)
+            return self.index.postings(word)
+
+        server: asyncio.AbstractServer = await start(slow_lookup, port=0)
+        port: int = server.sockets[0].getsockname()[1]
+        finished: List[str] = []
+
+        async def ask(query: str) -> None:
+            client: Client = await Client.connect(port=port)
+            try:
+                await client.query([query])
+                finished.append(query)
+            finally:
+                await client.close()
+
+        try:
+            slow: asyncio.Task = asyncio.create_task(ask("slow"))
+            await asyncio.sleep(0.1)
+            await asyncio.wait_for(ask("ask"), 0.3)
+            self.assertEqual(finished, ["ask"])
+            await slow
+            self.assertEqual(finished, ["ask", "slow"])
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    async def test_unix(self) -> None:
+        path: str = os.path.join(self.tmp.name, "words.sock")
+        server: asyncio.AbstractServer = await start(self.index.postings,
+                                                     path=path)
+        try:
+            client: Client = await Client.connect(path=path)
+            self.assertEqual((await client.query(["your country"]))[0]
+                             ["locations"], [4, 16])
+            await client.close()
+        finally:
+            server.close()
+            await server.wait_closed()
+
+if __name__ == "__main__":
+    unittest.main()